@@ -9,6 +9,8 @@ from .pages.files import files_page
 from .pages.admin import admin_page
 
 from .state import GlobalState
+from .api import api
+from .utils.background_tasks import multipart_sweeper
 
 def index() -> rx.Component:
     """Pagina Principal - redirige al login"""
@@ -24,12 +26,15 @@ def index() -> rx.Component:
         on_mount=rx.redirect('/login')
     )
 
-#Crear Aplicacion Reflex
-app = rx.App()
+#Crear Aplicacion Reflex (con las rutas HTTP propias, p. ej. la descarga en ZIP)
+app = rx.App(api_transformer=api)
 
 app.add_page(index, route='/')
 app.add_page(login_page, route='/login')
 app.add_page(dashboard_page, route='/dashboard')
 app.add_page(files_page, route='/files')
 app.add_page(admin_page, route='/admin')
+
+#Tareas de mantenimiento en segundo plano
+app.register_lifespan_task(multipart_sweeper)
     
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Rutas HTTP propias del backend (fuera del estado de Reflex)
+"""
+
+from urllib.parse import quote
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from .utils.async_s3 import run_blocking
+from .utils.S3_manager import S3Manager
+from .utils.zip_stream import ZIP_TOKEN_SECRET, stream_zip, verify_zip_token, zip_entries
+
+
+async def download_zip(request: Request):
+    """
+    Enviar como un ZIP los archivos autorizados por un token de descarga.
+
+    El token lo firma FilesState después de comprobar can_download y llega en
+    un formulario POST (la lista de archivos elegidos no cabe en una URL).
+    La respuesta se envía por bloques a medida que se arma el ZIP.
+    """
+    if ZIP_TOKEN_SECRET is None:
+        return PlainTextResponse("La descarga en ZIP está desactivada en este servidor", status_code=503)
+    form = await request.form()
+    request_info = verify_zip_token(str(form.get('token', '')))
+    if request_info is None:
+        return PlainTextResponse("El enlace de descarga no es válido o ya venció", status_code=403)
+
+    s3 = S3Manager()
+    bucket = request_info['bucket']
+    prefix = request_info['prefix']
+    names = request_info['names']
+
+    if names is None:
+        # Carpeta completa: listado plano; las rutas del ZIP empiezan en la carpeta
+        pages = s3.iter_pages(bucket, prefix=prefix)
+        base = prefix[:prefix.rstrip('/').rfind('/') + 1]
+    else:
+        # Selección: solo el nivel actual, filtrado por nombre
+        pages = s3.iter_pages(bucket, prefix=prefix, delimiter='/')
+        base = prefix
+
+    # El primer listado se hace antes de responder para poder devolver un error
+    try:
+        first_page = await run_blocking(next, pages, None)
+    except Exception as e:
+        return PlainTextResponse(f"Error listando los archivos: {str(e)}", status_code=502)
+
+    def all_pages():
+        if first_page is not None:
+            yield first_page
+            yield from pages
+
+    entries = zip_entries(all_pages(), prefix, names, base)
+    filename = quote(f"{request_info['archive_name']}.zip")
+    return StreamingResponse(
+        stream_zip(s3.s3_client, bucket, entries),
+        media_type='application/zip',
+        headers={'Content-Disposition': f"attachment; filename*=UTF-8''{filename}"}
+    )
+
+
+api = Starlette(routes=[
+    Route('/api/zip', download_zip, methods=['POST']),
+])
@@ -3,6 +3,8 @@ Página de Dashboard
 """
 
 import reflex as rx
+from typing import List
+from ..utils.async_s3 import AsyncS3Manager
 
 
 class DashboardState(rx.State):
@@ -11,6 +13,9 @@ class DashboardState(rx.State):
     name: str = ""
     role: str = "guest"
     
+    # Uso de almacenamiento de cada bucket visible para el rol
+    storage_usage: List[dict] = []
+    
     async def on_mount(self):
         """Cargar datos del usuario al montar la página."""
         from ..state import GlobalState
@@ -26,6 +31,37 @@ class DashboardState(rx.State):
         self.username = global_state.username or "Usuario"
         self.name = global_state.name or ""
         self.role = global_state.role or "guest"
+        
+        return DashboardState.load_storage_usage
+    
+    @rx.event(background=True)
+    async def load_storage_usage(self):
+        """
+        Cargar el uso de almacenamiento de los buckets del rol.
+        
+        Los totales salen del resumen por carpetas en memoria, así que no se
+        lista ningún bucket; los que aún se están calculando se indican.
+        """
+        async with self:
+            role = self.role
+        
+        s3 = AsyncS3Manager()
+        rows = []
+        for bucket in s3.get_available_buckets(role):
+            success, usage, error = await s3.get_storage_usage(bucket)
+            if not success:
+                rows.append({'bucket': bucket, 'summary': error, 'ready': False})
+            elif usage is None:
+                rows.append({'bucket': bucket, 'summary': "Calculando...", 'ready': False})
+            else:
+                rows.append({
+                    'bucket': bucket,
+                    'summary': f"{usage['count']} archivos, {usage['bytes'] / (1024 * 1024):.2f} MB",
+                    'ready': True,
+                })
+        
+        async with self:
+            self.storage_usage = rows
 
 
 def dashboard_page() -> rx.Component:
@@ -274,6 +310,42 @@ def dashboard_page() -> rx.Component:
                     size="2",
                 ),
                 
+                # Uso de almacenamiento por bucket
+                rx.card(
+                    rx.vstack(
+                        rx.heading(
+                            rx.hstack(
+                                rx.icon("hard-drive", size=20),
+                                rx.text("Almacenamiento"),
+                                spacing="2",
+                            ),
+                            size="5",
+                        ),
+                        rx.foreach(
+                            DashboardState.storage_usage,
+                            lambda row: rx.hstack(
+                                rx.icon("database", size=16, color="gray"),
+                                rx.text(row['bucket'], size="2", weight="medium"),
+                                rx.spacer(),
+                                rx.badge(
+                                    row['summary'],
+                                    size="1",
+                                    variant="soft",
+                                    color_scheme=rx.cond(row['ready'], "blue", "gray"),
+                                ),
+                                spacing="2",
+                                align="center",
+                                width="100%",
+                            ),
+                        ),
+                        spacing="3",
+                        align="start",
+                        width="100%",
+                    ),
+                    margin_top="1rem",
+                    size="2",
+                ),
+                
                 # Información adicional
                 rx.card(
                     rx.vstack(
@@ -2,11 +2,50 @@
 Página de gestión de archivos S3
 """
 
+import asyncio
+import json
+import os
 import reflex as rx
-from typing import List
+from typing import List, Optional
 from ..utils.S3_manager import S3Manager
+from ..utils.async_s3 import AsyncS3Manager
+from ..utils.metadata_catalog import SEARCH_COUNT_LIMIT
+from ..utils.zip_stream import create_zip_token
 from ..components.navbar import navbar
 
+# Entradas (carpetas + archivos) por página del listado
+FILES_PAGE_SIZE = 200
+
+# Archivos que se suben a la vez en una carga múltiple
+MAX_PARALLEL_UPLOADS = int(os.getenv('UPLOAD_CONCURRENCY', '4'))
+
+# Cada cuántos segundos se envía el progreso de las subidas al navegador
+UPLOAD_PROGRESS_INTERVAL = 0.5
+
+# Validez de los enlaces de descarga que se adjuntan a cada fila
+DOWNLOAD_URL_EXPIRATION = 3600
+
+# Versiones que se piden a S3 por cada página del historial
+VERSIONS_PAGE_SIZE = 200
+
+# Resultados de búsqueda que se muestran
+SEARCH_LIMIT = 200
+
+# Mientras un bucket se cataloga, la búsqueda y el listado ordenado se reintentan cada tantos segundos
+CATALOG_POLL_INTERVAL = 3
+CATALOG_POLLS = 100
+
+# Columnas por las que se ordena el listado (las de tamaño y fecha empiezan por la mayor)
+SORTABLE_COLUMNS = ['key', 'size', 'last_modified', 'storage_class']
+DESCENDING_FIRST = ['size', 'last_modified']
+
+# Opciones de orden de la búsqueda: (columna del catálogo, descendente)
+SEARCH_SORTS = {
+    "Nombre": ('key', False),
+    "Más grandes": ('size', True),
+    "Más recientes": ('last_modified', True),
+}
+
 
 class FilesState(rx.State):
     """Estado de la página de archivos."""
@@ -24,16 +63,93 @@ class FilesState(rx.State):
     success_message: str = ""
     search_query: str = ""
     
+    # Búsqueda en el catálogo local (índice de texto sobre las claves)
+    search_scope: str = "Esta carpeta"
+    search_sort: str = "Nombre"
+    search_results: List[dict] = []
+    search_total: int = 0
+    search_pending: List[str] = []
+    search_unavailable: List[str] = []
+    searching: bool = False
+    _search_generation: int = 0
+    _search_buckets: int = 0
+    
+    # Paginación del listado: con el bucket catalogado, páginas ordenadas y
+    # totales (solo la página visible viaja al navegador); sin catálogo,
+    # páginas de S3 de tamaño fijo y una pila con el cursor de cada página
+    # visitada después de la primera para ir y volver
+    next_cursor: str = ""
+    _page_cursors: List[str] = []
+    paged_listing: bool = False
+    sort_column: str = "key"
+    sort_descending: bool = False
+    page_offset: int = 0
+    total_files: int = 0
+    total_folders: int = 0
+    _listed_location: str = ""
+    
+    # Navegación por carpetas
+    folder_view: bool = True
+    current_prefix: str = ""
+    folders: List[dict] = []
+    
+    # Uso de almacenamiento de la carpeta actual (del resumen por carpetas)
+    usage_summary: str = ""
+    _folder_usage: dict = {}
+    
     # Upload
     show_upload_dialog: bool = False
     upload_loading: bool = False
+    upload_progress: List[dict] = []
+    
+    # Subida directa del navegador a S3 (URLs prefirmadas)
+    direct_upload_loading: bool = False
+    _pending_direct_uploads: List[dict] = []
     
     # Delete
     delete_file_key: str = ""
     delete_file_name: str = ""
+    delete_prefix: str = ""
     show_delete_dialog: bool = False
     delete_loading: bool = False
     
+    # Selección múltiple para eliminar en lote
+    selected_keys: List[str] = []
+    
+    # Vista previa (primeros KB del archivo)
+    show_preview_dialog: bool = False
+    preview_loading: bool = False
+    preview_name: str = ""
+    preview_kind: str = ""
+    preview_columns: List[str] = []
+    preview_rows: List[List[str]] = []
+    preview_text: str = ""
+    preview_info: str = ""
+    
+    # Copiar / mover (del lado de S3) a otro bucket o carpeta
+    show_transfer_dialog: bool = False
+    transfer_loading: bool = False
+    transfer_source_key: str = ""
+    transfer_source_prefix: str = ""
+    transfer_name: str = ""
+    transfer_mode: str = "copiar"
+    transfer_bucket: str = ""
+    transfer_prefix: str = ""
+    
+    # Historial de versiones de un archivo o archivos eliminados de la carpeta
+    show_versions_dialog: bool = False
+    versions_loading: bool = False
+    versions_action_loading: bool = False
+    versions_key: str = ""
+    versions_title: str = ""
+    versions: List[dict] = []
+    versions_cursor: str = ""
+    selected_deleted: List[str] = []
+    
+    # Se incrementa con cada listado: una respuesta tardía de un listado
+    # anterior (otro bucket u otra carpeta) no debe pisar la actual
+    _listing_generation: int = 0
+    
     async def on_mount(self):
         """Inicializar al cargar la página."""
         from ..state import GlobalState
@@ -50,7 +166,7 @@ class FilesState(rx.State):
         self.role = global_state.role or "solo-lectura"
         
         # Cargar buckets
-        self.load_buckets()
+        return self.load_buckets()
     
     def load_buckets(self):
         """Cargar buckets disponibles según el rol."""
@@ -61,51 +177,500 @@ class FilesState(rx.State):
             # Seleccionar el primer bucket por defecto
             if self.available_buckets:
                 self.selected_bucket = self.available_buckets[0]
-                self.load_files()
+                return FilesState.load_files
             else:
                 self.error_message = "No tienes acceso a ningún bucket"
         except Exception as e:
             self.error_message = f"Error cargando buckets: {str(e)}"
     
     def select_bucket(self, bucket: str):
-        """Cambiar el bucket seleccionado."""
+        """Cambiar el bucket seleccionado (solo a uno de los que permite el rol)."""
+        if bucket not in self.available_buckets:
+            self.error_message = "No tienes acceso a este bucket"
+            return
         self.selected_bucket = bucket
+        self.current_prefix = ""
         self.error_message = ""
         self.success_message = ""
-        self.load_files()
+        return FilesState.load_files
     
-    def load_files(self):
-        """Cargar archivos del bucket seleccionado."""
-        if not self.selected_bucket:
-            return
+    def set_selected_bucket(self, bucket: str):
+        """Reemplaza el setter automático: el cambio de bucket siempre se valida."""
+        return self.select_bucket(bucket)
+    
+    def set_available_buckets(self, buckets: List[str]):
+        """Reemplaza el setter automático: los buckets solo salen del rol (load_buckets)."""
+        return
+    
+    def set_role(self, role: str):
+        """Reemplaza el setter automático: el rol solo sale de la sesión (on_mount)."""
+        return
+    
+    @rx.event(background=True)
+    async def load_files(self):
+        """
+        Cargar la página actual del listado del bucket seleccionado.
         
-        self.loading = True
-        self.error_message = ""
-        self.success_message = ""
+        Corre como tarea en segundo plano: el estado solo se bloquea para
+        leer los parámetros y para aplicar el resultado, nunca durante la
+        llamada a S3. Al cambiar de carpeta se vuelve a la primera página y
+        se descarta la selección; al recargar la misma carpeta (tras subir o
+        borrar) se conserva la página.
+        """
+        async with self:
+            if not self.selected_bucket:
+                return
+            
+            self.loading = True
+            self.error_message = ""
+            self.success_message = ""
+            self.next_cursor = ""
+            self._listing_generation += 1
+            
+            location = json.dumps([self.selected_bucket, self.current_prefix, self._delimiter()])
+            if location != self._listed_location:
+                self._listed_location = location
+                self.page_offset = 0
+                self._page_cursors = []
+                self.selected_keys = []
+            
+            generation = self._listing_generation
+            bucket = self.selected_bucket
+            prefix = self.current_prefix
+            delimiter = self._delimiter()
+            sort = self.sort_column
+            descending = self.sort_descending
+            offset = self.page_offset
+            cursor = self._page_cursors[-1] if self._page_cursors else None
+            role = self.role
+            can_download = self.can_download
         
+        s3 = AsyncS3Manager()
         try:
-            s3 = S3Manager()
-            success, files, error = s3.list_files(self.selected_bucket)
+            success, page, error = await s3.list_files_sorted(
+                bucket, prefix, sort=sort, descending=descending, offset=offset,
+                page_size=FILES_PAGE_SIZE, delimiter=delimiter
+            )
+            paged = success and page['cataloged']
+            indexing = success and page['pending']
+            if success and not paged:
+                # Bucket sin catalogar (o catalogándose): página de S3 en orden de
+                # clave; el orden elegido solo se aplica dentro de la página
+                success, page, error = await s3.list_files_page(
+                    bucket,
+                    cursor=cursor,
+                    page_size=FILES_PAGE_SIZE,
+                    prefix=prefix,
+                    delimiter=delimiter
+                )
+                if success:
+                    page['files'] = self._sort_page(page['files'], sort, descending)
+            if success and can_download:
+                page['files'] = await self._with_download_urls(bucket, role, page['files'])
+            _, usage, _ = await s3.get_storage_usage(bucket, prefix)
+        except Exception as e:
+            success, paged, indexing, page, error = False, False, False, None, f"Error: {str(e)}"
+        
+        async with self:
+            if generation != self._listing_generation:
+                return
             
-            if success:
-                self.files = files
-                total = len(files)
-                if total > 0:
-                    self.success_message = f"Se encontraron {total} archivos"
-                else:
-                    self.success_message = "El bucket está vacío"
-            else:
+            self.loading = False
+            if not success:
                 self.error_message = error
                 self.files = []
-        except Exception as e:
-            self.error_message = f"Error: {str(e)}"
-            self.files = []
-        finally:
-            self.loading = False
+                self.folders = []
+                self.paged_listing = False
+                return
+            
+            self._apply_usage(usage)
+            self.files = page['files']
+            self.folders = self._with_folder_usage(page['folders'])
+            self.paged_listing = paged
+            if paged:
+                self.page_offset = page['offset']
+                self.total_files = page['total_files']
+                self.total_folders = page['total_folders']
+                self._page_cursors = []
+            else:
+                self.next_cursor = page['next_cursor'] or ""
+            self._update_count_message()
+            if indexing:
+                return FilesState.wait_for_catalog
+    
+    @rx.event(background=True)
+    async def wait_for_catalog(self):
+        """Pasar al listado ordenado y paginado cuando el bucket termine de catalogarse."""
+        async with self:
+            generation = self._listing_generation
+            bucket = self.selected_bucket
+        
+        for _ in range(CATALOG_POLLS):
+            await asyncio.sleep(CATALOG_POLL_INTERVAL)
+            async with self:
+                # Otro listado en curso: ese se encarga
+                if generation != self._listing_generation:
+                    return
+            
+            success, page, _ = await AsyncS3Manager().list_files_sorted(bucket, page_size=1)
+            if not success:
+                return
+            if not page['pending']:
+                async with self:
+                    if page['cataloged'] and generation == self._listing_generation:
+                        return FilesState.load_files
+                return
+    
+    def set_sort(self, column: str):
+        """
+        Ordenar por una columna; si ya es la actual, invertir el orden.
+        
+        Sin catálogo solo se reordena la página visible (S3 lista en orden
+        de clave), así que se conserva la página en la que se está.
+        """
+        if column not in SORTABLE_COLUMNS:
+            return
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = column in DESCENDING_FIRST
+        self.page_offset = 0
+        return FilesState.load_files
+    
+    def next_page(self):
+        """Ir a la página siguiente del listado."""
+        if not self.has_next_page:
+            return
+        if self.paged_listing:
+            self.page_offset += FILES_PAGE_SIZE
+        else:
+            self._page_cursors = self._page_cursors + [self.next_cursor]
+        return FilesState.load_files
+    
+    def previous_page(self):
+        """Volver a la página anterior del listado."""
+        if not self.has_previous_page:
+            return
+        if self.paged_listing:
+            self.page_offset = max(0, self.page_offset - FILES_PAGE_SIZE)
+        else:
+            self._page_cursors = self._page_cursors[:-1]
+        return FilesState.load_files
+    
+    @rx.var
+    def has_next_page(self) -> bool:
+        """Indica si quedan entradas después de la página visible."""
+        if self.paged_listing:
+            return self.page_offset + FILES_PAGE_SIZE < self.total_folders + self.total_files
+        return self.next_cursor != ""
+    
+    @rx.var
+    def has_previous_page(self) -> bool:
+        """Indica si hay entradas antes de la página visible."""
+        if self.paged_listing:
+            return self.page_offset > 0
+        return len(self._page_cursors) > 0
+    
+    @rx.var
+    def page_label(self) -> str:
+        """Posición de la página visible, p. ej. 'Página 2 de 15' (sin catálogo no hay total)."""
+        if not self.paged_listing:
+            return f"Página {len(self._page_cursors) + 1}"
+        total = self.total_folders + self.total_files
+        pages = max(1, (total + FILES_PAGE_SIZE - 1) // FILES_PAGE_SIZE)
+        return f"Página {self.page_offset // FILES_PAGE_SIZE + 1} de {pages}"
+    
+    @staticmethod
+    def _sort_page(files: List[dict], column: str, descending: bool) -> List[dict]:
+        """Ordenar solo las filas de la página visible (listado de S3 sin catálogo)."""
+        if column not in SORTABLE_COLUMNS:
+            column = 'key'
+        return sorted(files, key=lambda f: (f[column], f['key']), reverse=descending)
+    
+    @staticmethod
+    async def _with_download_urls(bucket: str, role: str, files: List[dict]) -> List[dict]:
+        """
+        Adjuntar a cada fila su enlace de descarga prefirmado y su miniatura.
+        
+        Las URLs de toda la página se firman en una sola llamada (y casi
+        siempre salen de la caché), así que el clic va directo a S3. Las
+        miniaturas que aún no existen se encolan y aparecen en otro listado.
+        """
+        if not files:
+            return files
+        
+        s3 = AsyncS3Manager()
+        (success, urls, _), (_, thumbnails, _) = await asyncio.gather(
+            s3.get_download_urls(
+                bucket,
+                [f['key'] for f in files],
+                role=role,
+                expiration=DOWNLOAD_URL_EXPIRATION
+            ),
+            s3.get_thumbnail_urls(bucket, files, role=role, expiration=DOWNLOAD_URL_EXPIRATION)
+        )
+        
+        rows = []
+        for f in files:
+            row = dict(f)
+            if success:
+                # Sin enlace precalculado se usa el botón con round trip
+                row['download_url'] = urls.get(f['key'], "")
+            if f['key'] in thumbnails:
+                row['thumbnail_url'] = thumbnails[f['key']]
+            rows.append(row)
+        return rows
+    
+    def _apply_usage(self, usage: Optional[dict]):
+        """
+        Guardar el uso de la carpeta actual y el de sus subcarpetas.
+        
+        El resumen sale de memoria; si el bucket aún se está calculando se
+        indica y las carpetas se muestran sin tamaño.
+        """
+        if usage is None:
+            self.usage_summary = "Calculando el uso de almacenamiento..."
+            self._folder_usage = {}
+            return
+        
+        classes = ", ".join(
+            f"{name}: {values['bytes'] / (1024 * 1024):.2f} MB"
+            for name, values in usage['classes'].items()
+        )
+        self.usage_summary = (
+            f"{usage['count']} archivos, {usage['bytes'] / (1024 * 1024):.2f} MB en total"
+            + (f" ({classes})" if classes else "")
+        )
+        self._folder_usage = usage['children']
+    
+    def _with_folder_usage(self, folders: List[dict]) -> List[dict]:
+        """Adjuntar a cada carpeta su tamaño y número de archivos (con subcarpetas)."""
+        rows = []
+        for folder in folders:
+            row = dict(folder)
+            usage = self._folder_usage.get(folder['prefix'])
+            if usage:
+                row['size_mb'] = round(usage['bytes'] / (1024 * 1024), 2)
+                row['file_count'] = usage['count']
+            rows.append(row)
+        return rows
+    
+    def _update_count_message(self):
+        """Actualizar el mensaje con el número de archivos cargados."""
+        if self.paged_listing:
+            if self.total_files == 0 and self.total_folders == 0:
+                self.success_message = "Esta carpeta está vacía" if self.current_prefix else "El bucket está vacío"
+            else:
+                first = self.page_offset + 1
+                last = self.page_offset + len(self.folders) + len(self.files)
+                self.success_message = (
+                    f"{self.total_folders} carpetas y {self.total_files} archivos "
+                    f"(se muestran del {first} al {last})"
+                )
+            return
+        
+        total = len(self.files)
+        if total == 0 and not self.folders and not self._page_cursors:
+            self.success_message = "Esta carpeta está vacía" if self.current_prefix else "El bucket está vacío"
+        elif self.next_cursor or self._page_cursors:
+            self.success_message = (
+                f"Página {len(self._page_cursors) + 1}: {len(self.folders)} carpetas y {total} archivos "
+                f"(el orden se aplica dentro de la página)"
+            )
+        else:
+            self.success_message = f"Se encontraron {total} archivos"
+    
+    def _remove_from_listing(self, keys: List[str], prefix: str = ""):
+        """
+        Quitar de la página visible archivos (y una carpeta) que ya no existen.
+        
+        En el listado paginado también se descuentan de los totales; la
+        página queda más corta y el próximo listado vuelve a contar.
+        """
+        removed = set(keys)
+        if prefix:
+            if self.paged_listing and any(f['prefix'] == prefix for f in self.folders):
+                self.total_folders -= 1
+            self.folders = [f for f in self.folders if f['prefix'] != prefix]
+        
+        remaining = [
+            f for f in self.files
+            if f['key'] not in removed and not (prefix and f['key'].startswith(prefix))
+        ]
+        if self.paged_listing:
+            # Lo borrado puede estar en otras páginas de la misma carpeta
+            listed = [
+                key for key in removed
+                if key.startswith(self.current_prefix)
+                and (not self.folder_view or key[:key.rfind("/") + 1] == self.current_prefix)
+                and not (prefix and key.startswith(prefix))
+            ]
+            self.total_files = max(0, self.total_files - len(listed))
+        self.files = remaining
+    
+    def _delimiter(self) -> str:
+        """Delimitador del listado según el modo de vista."""
+        return "/" if self.folder_view else ""
+    
+    # === FUNCIONES: CARPETAS ===
+    
+    def open_folder(self, prefix: str):
+        """Entrar en una subcarpeta (se lista solo ese nivel)."""
+        self.current_prefix = prefix
+        self.search_query = ""
+        return FilesState.load_files
+    
+    def go_to_prefix(self, prefix: str):
+        """Volver a una carpeta superior desde las migas de pan."""
+        return self.open_folder(prefix)
+    
+    def toggle_folder_view(self, value: bool):
+        """Alternar entre la vista por carpetas y el listado plano."""
+        self.folder_view = value
+        return FilesState.load_files
+    
+    @rx.var
+    def breadcrumbs(self) -> List[dict]:
+        """Ruta de la carpeta actual, desde la raíz del bucket."""
+        crumbs = [{'name': self.selected_bucket, 'prefix': ""}]
+        path = ""
+        for part in self.current_prefix.strip("/").split("/"):
+            if not part:
+                continue
+            path += part + "/"
+            crumbs.append({'name': part, 'prefix': path})
+        return crumbs
     
     def set_search_query(self, query: str):
         """Actualizar búsqueda."""
         self.search_query = query
+        return FilesState.run_search
+    
+    def set_search_scope(self, scope: str):
+        """Elegir dónde buscar: la carpeta actual, el bucket o todos los buckets del rol."""
+        self.search_scope = scope
+        return FilesState.run_search
+    
+    def set_search_sort(self, sort: str):
+        """Elegir el orden de los resultados de búsqueda."""
+        self.search_sort = sort
+        return FilesState.run_search
+    
+    @rx.event(background=True)
+    async def run_search(self):
+        """
+        Buscar en el catálogo local en lugar de filtrar solo lo ya listado.
+        
+        La consulta usa el índice de texto, así que encuentra archivos de
+        subcarpetas y de páginas no cargadas. Mientras un bucket se cataloga
+        por primera vez se muestra el filtro sobre lo cargado y se vuelve a
+        consultar cada pocos segundos.
+        """
+        async with self:
+            self._search_generation += 1
+            generation = self._search_generation
+            query = self.search_query.strip()
+            if not query:
+                self.search_results = []
+                self.search_total = 0
+                self.search_pending = []
+                self.search_unavailable = []
+                self.searching = False
+                return
+            
+            self.searching = True
+            if self.search_scope == "Todos mis buckets":
+                buckets = list(self.available_buckets)
+            else:
+                buckets = [self.selected_bucket]
+            prefix = self.current_prefix if self.search_scope == "Esta carpeta" else ""
+            sort, descending = SEARCH_SORTS.get(self.search_sort, ('key', False))
+        
+        for _ in range(CATALOG_POLLS):
+            async with self:
+                if generation != self._search_generation or self.search_query.strip() != query:
+                    return
+            
+            success, result, error = await AsyncS3Manager().search_objects(
+                buckets, query, prefix=prefix, sort=sort, descending=descending, limit=SEARCH_LIMIT
+            )
+            
+            async with self:
+                if generation != self._search_generation or self.search_query.strip() != query:
+                    return
+                if not success:
+                    self.error_message = error
+                    self.searching = False
+                    return
+                self.search_results = result['results']
+                self.search_total = result['total']
+                self.search_pending = result['pending']
+                self.search_unavailable = result['unavailable']
+                self._search_buckets = len(buckets)
+                self.searching = bool(result['pending'])
+            
+            if not result['pending']:
+                return
+            await asyncio.sleep(CATALOG_POLL_INTERVAL)
+        
+        async with self:
+            if generation == self._search_generation:
+                self.searching = False
+    
+    def open_search_result(self, bucket: str, file_key: str):
+        """Ir a la carpeta de un resultado de búsqueda."""
+        self.search_query = ""
+        self.search_results = []
+        self.selected_bucket = bucket
+        self.current_prefix = file_key[:file_key.rfind("/") + 1]
+        self.error_message = ""
+        self.success_message = ""
+        return FilesState.load_files
+    
+    @rx.var
+    def show_search_results(self) -> bool:
+        """
+        La tabla de resultados reemplaza al listado cuando el catálogo está
+        listo; si ningún bucket de la búsqueda está catalogado se sigue
+        filtrando lo ya cargado.
+        """
+        return (
+            self.search_query.strip() != "" and not self.search_pending and self._search_generation > 0
+            and len(self.search_unavailable) < self._search_buckets
+        )
+    
+    @rx.var
+    def search_summary(self) -> str:
+        """Resumen de la búsqueda para mostrar sobre los resultados."""
+        if self.search_pending:
+            return f"Indexando {', '.join(self.search_pending)}... mientras tanto se filtra lo ya cargado"
+        if self.search_unavailable and len(self.search_unavailable) >= self._search_buckets:
+            return f"Sin catálogo de {', '.join(self.search_unavailable)}: se filtra lo ya cargado"
+        if self.search_unavailable:
+            return f"{self.search_total} coincidencias (sin catálogo de {', '.join(self.search_unavailable)})"
+        if self.search_total > SEARCH_COUNT_LIMIT:
+            return f"Más de {SEARCH_COUNT_LIMIT} coincidencias; se muestran las primeras {len(self.search_results)}"
+        if self.search_total > len(self.search_results):
+            return f"{self.search_total} coincidencias; se muestran las primeras {len(self.search_results)}"
+        return f"{self.search_total} coincidencias"
+    
+    @rx.var
+    def filtered_folders(self) -> List[dict]:
+        """Filtrar carpetas según búsqueda."""
+        if not self.search_query:
+            return self.folders
+        
+        query = self.search_query.lower()
+        return [
+            f for f in self.folders
+            if query in f['name'].lower()
+        ]
+    
+    @rx.var
+    def has_entries(self) -> bool:
+        """Indica si hay carpetas o archivos que mostrar."""
+        return len(self.filtered_folders) > 0 or len(self.filtered_files) > 0
     
     @rx.var
     def filtered_files(self) -> List[dict]:
@@ -120,9 +685,11 @@ class FilesState(rx.State):
         ]
     
     def refresh_files(self):
-        """Refrescar lista de archivos."""
+        """Refrescar lista de archivos (descarta el listado en caché)."""
         self.search_query = ""
-        self.load_files()
+        self.search_results = []
+        S3Manager.invalidate_listing_cache(self.selected_bucket)
+        return FilesState.load_files
     
     @rx.var
     def can_upload(self) -> bool:
@@ -139,6 +706,47 @@ class FilesState(rx.State):
         """Verificar si el usuario puede eliminar archivos."""
         return self.role in ['admin', 'lectura-escritura']
     
+    @rx.var
+    def selected_count(self) -> int:
+        """Número de archivos marcados para eliminar."""
+        return len(self.selected_keys)
+    
+    @rx.var
+    def all_visible_selected(self) -> bool:
+        """Indica si están marcados todos los archivos visibles."""
+        visible = self.filtered_files
+        selected = set(self.selected_keys)
+        return len(visible) > 0 and all(f['key'] in selected for f in visible)
+    
+    @rx.var
+    def delete_target(self) -> str:
+        """Descripción de lo que se va a eliminar, para el diálogo."""
+        if self.delete_prefix:
+            return f"la carpeta '{self.delete_file_name}' y todo su contenido"
+        if self.delete_file_key:
+            return f"'{self.delete_file_name}'"
+        return f"{len(self.selected_keys)} archivos seleccionados"
+    
+    @rx.var
+    def can_select(self) -> bool:
+        """Las casillas sirven para eliminar o para descargar en ZIP."""
+        return self.can_delete or self.can_download
+    
+    @rx.var
+    def can_transfer(self) -> bool:
+        """Copiar exige leer el origen y escribir en el destino."""
+        return self.can_upload and self.can_download
+    
+    @rx.var
+    def can_move(self) -> bool:
+        """Mover exige además poder eliminar el origen."""
+        return self.can_transfer and self.can_delete
+    
+    @rx.var
+    def transfer_modes(self) -> List[str]:
+        """Operaciones disponibles para el rol."""
+        return ["copiar", "mover"] if self.can_move else ["copiar"]
+    
     @rx.var
     def bucket_count(self) -> int:
         """Número de buckets disponibles."""
@@ -154,6 +762,7 @@ class FilesState(rx.State):
     def open_upload_dialog(self):
         """Abrir diálogo de upload."""
         self.show_upload_dialog = True
+        self.upload_progress = []
         self.error_message = ""
         self.success_message = ""
     
@@ -162,50 +771,107 @@ class FilesState(rx.State):
         self.show_upload_dialog = False
     
     async def handle_upload(self, files: list[rx.UploadFile]):
-        """Manejar upload de archivos."""
+        """
+        Subir todos los archivos seleccionados en paralelo.
+        
+        Como máximo se suben MAX_PARALLEL_UPLOADS archivos a la vez. El progreso
+        de cada uno se envía al navegador periódicamente y el listado se
+        recarga una sola vez, al terminar el lote.
+        
+        Reflex no admite tareas en segundo plano como handler de subida, así
+        que este handler solo espera: cada subida corre en el pool de S3 y el
+        event loop sigue atendiendo a las demás sesiones.
+        """
         if not files or len(files) == 0:
             self.error_message = "No se seleccionó ningún archivo"
             return
         
+        if not self.can_upload or self.selected_bucket not in self.available_buckets:
+            self.error_message = "No tienes permisos para subir archivos a este bucket"
+            return
+        
         self.upload_loading = True
         self.error_message = ""
         self.success_message = ""
         
+        bucket = self.selected_bucket
+        prefix = self.current_prefix
+        
+        # Los hilos de subida solo escriben en estas listas; el estado de
+        # Reflex se actualiza desde este handler
+        sent = [0] * len(files)
+        status = ["pendiente"] * len(files)
+        errors = [""] * len(files)
+        sizes = [f.size or 0 for f in files]
+        
+        semaphore = asyncio.Semaphore(MAX_PARALLEL_UPLOADS)
+        
+        async def upload_one(index: int, uploaded_file: rx.UploadFile):
+            async with semaphore:
+                status[index] = "subiendo"
+                
+                def on_progress(done: int):
+                    sent[index] = done
+                
+                try:
+                    success, outcome, error = await AsyncS3Manager().store_fileobj(
+                        uploaded_file.file,
+                        bucket,
+                        prefix + uploaded_file.filename,
+                        uploaded_file.content_type,
+                        uploaded_file.size,
+                        on_progress
+                    )
+                except Exception as e:
+                    success, outcome, error = False, None, f"Error: {str(e)}"
+                
+                if not success:
+                    status[index] = "error"
+                elif outcome == 'uploaded':
+                    status[index] = "completado"
+                else:
+                    # El contenido ya estaba en S3: no se transfirió
+                    status[index] = "ya almacenado"
+                errors[index] = error or ""
+        
+        self._set_upload_progress(files, sizes, sent, status, errors)
+        yield
+        
         try:
-            uploaded_file = files[0]
-            
-            # Subir a S3
-            s3 = S3Manager()
+            pending = {
+                asyncio.create_task(upload_one(i, f))
+                for i, f in enumerate(files)
+            }
+            while pending:
+                _, pending = await asyncio.wait(pending, timeout=UPLOAD_PROGRESS_INTERVAL)
+                self._set_upload_progress(files, sizes, sent, status, errors)
+                yield
             
-            # Leer contenido del archivo
-            content = await uploaded_file.read()
+            stored = status.count("ya almacenado")
+            uploaded = status.count("completado") + stored
+            failed = len(files) - uploaded
             
-            # Guardar temporalmente
-            import tempfile
-            import os
+            if failed == 0:
+                if len(files) == 1 and stored:
+                    self.success_message = f"El archivo '{files[0].filename}' ya estaba almacenado"
+                elif len(files) == 1:
+                    self.success_message = f"Archivo '{files[0].filename}' subido exitosamente"
+                else:
+                    self.success_message = f"{uploaded} archivos subidos exitosamente"
+                self.close_upload_dialog()
+            else:
+                self.error_message = f"{failed} de {len(files)} archivos no se pudieron subir"
+                if uploaded:
+                    self.success_message = f"{uploaded} archivos subidos exitosamente"
             
-            with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                tmp_file.write(content)
-                tmp_path = tmp_file.name
+            if stored and len(files) > 1:
+                self.success_message += f" ({stored} ya estaban almacenados)"
             
-            try:
-                # Subir a S3
-                success, error = s3.upload_file(
-                    file_path=tmp_path,
-                    bucket_name=self.selected_bucket,
-                    object_key=uploaded_file.filename
-                )
-                
-                if success:
-                    self.success_message = f"Archivo '{uploaded_file.filename}' subido exitosamente"
-                    self.close_upload_dialog()
-                    self.load_files()
-                else:
-                    self.error_message = error
-            finally:
-                # Limpiar archivo temporal
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
+            # Un solo refresco del listado para todo el lote
+            if uploaded:
+                yield FilesState.load_files
+            if failed == 0:
+                yield rx.clear_selected_files("upload_file")
         
         except Exception as e:
             self.error_message = f"Error: {str(e)}"
@@ -213,82 +879,730 @@ class FilesState(rx.State):
         finally:
             self.upload_loading = False
     
-    # === FUNCIONES: DOWNLOAD ===
+    def _set_upload_progress(self, files, sizes, sent, status, errors):
+        """Copiar el progreso de las subidas en curso al estado de la página."""
+        self.upload_progress = [
+            {
+                'name': f.filename,
+                'percent': 100 if status[i] in ("completado", "ya almacenado") else (
+                    int(sent[i] * 100 / sizes[i]) if sizes[i] else 0
+                ),
+                'status': status[i],
+                'error': errors[i],
+            }
+            for i, f in enumerate(files)
+        ]
     
-    def download_file(self, file_key: str, file_name: str):
-        """Descargar un archivo."""
+    # === FUNCIONES: SUBIDA DIRECTA ===
+    
+    def start_direct_upload(self):
+        """Pedir al navegador la lista de archivos elegidos para subir directo a S3."""
         self.error_message = ""
         self.success_message = ""
         
-        try:
-            s3 = S3Manager()
+        if not self.can_upload:
+            self.error_message = "No tienes permisos para subir archivos"
+            return
+        
+        self.direct_upload_loading = True
+        return rx.call_script(
+            "window.cnddDirectUpload.describe('direct_upload_input')",
+            callback=FilesState.authorize_direct_upload,
+        )
+    
+    @rx.event(background=True)
+    async def authorize_direct_upload(self, selection: list[dict]):
+        """
+        Autorizar los archivos elegidos y enviar al navegador las firmas de subida.
+        
+        Args:
+            selection: Lista de {'name', 'size', 'type'} devuelta por el navegador
+        """
+        async with self:
+            if not selection:
+                self.error_message = "No se seleccionó ningún archivo"
+                self.direct_upload_loading = False
+                return
+            
+            if not self.can_upload or self.selected_bucket not in self.available_buckets:
+                self.error_message = "No tienes permisos para subir archivos a este bucket"
+                self.direct_upload_loading = False
+                return
+            
+            bucket = self.selected_bucket
+            prefix = self.current_prefix
+        
+        s3 = AsyncS3Manager()
+        results = await asyncio.gather(*[
+            s3.create_direct_upload(
+                bucket_name=bucket,
+                object_key=prefix + item['name'],
+                size=int(item['size']),
+                content_type=item.get('type') or None
+            )
+            for item in selection
+        ])
+        
+        plans = []
+        errors = []
+        for item, (success, plan, error) in zip(selection, results):
+            if success:
+                plan['name'] = item['name']
+                plans.append(plan)
+            else:
+                errors.append(f"{item['name']}: {error}")
+        
+        async with self:
+            if errors:
+                self.error_message = "; ".join(errors)
             
+            if not plans:
+                self.direct_upload_loading = False
+                return
+            
+            # Solo se completarán las subidas que este handler autorizó
+            self._pending_direct_uploads = [
+                {'bucket': bucket, 'key': plan['key'], 'upload_id': plan.get('upload_id', '')}
+                for plan in plans
+            ]
+        
+        return rx.call_script(
+            f"window.cnddDirectUpload.run('direct_upload_input', {json.dumps(plans)})",
+            callback=FilesState.finish_direct_upload,
+        )
+    
+    @rx.event(background=True)
+    async def finish_direct_upload(self, results: list[dict]):
+        """
+        Completar en S3 las subidas que el navegador terminó.
+        
+        Args:
+            results: Resultado por archivo devuelto por el navegador
+        """
+        async with self:
+            pending = {p['key']: p for p in self._pending_direct_uploads}
+            self._pending_direct_uploads = []
+        
+        s3 = AsyncS3Manager()
+        
+        async def finish_one(upload: dict, result: dict):
+            upload_id = upload['upload_id'] or None
+            if result.get('ok'):
+                return await s3.complete_direct_upload(
+                    bucket_name=upload['bucket'],
+                    object_key=upload['key'],
+                    upload_id=upload_id,
+                    parts=result.get('parts')
+                )
+            if upload_id:
+                await s3.abort_direct_upload(upload['bucket'], upload['key'], upload_id)
+            return False, result.get('error', 'Error desconocido')
+        
+        matched = [
+            (pending[result.get('key')], result)
+            for result in results or []
+            if result.get('key') in pending
+        ]
+        outcomes = await asyncio.gather(*[finish_one(upload, result) for upload, result in matched])
+        
+        uploaded = sum(1 for success, _ in outcomes if success)
+        errors = [
+            f"{upload['key'].split('/')[-1]}: {error}"
+            for (upload, _), (success, error) in zip(matched, outcomes)
+            if not success
+        ]
+        
+        async with self:
+            if uploaded:
+                self.success_message = f"{uploaded} archivos subidos directamente a S3"
+            if errors:
+                self.error_message = "; ".join(errors)
+            elif uploaded:
+                self.close_upload_dialog()
+            
+            self.direct_upload_loading = False
+        
+        if uploaded:
+            return FilesState.load_files
+    
+    # === FUNCIONES: DOWNLOAD ===
+    
+    @rx.event(background=True)
+    async def download_file(self, file_key: str, file_name: str):
+        """Descargar un archivo."""
+        async with self:
+            self.error_message = ""
+            self.success_message = ""
+            bucket = self.selected_bucket
+        
+        try:
             # Generar URL pre-firmada
-            success, url, error = s3.get_download_url(
-                bucket_name=self.selected_bucket,
+            success, url, error = await AsyncS3Manager().get_download_url(
+                bucket_name=bucket,
                 object_key=file_key,
                 expiration=300  # 5 minutos
             )
-            
-            if success:
-                self.success_message = f"Descargando '{file_name}'..."
-                # Abrir URL en nueva pestaña
-                return rx.call_script(f'window.open("{url}", "_blank")')
-            else:
+        except Exception as e:
+            success, url, error = False, None, f"Error descargando: {str(e)}"
+        
+        async with self:
+            if not success:
                 self.error_message = error
+                return
+            self.success_message = f"Descargando '{file_name}'..."
         
+        # Abrir URL en nueva pestaña
+        return rx.call_script(f'window.open("{url}", "_blank")')
+    
+    # === FUNCIONES: DESCARGA ZIP ===
+    
+    def download_selection_zip(self):
+        """Descargar los archivos marcados en un solo ZIP."""
+        if not self.can_download:
+            self.error_message = "No tienes permisos para descargar archivos"
+            return
+        
+        prefix = self.current_prefix
+        names = [k[len(prefix):] for k in self.selected_keys if k.startswith(prefix)]
+        if not names:
+            return
+        
+        folder = prefix.rstrip('/').split('/')[-1] if prefix else self.selected_bucket
+        self.success_message = f"Preparando ZIP con {len(names)} archivos..."
+        return self._submit_zip_download(prefix, names, folder)
+    
+    def download_folder_zip(self, prefix: str, name: str):
+        """Descargar una carpeta completa (con subcarpetas) en un ZIP."""
+        if not self.can_download:
+            self.error_message = "No tienes permisos para descargar archivos"
+            return
+        
+        self.success_message = f"Preparando ZIP de la carpeta '{name}'..."
+        return self._submit_zip_download(prefix, None, name)
+    
+    def _submit_zip_download(self, prefix: str, names: Optional[List[str]], archive_name: str):
+        """
+        Firmar la descarga y enviarla al backend desde un formulario oculto.
+        
+        El ZIP se arma en el servidor directamente desde S3, así que no hace
+        falta firmar una URL por archivo.
+        """
+        if self.selected_bucket not in self.available_buckets:
+            self.success_message = ""
+            self.error_message = "No tienes acceso a este bucket"
+            return
+        token = create_zip_token(self.selected_bucket, prefix, names, archive_name)
+        if token is None:
+            self.success_message = ""
+            self.error_message = "La descarga en ZIP está desactivada en este servidor"
+            return
+        self.error_message = ""
+        action = f"{rx.config.get_config().api_url}/api/zip"
+        return rx.call_script(
+            "(() => {"
+            "const form = document.createElement('form');"
+            f"form.method = 'POST'; form.action = {json.dumps(action)};"
+            "const input = document.createElement('input');"
+            f"input.type = 'hidden'; input.name = 'token'; input.value = {json.dumps(token)};"
+            "form.appendChild(input); document.body.appendChild(form);"
+            "form.submit(); form.remove();"
+            "})()"
+        )
+    
+    # === FUNCIONES: VISTA PREVIA ===
+    
+    @rx.event(background=True)
+    async def open_preview(self, file_key: str, file_name: str, etag: str):
+        """Mostrar los primeros KB de un archivo de texto, CSV o JSON."""
+        async with self:
+            if not self.can_download or self.selected_bucket not in self.available_buckets:
+                self.error_message = "No tienes permisos para ver este archivo"
+                return
+            
+            self.show_preview_dialog = True
+            self.preview_loading = True
+            self.preview_name = file_name
+            self.preview_kind = ""
+            self.preview_columns = []
+            self.preview_rows = []
+            self.preview_text = ""
+            self.preview_info = ""
+            bucket = self.selected_bucket
+        
+        try:
+            success, preview, error = await AsyncS3Manager().get_preview(bucket, file_key, etag=etag or None)
         except Exception as e:
-            self.error_message = f"Error descargando: {str(e)}"
+            success, preview, error = False, None, f"Error: {str(e)}"
+        
+        async with self:
+            self.preview_loading = False
+            if self.preview_name != file_name:
+                return
+            
+            if not success:
+                self.preview_kind = "error"
+                self.preview_text = error
+                return
+            
+            self.preview_kind = preview['kind']
+            self.preview_columns = preview['columns']
+            self.preview_rows = preview['rows']
+            self.preview_text = preview['text']
+            if preview['truncated']:
+                self.preview_info = (
+                    f"Primeros {preview['bytes_read'] // 1024} KB de "
+                    f"{round(preview['total_size'] / (1024 * 1024), 2)} MB"
+                )
+            else:
+                self.preview_info = "Archivo completo"
+    
+    def close_preview_dialog(self):
+        """Cerrar la vista previa."""
+        self.show_preview_dialog = False
     
     # === FUNCIONES: DELETE ===
     
+    def toggle_selection(self, file_key: str, checked: bool):
+        """Marcar o desmarcar un archivo para eliminarlo o descargarlo en lote."""
+        if checked and file_key not in self.selected_keys:
+            self.selected_keys = self.selected_keys + [file_key]
+        elif not checked:
+            self.selected_keys = [k for k in self.selected_keys if k != file_key]
+    
+    def toggle_select_all(self, checked: bool):
+        """Marcar o desmarcar todos los archivos visibles."""
+        visible = [f['key'] for f in self.filtered_files]
+        if checked:
+            self.selected_keys = list(dict.fromkeys(self.selected_keys + visible))
+        else:
+            visible_set = set(visible)
+            self.selected_keys = [k for k in self.selected_keys if k not in visible_set]
+    
     def open_delete_dialog(self, file_key: str, file_name: str):
         """Abrir diálogo de confirmación de eliminación."""
         self.delete_file_key = file_key
         self.delete_file_name = file_name
+        self.delete_prefix = ""
         self.show_delete_dialog = True
         self.error_message = ""
         self.success_message = ""
     
+    def open_delete_selection_dialog(self):
+        """Abrir el diálogo para eliminar los archivos marcados."""
+        if not self.selected_keys:
+            return
+        self.open_delete_dialog("", "")
+    
+    def open_delete_folder_dialog(self, prefix: str, name: str):
+        """Abrir el diálogo para eliminar una carpeta con todo su contenido."""
+        self.open_delete_dialog("", name)
+        self.delete_prefix = prefix
+    
     def close_delete_dialog(self):
         """Cerrar diálogo de eliminación."""
         self.show_delete_dialog = False
         self.delete_file_key = ""
         self.delete_file_name = ""
+        self.delete_prefix = ""
     
-    def confirm_delete(self):
-        """Confirmar y ejecutar eliminación."""
-        if not self.delete_file_key:
-            return
+    @rx.event(background=True)
+    async def confirm_delete(self):
+        """
+        Confirmar y ejecutar eliminación.
         
-        self.delete_loading = True
-        self.error_message = ""
-        self.success_message = ""
+        Según cómo se abrió el diálogo elimina un archivo, los archivos
+        marcados (en lotes de delete_objects) o una carpeta completa. Las
+        filas eliminadas se quitan de la tabla sin volver a listar el bucket.
+        """
+        async with self:
+            if self.delete_loading or not (self.delete_file_key or self.delete_prefix or self.selected_keys):
+                return
+            
+            if not self.can_delete or self.selected_bucket not in self.available_buckets:
+                self.error_message = "No tienes permisos para eliminar archivos en este bucket"
+                return
+            
+            self.delete_loading = True
+            self.error_message = ""
+            self.success_message = ""
+            
+            bucket = self.selected_bucket
+            file_key = self.delete_file_key
+            file_name = self.delete_file_name
+            prefix = self.delete_prefix
+            keys = [file_key] if file_key else list(self.selected_keys)
+        
+        s3 = AsyncS3Manager()
+        deleted = []
+        failure = ""
         
         try:
-            s3 = S3Manager()
-            success, error = s3.delete_file(
-                bucket_name=self.selected_bucket,
-                object_key=self.delete_file_key
-            )
+            if prefix:
+                success, count, errors = await s3.delete_prefix(bucket, prefix)
+                summary = f"Carpeta '{file_name}' eliminada ({count} archivos)"
+            else:
+                success, deleted, errors = await s3.delete_files(bucket, keys)
+                count = len(deleted)
+                if file_key:
+                    summary = f"Archivo '{file_name}' eliminado exitosamente"
+                else:
+                    summary = f"Se eliminaron {count} archivos"
+        except Exception as e:
+            success, count, errors, summary = False, 0, [], ""
+            failure = f"Error: {str(e)}"
+        
+        async with self:
+            self.delete_loading = False
+            
+            # Quitar de la tabla lo eliminado (si el usuario sigue en el mismo bucket)
+            if bucket == self.selected_bucket:
+                self._remove_from_listing(deleted, prefix if success else "")
+                removed = set(deleted)
+                self.selected_keys = [k for k in self.selected_keys if k not in removed]
             
             if success:
-                self.success_message = f"Archivo '{self.delete_file_name}' eliminado exitosamente"
+                self.success_message = summary
                 self.close_delete_dialog()
-                self.load_files()
+            elif errors:
+                # Errores por clave: se muestran los primeros para no saturar el aviso
+                details = "; ".join(f"{e['key']}: {e['error']}" for e in errors[:3])
+                more = f" (y {len(errors) - 3} más)" if len(errors) > 3 else ""
+                self.error_message = f"No se pudieron eliminar {len(errors)} archivos. {details}{more}"
+                if count:
+                    self.success_message = f"Se eliminaron {count} archivos"
+            else:
+                self.error_message = failure
+
+
+    # === FUNCIONES: VERSIONES Y RECUPERACIÓN ===
+    
+    def open_file_versions(self, file_key: str, file_name: str):
+        """Abrir el historial de versiones de un archivo."""
+        self.versions_key = file_key
+        self.versions_title = f"Versiones de '{file_name}'"
+        self.show_versions_dialog = True
+        return FilesState.load_versions
+    
+    def open_deleted_browser(self):
+        """Abrir la lista de archivos eliminados de la carpeta actual (y subcarpetas)."""
+        self.versions_key = ""
+        self.versions_title = f"Archivos eliminados en {self.selected_bucket}/{self.current_prefix}"
+        self.show_versions_dialog = True
+        return FilesState.load_versions
+    
+    def close_versions_dialog(self):
+        """Cerrar el diálogo de versiones."""
+        self.show_versions_dialog = False
+    
+    def toggle_deleted_selection(self, file_key: str, checked: bool):
+        """Marcar o desmarcar un archivo eliminado para recuperarlo."""
+        if checked and file_key not in self.selected_deleted:
+            self.selected_deleted = self.selected_deleted + [file_key]
+        elif not checked:
+            self.selected_deleted = [k for k in self.selected_deleted if k != file_key]
+    
+    @rx.var
+    def selected_deleted_count(self) -> int:
+        """Número de archivos eliminados marcados para recuperar."""
+        return len(self.selected_deleted)
+    
+    @rx.event(background=True)
+    async def load_versions(self):
+        """
+        Cargar la primera página del historial (se pide solo al abrir el diálogo).
+        
+        Para un archivo se listan todas sus versiones; para una carpeta solo
+        los archivos cuyo estado actual es "eliminado".
+        """
+        async with self:
+            if not self.can_delete or self.selected_bucket not in self.available_buckets:
+                return
+            self.versions_loading = True
+            self.versions = []
+            self.versions_cursor = ""
+            self.selected_deleted = []
+            bucket = self.selected_bucket
+            object_key = self.versions_key
+            prefix = self.current_prefix
+        
+        success, page, error = await AsyncS3Manager().list_versions_page(
+            bucket,
+            prefix=prefix,
+            page_size=VERSIONS_PAGE_SIZE,
+            object_key=object_key or None,
+            only_deleted=not object_key
+        )
+        
+        async with self:
+            self.versions_loading = False
+            if bucket != self.selected_bucket or object_key != self.versions_key:
+                return
+            if success:
+                self.versions = page['versions']
+                self.versions_cursor = page['next_cursor'] or ""
+            else:
+                self.error_message = error
+    
+    @rx.event(background=True)
+    async def load_more_versions(self):
+        """Cargar la siguiente página del historial."""
+        async with self:
+            if not self.can_delete or self.selected_bucket not in self.available_buckets:
+                return
+            if not self.versions_cursor or self.versions_loading:
+                return
+            self.versions_loading = True
+            bucket = self.selected_bucket
+            object_key = self.versions_key
+            prefix = self.current_prefix
+            cursor = self.versions_cursor
+        
+        success, page, error = await AsyncS3Manager().list_versions_page(
+            bucket,
+            prefix=prefix,
+            cursor=cursor,
+            page_size=VERSIONS_PAGE_SIZE,
+            object_key=object_key or None,
+            only_deleted=not object_key
+        )
+        
+        async with self:
+            self.versions_loading = False
+            if cursor != self.versions_cursor:
+                return
+            if success:
+                self.versions = self.versions + page['versions']
+                self.versions_cursor = page['next_cursor'] or ""
             else:
                 self.error_message = error
+    
+    @rx.event(background=True)
+    async def restore_version(self, version_id: str):
+        """
+        Volver a una versión del archivo abierto en el historial.
+        
+        Si la versión actual es un marcador de borrado se quita (recupera el
+        archivo sin copiar datos); si es una versión anterior se copia encima.
+        """
+        async with self:
+            if not self.can_delete or self.selected_bucket not in self.available_buckets:
+                return
+            if self.versions_action_loading:
+                return
+            row = next((v for v in self.versions if v['version_id'] == version_id), None)
+            if row is None:
+                return
+            self.versions_action_loading = True
+            self.error_message = ""
+            self.success_message = ""
+            bucket = self.selected_bucket
+        
+        s3 = AsyncS3Manager()
+        if row['is_delete_marker']:
+            success, _, errors = await s3.remove_delete_markers(bucket, [row])
+            summary = f"Se recuperó '{row['name']}'"
+        else:
+            success, _, errors = await s3.restore_versions(bucket, [row])
+            summary = f"Se restauró la versión del {row['last_modified']} de '{row['name']}'"
+        
+        async with self:
+            self.versions_action_loading = False
+            if success:
+                self.success_message = summary
+            else:
+                self.error_message = f"No se pudo restaurar: {errors[0]['error']}"
+        return [FilesState.load_versions, FilesState.load_files]
+    
+    @rx.event(background=True)
+    async def undelete_selected(self):
+        """Recuperar los archivos eliminados marcados en el diálogo."""
+        async with self:
+            if not self.can_delete or self.selected_bucket not in self.available_buckets:
+                return
+            if self.versions_action_loading or not self.selected_deleted:
+                return
+            wanted = set(self.selected_deleted)
+            markers = [v for v in self.versions if v['key'] in wanted and v['is_delete_marker']]
+            self.versions_action_loading = True
+            self.error_message = ""
+            self.success_message = ""
+            bucket = self.selected_bucket
+        
+        success, restored, errors = await AsyncS3Manager().remove_delete_markers(bucket, markers)
+        
+        async with self:
+            self.versions_action_loading = False
+            self._set_restore_message(len(restored), errors)
+        return [FilesState.load_versions, FilesState.load_files]
+    
+    @rx.event(background=True)
+    async def undelete_folder(self):
+        """
+        Recuperar todo lo eliminado en la carpeta actual y sus subcarpetas.
+        
+        Es una sola operación del servidor (listado del historial y lotes de
+        delete_objects en paralelo), sin importar cuántos archivos sean.
+        """
+        async with self:
+            if not self.can_delete or self.selected_bucket not in self.available_buckets:
+                return
+            if self.versions_action_loading:
+                return
+            self.versions_action_loading = True
+            self.error_message = ""
+            self.success_message = ""
+            bucket = self.selected_bucket
+            prefix = self.current_prefix
+        
+        success, count, errors = await AsyncS3Manager().undelete_prefix(bucket, prefix)
+        
+        async with self:
+            self.versions_action_loading = False
+            self._set_restore_message(count, errors)
+            if success:
+                self.show_versions_dialog = False
+        return FilesState.load_files
+    
+    def _set_restore_message(self, count: int, errors: List[dict]):
+        """Mensaje con el resultado de una recuperación en lote."""
+        if count:
+            self.success_message = f"Se recuperaron {count} archivos"
+        elif not errors:
+            self.success_message = "No había archivos eliminados que recuperar"
+        if errors:
+            details = "; ".join(f"{e['key']}: {e['error']}" for e in errors[:3])
+            more = f" (y {len(errors) - 3} más)" if len(errors) > 3 else ""
+            self.error_message = f"No se pudieron recuperar {len(errors)} archivos. {details}{more}"
+    
+    # === FUNCIONES: COPIAR / MOVER ===
+    
+    def open_transfer_dialog(self, file_key: str, file_name: str):
+        """Abrir el diálogo para copiar o mover un archivo."""
+        self.transfer_source_key = file_key
+        self.transfer_source_prefix = ""
+        self.transfer_name = file_name
+        self.transfer_mode = "copiar"
+        self.transfer_bucket = self.selected_bucket
+        self.transfer_prefix = self.current_prefix
+        self.show_transfer_dialog = True
+        self.error_message = ""
+        self.success_message = ""
+    
+    def open_transfer_folder_dialog(self, prefix: str, name: str):
+        """Abrir el diálogo para copiar o mover una carpeta completa."""
+        self.open_transfer_dialog("", name)
+        self.transfer_source_prefix = prefix
+    
+    def close_transfer_dialog(self):
+        """Cerrar el diálogo de copiar / mover."""
+        self.show_transfer_dialog = False
+    
+    def set_transfer_mode(self, mode: str):
+        """Elegir entre copiar y mover."""
+        self.transfer_mode = mode
+    
+    def set_transfer_bucket(self, bucket: str):
+        """Elegir el bucket de destino."""
+        self.transfer_bucket = bucket
+    
+    def set_transfer_prefix(self, prefix: str):
+        """Escribir la carpeta de destino."""
+        self.transfer_prefix = prefix
+    
+    @rx.event(background=True)
+    async def confirm_transfer(self):
+        """
+        Copiar o mover el archivo o la carpeta elegidos sin descargarlos.
+        
+        Solo se permite entre buckets a los que el rol tiene acceso de
+        escritura; mover exige además permiso para eliminar en el origen.
+        """
+        async with self:
+            if self.transfer_loading:
+                return
+            
+            move = self.transfer_mode == "mover"
+            allowed = self.can_move if move else self.can_transfer
+            if not allowed or self.transfer_bucket not in self.available_buckets \
+                    or self.selected_bucket not in self.available_buckets:
+                self.error_message = "No tienes permisos para copiar o mover entre estos buckets"
+                return
+            
+            self.transfer_loading = True
+            self.error_message = ""
+            self.success_message = ""
+            
+            source_bucket = self.selected_bucket
+            source_key = self.transfer_source_key
+            source_prefix = self.transfer_source_prefix
+            dest_bucket = self.transfer_bucket
+            dest_prefix = self.transfer_prefix.strip().lstrip("/")
+            if dest_prefix and not dest_prefix.endswith("/"):
+                dest_prefix += "/"
+            name = self.transfer_name
         
+        s3 = AsyncS3Manager()
+        verb = "movid" if move else "copiad"
+        errors = []
+        
+        try:
+            if source_prefix:
+                folder_name = source_prefix.rstrip("/").split("/")[-1] + "/"
+                operation = s3.move_prefix if move else s3.copy_prefix
+                success, count, errors = await operation(
+                    source_bucket, source_prefix, dest_bucket, dest_prefix + folder_name
+                )
+                summary = f"Carpeta '{name}' {verb}a a {dest_bucket}/{dest_prefix} ({count} archivos)"
+            else:
+                operation = s3.move_file if move else s3.copy_file
+                success, error = await operation(source_bucket, source_key, dest_bucket, dest_prefix + name)
+                if error:
+                    errors = [{'key': source_key, 'error': error}]
+                summary = f"Archivo '{name}' {verb}o a {dest_bucket}/{dest_prefix}"
         except Exception as e:
-            self.error_message = f"Error: {str(e)}"
+            success, summary = False, ""
+            errors = [{'key': source_key or source_prefix, 'error': f"Error: {str(e)}"}]
         
-        finally:
-            self.delete_loading = False
+        async with self:
+            self.transfer_loading = False
+            if success:
+                self.show_transfer_dialog = False
+                self.success_message = summary
+                # Lo movido desaparece de la tabla sin volver a listar el bucket
+                if move and source_bucket == self.selected_bucket:
+                    self._remove_from_listing([] if source_prefix else [source_key], source_prefix)
+            else:
+                details = "; ".join(f"{e['key']}: {e['error']}" for e in errors[:3])
+                more = f" (y {len(errors) - 3} más)" if len(errors) > 3 else ""
+                self.error_message = f"No se pudo completar la operación. {details}{more}"
+
+
+def sort_header(icon: str, label: str, column: str) -> rx.Component:
+    """Cabecera de columna que ordena el listado al hacer clic (con flecha si es la actual)."""
+    return rx.hstack(
+        rx.icon(icon, size=16),
+        rx.text(label),
+        rx.cond(
+            FilesState.paged_listing & (FilesState.sort_column == column),
+            rx.cond(
+                FilesState.sort_descending,
+                rx.icon("arrow-down", size=14),
+                rx.icon("arrow-up", size=14),
+            ),
+        ),
+        spacing="2",
+        align="center",
+        cursor="pointer",
+        on_click=FilesState.set_sort(column),
+    )
 
 
 def files_page() -> rx.Component:
     """Página de gestión de archivos."""
     return rx.fragment(
+        # Subida directa del navegador a S3 (assets/direct_upload.js)
+        rx.script(src="/direct_upload.js"),
+        
         rx.vstack(
             # Navbar
             navbar("Gestión de Archivos"),
@@ -350,11 +1664,27 @@ def files_page() -> rx.Component:
                             # Barra de búsqueda
                             rx.vstack(
                                 rx.text("Buscar:", size="2", weight="medium"),
-                                rx.input(
-                                    placeholder="Buscar archivos por nombre...",
-                                    value=FilesState.search_query,
-                                    on_change=FilesState.set_search_query,
-                                    size="3",
+                                rx.hstack(
+                                    rx.input(
+                                        placeholder="Buscar archivos por nombre o ruta...",
+                                        value=FilesState.search_query,
+                                        on_change=FilesState.set_search_query.debounce(300),
+                                        size="3",
+                                        width="100%",
+                                    ),
+                                    rx.select(
+                                        ["Esta carpeta", "Este bucket", "Todos mis buckets"],
+                                        value=FilesState.search_scope,
+                                        on_change=FilesState.set_search_scope,
+                                        size="3",
+                                    ),
+                                    rx.select(
+                                        ["Nombre", "Más grandes", "Más recientes"],
+                                        value=FilesState.search_sort,
+                                        on_change=FilesState.set_search_sort,
+                                        size="3",
+                                    ),
+                                    spacing="2",
                                     width="100%",
                                 ),
                                 align="start",
@@ -388,6 +1718,51 @@ def files_page() -> rx.Component:
                                             size="3",
                                         ),
                                     ),
+                                    rx.cond(
+                                        FilesState.can_delete,
+                                        rx.tooltip(
+                                            rx.button(
+                                                rx.hstack(
+                                                    rx.icon("archive-restore", size=18),
+                                                    rx.text("Eliminados"),
+                                                    spacing="2",
+                                                ),
+                                                on_click=FilesState.open_deleted_browser,
+                                                variant="soft",
+                                                color_scheme="gray",
+                                                size="3",
+                                            ),
+                                            content="Ver y recuperar lo eliminado en esta carpeta",
+                                        ),
+                                    ),
+                                    rx.cond(
+                                        FilesState.can_download & (FilesState.selected_count > 0),
+                                        rx.button(
+                                            rx.hstack(
+                                                rx.icon("file-archive", size=18),
+                                                rx.text(f"Descargar ZIP ({FilesState.selected_count})"),
+                                                spacing="2",
+                                            ),
+                                            on_click=FilesState.download_selection_zip,
+                                            color_scheme="green",
+                                            variant="soft",
+                                            size="3",
+                                        ),
+                                    ),
+                                    rx.cond(
+                                        FilesState.can_delete & (FilesState.selected_count > 0),
+                                        rx.button(
+                                            rx.hstack(
+                                                rx.icon("trash-2", size=18),
+                                                rx.text(f"Eliminar seleccionados ({FilesState.selected_count})"),
+                                                spacing="2",
+                                            ),
+                                            on_click=FilesState.open_delete_selection_dialog,
+                                            color_scheme="red",
+                                            variant="soft",
+                                            size="3",
+                                        ),
+                                    ),
                                     spacing="2",
                                 ),
                                 align="end",
@@ -401,6 +1776,57 @@ def files_page() -> rx.Component:
                         size="2",
                     ),
                     
+                    # Migas de pan de la carpeta actual y modo de vista
+                    rx.hstack(
+                        rx.cond(
+                            FilesState.folder_view,
+                            rx.hstack(
+                                rx.icon("folder-tree", size=18, color="gray"),
+                                rx.foreach(
+                                    FilesState.breadcrumbs,
+                                    lambda crumb: rx.hstack(
+                                        rx.link(
+                                            crumb['name'],
+                                            on_click=FilesState.go_to_prefix(crumb['prefix']),
+                                            size="2",
+                                            weight="medium",
+                                            cursor="pointer",
+                                        ),
+                                        rx.text("/", size="2", color="gray"),
+                                        spacing="2",
+                                        align="center",
+                                    ),
+                                ),
+                                spacing="2",
+                                align="center",
+                                wrap="wrap",
+                            ),
+                        ),
+                        rx.spacer(),
+                        rx.hstack(
+                            rx.text("Vista por carpetas", size="2", color="gray"),
+                            rx.switch(
+                                checked=FilesState.folder_view,
+                                on_change=FilesState.toggle_folder_view,
+                            ),
+                            spacing="2",
+                            align="center",
+                        ),
+                        width="100%",
+                        align="center",
+                    ),
+                    
+                    # Uso de almacenamiento de la carpeta actual
+                    rx.cond(
+                        FilesState.usage_summary != "",
+                        rx.hstack(
+                            rx.icon("hard-drive", size=14, color="gray"),
+                            rx.text(FilesState.usage_summary, size="2", color="gray"),
+                            spacing="2",
+                            align="center",
+                        ),
+                    ),
+                    
                     # Mensajes de error/éxito
                     rx.cond(
                         FilesState.error_message != "",
@@ -434,11 +1860,106 @@ def files_page() -> rx.Component:
                         ),
                     ),
                     
+                    # Estado de la búsqueda en el catálogo
+                    rx.cond(
+                        FilesState.search_query != "",
+                        rx.hstack(
+                            rx.cond(
+                                FilesState.searching,
+                                rx.spinner(size="1"),
+                                rx.icon("search", size=14, color="gray"),
+                            ),
+                            rx.text(FilesState.search_summary, size="2", color="gray"),
+                            spacing="2",
+                            align="center",
+                        ),
+                    ),
+                    
+                    # Resultados de búsqueda (todas las subcarpetas y, si se elige, todos los buckets)
+                    rx.cond(
+                        ~FilesState.loading & FilesState.show_search_results,
+                        rx.cond(
+                            FilesState.search_results.length() > 0,
+                            rx.card(
+                                rx.box(
+                                    rx.table.root(
+                                        rx.table.header(
+                                            rx.table.row(
+                                                rx.table.column_header_cell("Bucket"),
+                                                rx.table.column_header_cell("Ruta"),
+                                                rx.table.column_header_cell("Tamaño"),
+                                                rx.table.column_header_cell("Última modificación"),
+                                                rx.table.column_header_cell("Acciones"),
+                                            ),
+                                        ),
+                                        rx.table.body(
+                                            rx.foreach(
+                                                FilesState.search_results,
+                                                lambda result: rx.table.row(
+                                                    rx.table.cell(
+                                                        rx.badge(result['bucket'], size="1", variant="soft", color_scheme="gray"),
+                                                    ),
+                                                    rx.table.cell(
+                                                        rx.vstack(
+                                                            rx.text(result['name'], weight="medium"),
+                                                            rx.text(result['key'], size="1", color="gray"),
+                                                            spacing="0",
+                                                            align="start",
+                                                        ),
+                                                    ),
+                                                    rx.table.cell(
+                                                        rx.badge(f"{result['size_mb']} MB", size="1", variant="soft"),
+                                                    ),
+                                                    rx.table.cell(
+                                                        rx.text(result['last_modified'], size="2", color="gray"),
+                                                    ),
+                                                    rx.table.cell(
+                                                        rx.tooltip(
+                                                            rx.icon_button(
+                                                                rx.icon("folder-open", size=16),
+                                                                size="1",
+                                                                variant="soft",
+                                                                on_click=FilesState.open_search_result(result['bucket'], result['key']),
+                                                            ),
+                                                            content="Abrir la carpeta del archivo",
+                                                        ),
+                                                    ),
+                                                ),
+                                            ),
+                                        ),
+                                        variant="surface",
+                                        width="100%",
+                                    ),
+                                    width="100%",
+                                    overflow_x="auto",
+                                ),
+                                size="2",
+                            ),
+                            rx.cond(
+                                ~FilesState.searching,
+                                rx.center(
+                                    rx.vstack(
+                                        rx.icon("search-x", size=64, color="gray"),
+                                        rx.heading("Sin resultados", size="5", color="gray"),
+                                        rx.text(
+                                            f"No se encontraron archivos que coincidan con '{FilesState.search_query}'",
+                                            size="3",
+                                            color="gray",
+                                        ),
+                                        spacing="4",
+                                        align="center",
+                                        padding="4rem",
+                                    ),
+                                ),
+                            ),
+                        ),
+                    ),
+                    
                     # Tabla de archivos
                     rx.cond(
-                        ~FilesState.loading,
+                        ~FilesState.loading & ~FilesState.show_search_results,
                         rx.cond(
-                            FilesState.filtered_files,
+                            FilesState.has_entries,
                             rx.card(
                                 rx.box(
                                     rx.table.root(
@@ -446,24 +1967,26 @@ def files_page() -> rx.Component:
                                             rx.table.row(
                                                 rx.table.column_header_cell(
                                                     rx.hstack(
-                                                        rx.icon("file", size=16),
-                                                        rx.text("Nombre"),
+                                                        rx.cond(
+                                                            FilesState.can_select,
+                                                            rx.checkbox(
+                                                                checked=FilesState.all_visible_selected,
+                                                                on_change=FilesState.toggle_select_all,
+                                                            ),
+                                                        ),
+                                                        sort_header("file", "Nombre", "key"),
                                                         spacing="2",
+                                                        align="center",
                                                     ),
                                                 ),
                                                 rx.table.column_header_cell(
-                                                    rx.hstack(
-                                                        rx.icon("hard-drive", size=16),
-                                                        rx.text("Tamaño"),
-                                                        spacing="2",
-                                                    ),
+                                                    sort_header("hard-drive", "Tamaño", "size"),
                                                 ),
                                                 rx.table.column_header_cell(
-                                                    rx.hstack(
-                                                        rx.icon("clock", size=16),
-                                                        rx.text("Última modificación"),
-                                                        spacing="2",
-                                                    ),
+                                                    sort_header("clock", "Última modificación", "last_modified"),
+                                                ),
+                                                rx.table.column_header_cell(
+                                                    sort_header("layers", "Clase", "storage_class"),
                                                 ),
                                                 rx.table.column_header_cell(
                                                     rx.hstack(
@@ -473,14 +1996,120 @@ def files_page() -> rx.Component:
                                                     ),
                                                 ),
                                             ),
-                                        ),
-                                        rx.table.body(
+                                        ),
+                                        rx.table.body(
+                                            rx.foreach(
+                                                FilesState.filtered_folders,
+                                                lambda folder: rx.table.row(
+                                                    rx.table.cell(
+                                                        rx.hstack(
+                                                            rx.icon("folder", size=18, color="orange"),
+                                                            rx.link(
+                                                                folder['name'],
+                                                                on_click=FilesState.open_folder(folder['prefix']),
+                                                                weight="medium",
+                                                                cursor="pointer",
+                                                            ),
+                                                            spacing="2",
+                                                            align="center",
+                                                        ),
+                                                    ),
+                                                    rx.table.cell(
+                                                        rx.cond(
+                                                            folder.contains('size_mb'),
+                                                            rx.tooltip(
+                                                                rx.badge(
+                                                                    f"{folder['size_mb']} MB",
+                                                                    size="1",
+                                                                    variant="soft",
+                                                                    color_scheme="orange",
+                                                                ),
+                                                                content=f"{folder['file_count']} archivos",
+                                                            ),
+                                                            rx.text("—", size="2", color="gray"),
+                                                        ),
+                                                    ),
+                                                    rx.table.cell(rx.text("—", size="2", color="gray")),
+                                                    rx.table.cell(rx.text("—", size="2", color="gray")),
+                                                    rx.table.cell(
+                                                        rx.hstack(
+                                                            rx.tooltip(
+                                                                rx.icon_button(
+                                                                    rx.icon("folder-open", size=16),
+                                                                    size="1",
+                                                                    variant="soft",
+                                                                    on_click=FilesState.open_folder(folder['prefix']),
+                                                                ),
+                                                                content="Abrir carpeta",
+                                                            ),
+                                                            rx.cond(
+                                                                FilesState.can_download,
+                                                                rx.tooltip(
+                                                                    rx.icon_button(
+                                                                        rx.icon("file-archive", size=16),
+                                                                        size="1",
+                                                                        variant="soft",
+                                                                        color_scheme="green",
+                                                                        on_click=FilesState.download_folder_zip(folder['prefix'], folder['name']),
+                                                                    ),
+                                                                    content="Descargar carpeta en ZIP",
+                                                                ),
+                                                            ),
+                                                            rx.cond(
+                                                                FilesState.can_transfer,
+                                                                rx.tooltip(
+                                                                    rx.icon_button(
+                                                                        rx.icon("copy", size=16),
+                                                                        size="1",
+                                                                        variant="soft",
+                                                                        color_scheme="violet",
+                                                                        on_click=FilesState.open_transfer_folder_dialog(folder['prefix'], folder['name']),
+                                                                    ),
+                                                                    content="Copiar o mover carpeta",
+                                                                ),
+                                                            ),
+                                                            rx.cond(
+                                                                FilesState.can_delete,
+                                                                rx.tooltip(
+                                                                    rx.icon_button(
+                                                                        rx.icon("trash-2", size=16),
+                                                                        size="1",
+                                                                        variant="soft",
+                                                                        color_scheme="red",
+                                                                        on_click=FilesState.open_delete_folder_dialog(folder['prefix'], folder['name']),
+                                                                    ),
+                                                                    content="Eliminar carpeta",
+                                                                ),
+                                                            ),
+                                                            spacing="2",
+                                                        ),
+                                                    ),
+                                                ),
+                                            ),
                                             rx.foreach(
                                                 FilesState.filtered_files,
                                                 lambda file: rx.table.row(
                                                     rx.table.cell(
                                                         rx.hstack(
-                                                            rx.icon("file-text", size=18, color="blue"),
+                                                            rx.cond(
+                                                                FilesState.can_select,
+                                                                rx.checkbox(
+                                                                    checked=FilesState.selected_keys.contains(file['key']),
+                                                                    on_change=lambda checked: FilesState.toggle_selection(file['key'], checked),
+                                                                ),
+                                                            ),
+                                                            rx.cond(
+                                                                file.contains('thumbnail_url'),
+                                                                rx.image(
+                                                                    src=file['thumbnail_url'],
+                                                                    width="32px",
+                                                                    height="32px",
+                                                                    object_fit="cover",
+                                                                    border_radius="4px",
+                                                                    loading="lazy",
+                                                                ),
+                                                                rx.icon("file-text", size=18, color="blue"),
+                                                            ),
                                                             rx.text(
                                                                 file['name'],
                                                                 weight="medium",
@@ -503,19 +2132,80 @@ def files_page() -> rx.Component:
                                                             color="gray",
                                                         ),
                                                     ),
+                                                    rx.table.cell(
+                                                        rx.badge(
+                                                            file['storage_class'],
+                                                            size="1",
+                                                            variant="outline",
+                                                            color_scheme="gray",
+                                                        ),
+                                                    ),
                                                     rx.table.cell(
                                                         rx.hstack(
+                                                            rx.cond(
+                                                                FilesState.can_download,
+                                                                rx.tooltip(
+                                                                    rx.cond(
+                                                                        file.contains('download_url'),
+                                                                        # Enlace prefirmado: el clic va directo a S3
+                                                                        rx.link(
+                                                                            rx.icon_button(
+                                                                                rx.icon("download", size=16),
+                                                                                size="1",
+                                                                                variant="soft",
+                                                                                color_scheme="blue",
+                                                                            ),
+                                                                            href=file['download_url'],
+                                                                            is_external=True,
+                                                                        ),
+                                                                        rx.icon_button(
+                                                                            rx.icon("download", size=16),
+                                                                            size="1",
+                                                                            variant="soft",
+                                                                            color_scheme="blue",
+                                                                            on_click=FilesState.download_file(file['key'], file['name']),
+                                                                        ),
+                                                                    ),
+                                                                    content="Descargar archivo",
+                                                                ),
+                                                            ),
                                                             rx.cond(
                                                                 FilesState.can_download,
                                                                 rx.tooltip(
                                                                     rx.icon_button(
-                                                                        rx.icon("download", size=16),
+                                                                        rx.icon("eye", size=16),
                                                                         size="1",
                                                                         variant="soft",
-                                                                        color_scheme="blue",
-                                                                        on_click=FilesState.download_file(file['key'], file['name']),
+                                                                        color_scheme="gray",
+                                                                        on_click=FilesState.open_preview(file['key'], file['name'], file['etag']),
                                                                     ),
-                                                                    content="Descargar archivo",
+                                                                    content="Vista previa",
+                                                                ),
+                                                            ),
+                                                            rx.cond(
+                                                                FilesState.can_delete,
+                                                                rx.tooltip(
+                                                                    rx.icon_button(
+                                                                        rx.icon("history", size=16),
+                                                                        size="1",
+                                                                        variant="soft",
+                                                                        color_scheme="gray",
+                                                                        on_click=FilesState.open_file_versions(file['key'], file['name']),
+                                                                    ),
+                                                                    content="Versiones anteriores",
+                                                                ),
+                                                            ),
+                                                            rx.cond(
+                                                                FilesState.can_transfer,
+                                                                rx.tooltip(
+                                                                    rx.icon_button(
+                                                                        rx.icon("copy", size=16),
+                                                                        size="1",
+                                                                        variant="soft",
+                                                                        color_scheme="violet",
+                                                                        on_click=FilesState.open_transfer_dialog(file['key'], file['name']),
+                                                                    ),
+                                                                    content="Copiar o mover archivo",
                                                                 ),
                                                             ),
                                                             rx.cond(
@@ -543,6 +2233,33 @@ def files_page() -> rx.Component:
                                     width="100%",
                                     overflow_x="auto",
                                 ),
+                                rx.cond(
+                                    FilesState.has_previous_page | FilesState.has_next_page,
+                                    rx.center(
+                                        rx.hstack(
+                                            rx.button(
+                                                rx.icon("chevron-left", size=18),
+                                                rx.text("Anterior"),
+                                                on_click=FilesState.previous_page,
+                                                disabled=~FilesState.has_previous_page,
+                                                variant="soft",
+                                                size="2",
+                                            ),
+                                            rx.text(FilesState.page_label, size="2", color="gray"),
+                                            rx.button(
+                                                rx.text("Siguiente"),
+                                                rx.icon("chevron-right", size=18),
+                                                on_click=FilesState.next_page,
+                                                disabled=~FilesState.has_next_page,
+                                                variant="soft",
+                                                size="2",
+                                            ),
+                                            spacing="3",
+                                            align="center",
+                                        ),
+                                        padding_top="1rem",
+                                    ),
+                                ),
                                 size="2",
                             ),
                             # Estado vacío
@@ -558,7 +2275,11 @@ def files_page() -> rx.Component:
                                         rx.cond(
                                             FilesState.search_query != "",
                                             f"No se encontraron archivos que coincidan con '{FilesState.search_query}'",
-                                            "Este bucket está vacío",
+                                            rx.cond(
+                                                FilesState.current_prefix != "",
+                                                "Esta carpeta está vacía",
+                                                "Este bucket está vacío",
+                                            ),
                                         ),
                                         size="3",
                                         color="gray",
@@ -587,9 +2308,9 @@ def files_page() -> rx.Component:
         # Diálogo de Upload
         rx.dialog.root(
             rx.dialog.content(
-                rx.dialog.title("Subir Archivo"),
+                rx.dialog.title("Subir Archivos"),
                 rx.dialog.description(
-                    f"Selecciona un archivo para subir a {FilesState.selected_bucket}"
+                    f"Selecciona uno o varios archivos para subir a {FilesState.selected_bucket}/{FilesState.current_prefix}"
                 ),
                 
                 rx.vstack(
@@ -598,13 +2319,13 @@ def files_page() -> rx.Component:
                             rx.button(
                                 rx.hstack(
                                     rx.icon("upload", size=20),
-                                    rx.text("Seleccionar archivo"),
+                                    rx.text("Seleccionar archivos"),
                                     spacing="2",
                                 ),
                                 size="3",
                             ),
                             rx.text(
-                                "Arrastra un archivo aquí o haz clic para seleccionar",
+                                "Arrastra archivos aquí o haz clic para seleccionar",
                                 size="2",
                                 color="gray",
                             ),
@@ -612,11 +2333,61 @@ def files_page() -> rx.Component:
                             align="center",
                         ),
                         id="upload_file",
+                        multiple=True,
                         border="2px dashed var(--gray-7)",
                         padding="2rem",
                         border_radius="8px",
                     ),
                     
+                    # Archivos seleccionados (antes de subir) o progreso de cada uno
+                    rx.cond(
+                        FilesState.upload_progress,
+                        rx.vstack(
+                            rx.foreach(
+                                FilesState.upload_progress,
+                                lambda item: rx.vstack(
+                                    rx.hstack(
+                                        rx.text(item['name'], size="2", weight="medium", trim="both"),
+                                        rx.spacer(),
+                                        rx.badge(
+                                            item['status'],
+                                            size="1",
+                                            variant="soft",
+                                            color_scheme=rx.match(
+                                                item['status'],
+                                                ("completado", "green"),
+                                                ("ya almacenado", "green"),
+                                                ("error", "red"),
+                                                "blue",
+                                            ),
+                                        ),
+                                        width="100%",
+                                        align="center",
+                                    ),
+                                    rx.progress(value=item['percent'], width="100%"),
+                                    rx.cond(
+                                        item['error'] != "",
+                                        rx.text(item['error'], size="1", color="red"),
+                                    ),
+                                    spacing="1",
+                                    width="100%",
+                                ),
+                            ),
+                            spacing="3",
+                            width="100%",
+                            max_height="240px",
+                            overflow_y="auto",
+                        ),
+                        rx.vstack(
+                            rx.foreach(
+                                rx.selected_files("upload_file"),
+                                lambda name: rx.text(name, size="2", color="gray"),
+                            ),
+                            spacing="1",
+                            width="100%",
+                        ),
+                    ),
+                    
                     rx.hstack(
                         rx.dialog.close(
                             rx.button(
@@ -639,6 +2410,7 @@ def files_page() -> rx.Component:
                             on_click=lambda: FilesState.handle_upload(
                                 rx.upload_files(upload_id="upload_file")
                             ),
+                            disabled=FilesState.upload_loading,
                         ),
                         spacing="2",
                         justify="end",
@@ -646,6 +2418,47 @@ def files_page() -> rx.Component:
                         margin_top="1rem",
                     ),
                     
+                    # Subida directa: los bytes van del navegador a S3 sin pasar por el backend
+                    rx.divider(),
+                    rx.vstack(
+                        rx.text("Subida directa a S3", size="2", weight="medium"),
+                        rx.text(
+                            "Recomendada para archivos grandes: se sube en partes paralelas sin pasar por el servidor",
+                            size="1",
+                            color="gray",
+                        ),
+                        rx.hstack(
+                            rx.el.input(
+                                type="file",
+                                id="direct_upload_input",
+                                multiple=True,
+                            ),
+                            rx.spacer(),
+                            rx.button(
+                                rx.cond(
+                                    FilesState.direct_upload_loading,
+                                    rx.hstack(
+                                        rx.spinner(size="2"),
+                                        rx.text("Subiendo..."),
+                                        spacing="2",
+                                    ),
+                                    rx.hstack(
+                                        rx.icon("cloud-upload", size=18),
+                                        rx.text("Subir directo"),
+                                        spacing="2",
+                                    ),
+                                ),
+                                on_click=FilesState.start_direct_upload,
+                                disabled=FilesState.direct_upload_loading,
+                                variant="soft",
+                            ),
+                            width="100%",
+                            align="center",
+                        ),
+                        spacing="2",
+                        width="100%",
+                    ),
+                    
                     spacing="4",
                     width="100%",
                 ),
@@ -658,7 +2471,7 @@ def files_page() -> rx.Component:
             rx.dialog.content(
                 rx.dialog.title("Confirmar Eliminación"),
                 rx.dialog.description(
-                    f"¿Estás seguro de que deseas eliminar '{FilesState.delete_file_name}'? Esta acción no se puede deshacer."
+                    f"¿Estás seguro de que deseas eliminar {FilesState.delete_target}? Esta acción no se puede deshacer."
                 ),
                 
                 rx.hstack(
@@ -695,4 +2508,315 @@ def files_page() -> rx.Component:
             ),
             open=FilesState.show_delete_dialog,
         ),
+        
+        # Diálogo de Vista previa
+        rx.dialog.root(
+            rx.dialog.content(
+                rx.dialog.title(FilesState.preview_name),
+                rx.dialog.description(
+                    rx.text(FilesState.preview_info, size="2", color="gray"),
+                ),
+                
+                rx.box(
+                    rx.cond(
+                        FilesState.preview_loading,
+                        rx.center(rx.spinner(size="3"), padding="2rem"),
+                        rx.match(
+                            FilesState.preview_kind,
+                            (
+                                "table",
+                                rx.table.root(
+                                    rx.table.header(
+                                        rx.table.row(
+                                            rx.foreach(
+                                                FilesState.preview_columns,
+                                                lambda column: rx.table.column_header_cell(column),
+                                            ),
+                                        ),
+                                    ),
+                                    rx.table.body(
+                                        rx.foreach(
+                                            FilesState.preview_rows,
+                                            lambda row: rx.table.row(
+                                                rx.foreach(
+                                                    row,
+                                                    lambda value: rx.table.cell(rx.text(value, size="1")),
+                                                ),
+                                            ),
+                                        ),
+                                    ),
+                                    size="1",
+                                    variant="surface",
+                                ),
+                            ),
+                            (
+                                "text",
+                                rx.code_block(
+                                    FilesState.preview_text,
+                                    wrap_long_lines=True,
+                                    width="100%",
+                                ),
+                            ),
+                            (
+                                "error",
+                                rx.callout(
+                                    FilesState.preview_text,
+                                    icon="triangle-alert",
+                                    color_scheme="red",
+                                ),
+                            ),
+                            rx.callout(
+                                "Vista previa no disponible para este tipo de archivo",
+                                icon="info",
+                                color_scheme="gray",
+                                variant="soft",
+                            ),
+                        ),
+                    ),
+                    max_height="60vh",
+                    overflow="auto",
+                    margin_top="1rem",
+                ),
+                
+                rx.hstack(
+                    rx.dialog.close(
+                        rx.button(
+                            "Cerrar",
+                            variant="soft",
+                            color_scheme="gray",
+                            on_click=FilesState.close_preview_dialog,
+                        ),
+                    ),
+                    justify="end",
+                    width="100%",
+                    margin_top="1rem",
+                ),
+                max_width="900px",
+            ),
+            open=FilesState.show_preview_dialog,
+        ),
+        
+        # Diálogo de Copiar / Mover
+        rx.dialog.root(
+            rx.dialog.content(
+                rx.dialog.title("Copiar o mover"),
+                rx.dialog.description(
+                    f"'{FilesState.transfer_name}' se copia dentro de S3, sin descargarlo."
+                ),
+                
+                rx.vstack(
+                    rx.text("Operación:", size="2", weight="medium"),
+                    rx.select(
+                        FilesState.transfer_modes,
+                        value=FilesState.transfer_mode,
+                        on_change=FilesState.set_transfer_mode,
+                        width="100%",
+                    ),
+                    rx.text("Bucket de destino:", size="2", weight="medium"),
+                    rx.select(
+                        FilesState.available_buckets,
+                        value=FilesState.transfer_bucket,
+                        on_change=FilesState.set_transfer_bucket,
+                        width="100%",
+                    ),
+                    rx.text("Carpeta de destino:", size="2", weight="medium"),
+                    rx.input(
+                        placeholder="carpeta/subcarpeta/ (vacío = raíz del bucket)",
+                        value=FilesState.transfer_prefix,
+                        on_change=FilesState.set_transfer_prefix,
+                        width="100%",
+                    ),
+                    spacing="2",
+                    width="100%",
+                    margin_top="1rem",
+                ),
+                
+                rx.hstack(
+                    rx.dialog.close(
+                        rx.button(
+                            "Cancelar",
+                            variant="soft",
+                            color_scheme="gray",
+                            on_click=FilesState.close_transfer_dialog,
+                        ),
+                    ),
+                    rx.button(
+                        rx.cond(
+                            FilesState.transfer_loading,
+                            rx.hstack(
+                                rx.spinner(size="3"),
+                                rx.text("Procesando..."),
+                                spacing="2",
+                            ),
+                            rx.hstack(
+                                rx.icon("copy", size=18),
+                                rx.text("Confirmar"),
+                                spacing="2",
+                            ),
+                        ),
+                        disabled=FilesState.transfer_loading,
+                        on_click=FilesState.confirm_transfer,
+                    ),
+                    spacing="2",
+                    justify="end",
+                    width="100%",
+                    margin_top="1rem",
+                ),
+            ),
+            open=FilesState.show_transfer_dialog,
+        ),
+        
+        # Diálogo de Versiones / Archivos eliminados
+        rx.dialog.root(
+            rx.dialog.content(
+                rx.dialog.title(FilesState.versions_title),
+                rx.dialog.description(
+                    rx.cond(
+                        FilesState.versions_key != "",
+                        "Restaurar una versión la copia encima de la actual (la actual queda en el historial).",
+                        "Recuperar quita el marcador de borrado: vuelve la última versión, sin copiar datos.",
+                    ),
+                ),
+                
+                rx.box(
+                    rx.cond(
+                        (FilesState.versions.length() == 0) & ~FilesState.versions_loading,
+                        rx.callout(
+                            rx.cond(
+                                FilesState.versions_key != "",
+                                "Este archivo no tiene versiones",
+                                "No hay archivos eliminados en esta carpeta",
+                            ),
+                            icon="info",
+                            color_scheme="gray",
+                            variant="soft",
+                        ),
+                        rx.table.root(
+                            rx.table.body(
+                                rx.foreach(
+                                    FilesState.versions,
+                                    lambda version: rx.table.row(
+                                        rx.table.cell(
+                                            rx.hstack(
+                                                rx.cond(
+                                                    FilesState.versions_key == "",
+                                                    rx.checkbox(
+                                                        checked=FilesState.selected_deleted.contains(version['key']),
+                                                        on_change=lambda checked: FilesState.toggle_deleted_selection(version['key'], checked),
+                                                    ),
+                                                ),
+                                                rx.text(
+                                                    rx.cond(FilesState.versions_key == "", version['key'], version['last_modified']),
+                                                    size="2",
+                                                ),
+                                                spacing="2",
+                                                align="center",
+                                            ),
+                                        ),
+                                        rx.table.cell(
+                                            rx.cond(
+                                                version['is_delete_marker'],
+                                                rx.badge(
+                                                    rx.cond(FilesState.versions_key == "", f"Eliminado {version['last_modified']}", "Eliminado"),
+                                                    size="1",
+                                                    color_scheme="red",
+                                                    variant="soft",
+                                                ),
+                                                rx.badge(f"{version['size_mb']} MB", size="1", variant="soft"),
+                                            ),
+                                        ),
+                                        rx.table.cell(
+                                            rx.cond(
+                                                version['is_latest'],
+                                                rx.badge("Actual", size="1", color_scheme="green", variant="soft"),
+                                            ),
+                                        ),
+                                        rx.table.cell(
+                                            rx.cond(
+                                                version['is_latest'] == version['is_delete_marker'],
+                                                rx.button(
+                                                    rx.cond(version['is_delete_marker'], "Recuperar", "Restaurar"),
+                                                    size="1",
+                                                    variant="soft",
+                                                    disabled=FilesState.versions_action_loading,
+                                                    on_click=FilesState.restore_version(version['version_id']),
+                                                ),
+                                            ),
+                                        ),
+                                    ),
+                                ),
+                            ),
+                            size="1",
+                            width="100%",
+                        ),
+                    ),
+                    rx.cond(
+                        FilesState.versions_loading,
+                        rx.center(rx.spinner(size="3"), padding="1rem"),
+                        rx.cond(
+                            FilesState.versions_cursor != "",
+                            rx.center(
+                                rx.button(
+                                    "Cargar más",
+                                    variant="soft",
+                                    size="1",
+                                    on_click=FilesState.load_more_versions,
+                                ),
+                                padding="0.5rem",
+                            ),
+                        ),
+                    ),
+                    max_height="60vh",
+                    overflow="auto",
+                    margin_top="1rem",
+                ),
+                
+                rx.hstack(
+                    rx.dialog.close(
+                        rx.button(
+                            "Cerrar",
+                            variant="soft",
+                            color_scheme="gray",
+                            on_click=FilesState.close_versions_dialog,
+                        ),
+                    ),
+                    rx.cond(
+                        FilesState.versions_key == "",
+                        rx.hstack(
+                            rx.button(
+                                f"Recuperar seleccionados ({FilesState.selected_deleted_count})",
+                                variant="soft",
+                                disabled=FilesState.versions_action_loading | (FilesState.selected_deleted_count == 0),
+                                on_click=FilesState.undelete_selected,
+                            ),
+                            rx.button(
+                                rx.cond(
+                                    FilesState.versions_action_loading,
+                                    rx.hstack(
+                                        rx.spinner(size="3"),
+                                        rx.text("Recuperando..."),
+                                        spacing="2",
+                                    ),
+                                    rx.hstack(
+                                        rx.icon("archive-restore", size=18),
+                                        rx.text("Recuperar toda la carpeta"),
+                                        spacing="2",
+                                    ),
+                                ),
+                                color_scheme="green",
+                                disabled=FilesState.versions_action_loading,
+                                on_click=FilesState.undelete_folder,
+                            ),
+                            spacing="2",
+                        ),
+                    ),
+                    spacing="2",
+                    justify="end",
+                    width="100%",
+                    margin_top="1rem",
+                ),
+                max_width="900px",
+            ),
+            open=FilesState.show_versions_dialog,
+        ),
     )
\ No newline at end of file
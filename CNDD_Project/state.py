@@ -34,16 +34,9 @@ class GlobalState(rx.State):
 
         if self.access_token:
             try: 
-                import boto3
-                import os
-                from dotenv import load_dotenv
+                from .utils.aws_clients import get_client
 
-                load_dotenv()
-
-                client = boto3.client(
-                    'cognito-idp',
-                    region_name = os.getenv('AWS_REGION')
-                )
+                client = get_client('cognito-idp')
 
                 #Cerrar sesion global en cognito
                 client.global_sign_out(
@@ -0,0 +1,42 @@
+"""
+Fixtures comunes: S3 simulado con moto y directorios de estado temporales
+"""
+
+import os
+
+import pytest
+
+REGION = 'us-east-2'
+
+
+@pytest.fixture(autouse=True)
+def aislar_entorno(tmp_path, monkeypatch):
+    """Credenciales falsas y estado local en una carpeta temporal por prueba."""
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', REGION)
+    monkeypatch.setenv('AWS_REGION', REGION)
+    monkeypatch.delenv('AWS_PROFILE', raising=False)
+    monkeypatch.delenv('REDIS_URL', raising=False)
+    monkeypatch.setenv('UPLOAD_STATE_DIR', str(tmp_path / 'upload-state'))
+    monkeypatch.setenv('METADATA_CATALOG_PATH', str(tmp_path / 'catalog.sqlite3'))
+    monkeypatch.setenv('STORAGE_ROLLUP_DIR', str(tmp_path / 'rollup'))
+    monkeypatch.setenv('CONTENT_INDEX_DIR', str(tmp_path / 'content-index'))
+
+
+@pytest.fixture
+def s3_client():
+    """Cliente de S3 contra un S3 simulado en memoria."""
+    from moto import mock_aws
+    import boto3
+
+    with mock_aws():
+        yield boto3.client('s3', region_name=REGION)
+
+
+@pytest.fixture
+def bucket(s3_client):
+    """Bucket vacío en el S3 simulado."""
+    name = 'cndd-pruebas'
+    s3_client.create_bucket(Bucket=name, CreateBucketConfiguration={'LocationConstraint': REGION})
+    return name
@@ -0,0 +1,57 @@
+"""
+Pruebas de la fachada asíncrona: las llamadas lentas a S3 no bloquean el event loop
+"""
+
+import asyncio
+import time
+
+from CNDD_Project.utils.S3_manager import S3Manager
+from CNDD_Project.utils.async_s3 import AsyncS3Manager
+
+
+def test_slow_call_does_not_block_event_loop(s3_client, bucket, monkeypatch):
+    s3_client.put_object(Bucket=bucket, Key='informe.csv', Body=b'a,b\n1,2\n')
+    list_files_page = S3Manager.list_files_page
+
+    def slow_list_files_page(self, *args, **kwargs):
+        time.sleep(0.5)
+        return list_files_page(self, *args, **kwargs)
+
+    monkeypatch.setattr(S3Manager, 'list_files_page', slow_list_files_page)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        result = await AsyncS3Manager().list_files_page(bucket, use_cache=False)
+        elapsed = time.perf_counter() - started
+        ticking.cancel()
+        return result, ticks, elapsed
+
+    (success, page, error), ticks, elapsed = asyncio.run(scenario())
+
+    assert success, error
+    assert [f['key'] for f in page['files']] == ['informe.csv']
+    assert elapsed >= 0.5
+    # Mientras el hilo de S3 dormía, el loop siguió atendiendo a la otra corrutina
+    assert ticks >= 20
+
+
+def test_concurrent_calls_overlap(s3_client, bucket, monkeypatch):
+    monkeypatch.setattr(S3Manager, 'get_cache_stats', staticmethod(lambda: time.sleep(0.3) or {}))
+
+    async def scenario():
+        s3 = AsyncS3Manager()
+        started = time.perf_counter()
+        await asyncio.gather(*[s3.get_cache_stats() for _ in range(4)])
+        return time.perf_counter() - started
+
+    # Cuatro llamadas de 0.3 s en el pool terminan casi a la vez, no en 1.2 s
+    assert asyncio.run(scenario()) < 0.9
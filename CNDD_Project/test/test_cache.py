@@ -0,0 +1,52 @@
+"""
+Pruebas de la caché con TTL, desalojo LRU y presupuesto de memoria
+"""
+
+import time
+
+from CNDD_Project.utils.cache import TTLCache, estimate_size
+
+
+def test_expired_entries_are_misses():
+    cache = TTLCache(ttl=60, max_entries=10, max_bytes=1024 * 1024)
+    cache.set('a', 1, ttl=0.01)
+    time.sleep(0.02)
+
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(ttl=60, max_entries=2, max_bytes=1024 * 1024)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_update_where_respects_byte_budget():
+    page = ['x'] * 10
+    cache = TTLCache(ttl=60, max_entries=10, max_bytes=estimate_size(page) * 3)
+    for key in range(3):
+        cache.set(key, list(page))
+
+    # La entrada parcheada crece: se desalojan las más antiguas para que quepa
+    assert cache.update_where(lambda key: key == 2, lambda key, value: value * 3) == 1
+    stats = cache.stats()
+    assert stats['bytes'] <= stats['max_bytes']
+    assert cache.get(0) is None
+    assert cache.get(2) == page * 3
+
+
+def test_update_where_drops_entry_that_no_longer_fits():
+    cache = TTLCache(ttl=60, max_entries=10, max_bytes=estimate_size(['x'] * 10))
+    cache.set('a', ['x'])
+
+    cache.update_where(lambda key: True, lambda key, value: value * 100)
+
+    assert cache.get('a') is None
+    assert cache.stats()['bytes'] == 0
@@ -0,0 +1,41 @@
+"""
+Pruebas de la deduplicación de subidas por SHA-256
+"""
+
+import io
+import os
+
+import pytest
+
+from CNDD_Project.utils import content_index
+from CNDD_Project.utils.S3_manager import S3Manager
+from CNDD_Project.utils.content_index import DEDUP_MIN_SIZE
+from conftest import REGION
+
+
+@pytest.fixture(autouse=True)
+def indice_nuevo(monkeypatch):
+    """Índice de contenido vacío en la carpeta temporal de cada prueba."""
+    monkeypatch.setattr(content_index, '_index', None)
+
+
+def test_content_from_another_bucket_is_not_copied(s3_client, bucket):
+    s3_client.create_bucket(Bucket='cndd-rrhh', CreateBucketConfiguration={'LocationConstraint': REGION})
+    data = os.urandom(DEDUP_MIN_SIZE)
+    s3 = S3Manager()
+    assert s3.store_fileobj(io.BytesIO(data), 'cndd-rrhh', 'nomina.pdf')[1] == 'uploaded'
+
+    # Otro rol sube el mismo contenido a su bucket: se sube, no se copia de rrhh
+    assert s3.store_fileobj(io.BytesIO(data), bucket, 'copia.pdf')[1] == 'uploaded'
+    assert s3_client.get_object(Bucket=bucket, Key='copia.pdf')['Body'].read() == data
+
+
+def test_copy_in_same_bucket_keeps_the_upload_content_type(s3_client, bucket):
+    data = os.urandom(DEDUP_MIN_SIZE)
+    s3 = S3Manager()
+    s3.store_fileobj(io.BytesIO(data), bucket, 'original.bin', content_type='application/octet-stream')
+
+    assert s3.store_fileobj(io.BytesIO(data), bucket, 'informe.csv', content_type='text/csv')[1] == 'copied'
+    head = s3_client.head_object(Bucket=bucket, Key='informe.csv')
+    assert head['ContentType'] == 'text/csv'
+    assert s3_client.get_object(Bucket=bucket, Key='informe.csv')['Body'].read() == data
@@ -0,0 +1,114 @@
+"""
+Pruebas del estado de la página de archivos: los eventos del navegador no
+pueden salirse de los buckets del rol
+"""
+
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def files_state():
+    """FilesState fuera del servidor (en los eventos en segundo plano `async with self` no bloquea)."""
+    from CNDD_Project.pages.files import FilesState
+
+    root = FilesState.get_root_state()(_reflex_internal_init=True)
+    state = root.get_substate(FilesState.get_full_name().split('.')[1:])
+    state.role = 'lectura-escritura'
+    state.available_buckets = ['cndd-pruebas']
+    state.selected_bucket = 'cndd-pruebas'
+    return state
+
+
+def run(handler, state, *args):
+    """Ejecutar un evento en segundo plano sobre el estado."""
+    return asyncio.run(handler.fn(state, *args))
+
+
+def test_select_bucket_rejects_buckets_outside_the_role(files_state):
+    assert files_state.select_bucket('cndd-rrhh') is None
+    files_state.set_selected_bucket('cndd-rrhh')
+    files_state.set_available_buckets(['cndd-rrhh'])
+    files_state.set_role('admin')
+
+    assert files_state.selected_bucket == 'cndd-pruebas'
+    assert files_state.available_buckets == ['cndd-pruebas']
+    assert files_state.role == 'lectura-escritura'
+
+
+def test_preview_outside_the_role_is_refused(files_state):
+    from CNDD_Project.pages.files import FilesState
+
+    files_state.selected_bucket = 'cndd-rrhh'
+    run(FilesState.open_preview, files_state, 'nomina.csv', 'nomina.csv', '')
+
+    assert not files_state.show_preview_dialog
+    assert files_state.error_message
+
+
+def test_zip_download_outside_the_role_is_not_signed(files_state, monkeypatch):
+    from CNDD_Project.pages import files
+
+    monkeypatch.setattr(files, 'create_zip_token', lambda *args: pytest.fail('no debe firmar'))
+    files_state.selected_bucket = 'cndd-rrhh'
+
+    assert files_state.download_folder_zip('nominas/', 'nominas') is None
+    assert files_state.error_message
+
+
+@pytest.mark.parametrize('handler', ['load_versions', 'load_more_versions', 'undelete_selected', 'undelete_folder'])
+def test_version_handlers_refuse_buckets_outside_the_role(files_state, monkeypatch, handler):
+    from CNDD_Project.pages.files import FilesState
+    from CNDD_Project.utils.async_s3 import AsyncS3Manager
+
+    monkeypatch.setattr(AsyncS3Manager, '__getattr__', lambda self, name: pytest.fail(f'llamó a {name}'))
+    files_state.selected_bucket = 'cndd-rrhh'
+    files_state.versions_cursor = 'siguiente'
+    files_state.selected_deleted = ['nomina.csv']
+
+    run(getattr(FilesState, handler), files_state)
+    assert not files_state.versions_action_loading and not files_state.versions_loading
+
+
+def test_restore_version_outside_the_role_is_refused(files_state, monkeypatch):
+    from CNDD_Project.pages.files import FilesState
+    from CNDD_Project.utils.async_s3 import AsyncS3Manager
+
+    monkeypatch.setattr(AsyncS3Manager, '__getattr__', lambda self, name: pytest.fail(f'llamó a {name}'))
+    files_state.selected_bucket = 'cndd-rrhh'
+    files_state.versions = [{'version_id': 'v1', 'is_delete_marker': True, 'name': 'a', 'key': 'a'}]
+
+    run(FilesState.restore_version, files_state, 'v1')
+    assert not files_state.versions_action_loading
+
+
+def test_uncataloged_listing_pages_with_a_cursor_stack(files_state, s3_client, bucket, tmp_path, monkeypatch):
+    from CNDD_Project.pages import files
+    from CNDD_Project.pages.files import FilesState
+    from CNDD_Project.utils import metadata_catalog
+
+    monkeypatch.setattr(metadata_catalog, '_catalog', metadata_catalog.MetadataCatalog(str(tmp_path / 'catalogo.sqlite3')))
+    monkeypatch.setattr(metadata_catalog, 'CATALOG_CRAWL_BUCKETS', set())
+    monkeypatch.setattr(files, 'FILES_PAGE_SIZE', 2)
+    for name in ['a.csv', 'b.csv', 'c.csv', 'd.csv', 'e.csv']:
+        s3_client.put_object(Bucket=bucket, Key=name, Body=b'x')
+    files_state.role = 'solo-carga'
+
+    run(FilesState.load_files, files_state)
+    assert [f['key'] for f in files_state.files] == ['a.csv', 'b.csv']
+    assert not files_state.paged_listing and not files_state.has_previous_page
+
+    files_state.next_page()
+    run(FilesState.load_files, files_state)
+    assert [f['key'] for f in files_state.files] == ['c.csv', 'd.csv']
+    assert files_state.page_label == 'Página 2'
+
+    files_state.set_sort('key')
+    run(FilesState.load_files, files_state)
+    assert [f['key'] for f in files_state.files] == ['d.csv', 'c.csv']
+
+    files_state.previous_page()
+    run(FilesState.load_files, files_state)
+    assert len(files_state.files) == 2
+    assert not files_state.has_previous_page and files_state.has_next_page
@@ -0,0 +1,38 @@
+"""
+Pruebas de la lectura de informes de S3 Inventory generados en local
+"""
+
+from CNDD_Project.utils.inventory import DEFAULT_SCHEMA, InventoryReport, write_csv_inventory
+
+VERSIONED_SCHEMA = DEFAULT_SCHEMA + ['IsLatest', 'IsDeleteMarker']
+
+
+def _record(key, size=10, **extra):
+    return {'Key': key, 'Size': size, 'LastModifiedDate': '2024-05-01T12:30:00.000Z',
+            'ETag': 'abc', 'StorageClass': 'STANDARD', **extra}
+
+
+def test_csv_gz_keys_are_url_decoded(tmp_path):
+    keys = ['informes/año 2024/resumen+final.csv', 'datos/100%/tabla (1).csv']
+    manifest = write_csv_inventory(str(tmp_path), 'cndd-pruebas', [_record(k) for k in keys],
+                                   taken_at=1714566000, rows_per_file=1)
+    report = InventoryReport(manifest)
+
+    assert report.source_bucket == 'cndd-pruebas'
+    assert report.taken_at == 1714566000
+    assert len(report.manifest['files']) == 2
+    rows = list(report.rows())
+    assert [row['key'] for row in rows] == keys
+    assert rows[0]['last_modified'] == '2024-05-01 12:30:00'
+    assert rows[0]['size'] == 10
+
+
+def test_old_versions_and_delete_markers_are_skipped(tmp_path):
+    records = [
+        _record('vigente.csv', IsLatest='true', IsDeleteMarker='false'),
+        _record('vigente.csv', IsLatest='false', IsDeleteMarker='false'),
+        _record('borrado.csv', IsLatest='true', IsDeleteMarker='true'),
+    ]
+    manifest = write_csv_inventory(str(tmp_path), 'cndd-pruebas', records, columns=VERSIONED_SCHEMA)
+
+    assert [row['key'] for row in InventoryReport(manifest).rows()] == ['vigente.csv']
@@ -0,0 +1,84 @@
+"""
+Pruebas del catálogo local: importación, cambios posteriores a la foto,
+listados por carpeta y búsqueda
+"""
+
+import time
+
+from CNDD_Project.utils.metadata_catalog import MetadataCatalog
+
+BUCKET = 'cndd-pruebas'
+
+
+def _row(key, size=10):
+    return {'key': key, 'size': size, 'last_modified': '2024-05-01 00:00:00',
+            'storage_class': 'STANDARD', 'etag': 'abc'}
+
+
+def _keys(rows):
+    return [row['key'] for row in rows]
+
+
+def test_replace_bucket_replays_changes_made_after_the_snapshot(tmp_path):
+    catalog = MetadataCatalog(str(tmp_path / 'catalogo.sqlite3'))
+    catalog.replace_bucket(BUCKET, [_row('a.csv')], time.time(), 'prueba')
+
+    taken_at = time.time()
+    time.sleep(0.01)
+    # Cambios hechos desde la aplicación mientras S3 preparaba el inventario
+    catalog.object_stored(BUCKET, _row('nuevo.csv'))
+    catalog.objects_deleted(BUCKET, ['viejo.csv'])
+    catalog.prefix_deleted(BUCKET, 'borrada/')
+
+    inventory = [_row('a.csv'), _row('viejo.csv'), _row('borrada/x.csv'), _row('borrada/y/z.csv')]
+    assert catalog.replace_bucket(BUCKET, inventory, taken_at, 'inventario') == 4
+
+    assert _keys(catalog.list_page(BUCKET)['files']) == ['a.csv', 'nuevo.csv']
+    assert catalog.snapshot(BUCKET)['source'] == 'inventario'
+
+
+def test_changes_older_than_the_snapshot_are_not_replayed(tmp_path):
+    catalog = MetadataCatalog(str(tmp_path / 'catalogo.sqlite3'))
+    catalog.replace_bucket(BUCKET, [], time.time(), 'prueba')
+    catalog.objects_deleted(BUCKET, ['recreado.csv'])
+    time.sleep(0.01)
+
+    # La foto ya incluye el objeto creado otra vez después del borrado
+    catalog.replace_bucket(BUCKET, [_row('recreado.csv')], time.time(), 'inventario')
+
+    assert _keys(catalog.list_page(BUCKET)['files']) == ['recreado.csv']
+
+
+def test_folder_listing_and_search(tmp_path):
+    catalog = MetadataCatalog(str(tmp_path / 'catalogo.sqlite3'))
+    keys = ['raiz.csv', 'fotos/', 'fotos/playa.jpg', 'fotos/2024/montaña.jpg', 'informes/Resumen.pdf']
+    catalog.replace_bucket(BUCKET, [_row(k, size=i) for i, k in enumerate(keys)], time.time(), 'prueba')
+
+    page = catalog.list_page(BUCKET, delimiter='/')
+    assert [f['prefix'] for f in page['folders']] == ['fotos/', 'informes/']
+    assert _keys(page['files']) == ['raiz.csv']
+
+    page = catalog.sorted_page(BUCKET, 'fotos/', sort='size', descending=True)
+    assert [f['prefix'] for f in page['folders']] == ['fotos/2024/']
+    assert _keys(page['files']) == ['fotos/playa.jpg']
+    assert page['total_files'] == 1
+
+    rows, total = catalog.search([BUCKET], 'RESUMEN')
+    assert (_keys(rows), total) == (['informes/Resumen.pdf'], 1)
+    rows, total = catalog.search([BUCKET], '.jpg', prefix='fotos/', sort='size')
+    assert _keys(rows) == ['fotos/playa.jpg', 'fotos/2024/montaña.jpg']
+
+
+def test_import_from_another_process_is_seen_without_restarting(tmp_path):
+    path = str(tmp_path / 'catalogo.sqlite3')
+    app = MetadataCatalog(path)
+    assert not app.has_bucket(BUCKET)
+
+    # El script de importación abre el mismo archivo con su propio catálogo
+    MetadataCatalog(path).replace_bucket(BUCKET, [_row('a.csv')], time.time(), 'inventario-1')
+    assert app.has_inventory(BUCKET)
+    assert _keys(app.list_page(BUCKET)['files']) == ['a.csv']
+
+    MetadataCatalog(path).replace_bucket(BUCKET, [_row('b.csv')], time.time(), 'inventario-2')
+    assert app.snapshot(BUCKET)['source'] == 'inventario-2'
+    assert _keys(app.list_page(BUCKET)['files']) == ['b.csv']
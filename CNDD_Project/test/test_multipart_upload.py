@@ -0,0 +1,124 @@
+"""
+Pruebas de la subida multipart reanudable
+"""
+
+import os
+
+from CNDD_Project.utils.multipart_upload import MIN_PART_SIZE, MultipartUploader
+from CNDD_Project.utils.upload_state import UploadStateStore
+
+PART = MIN_PART_SIZE
+
+
+def _uploader(s3_client, bucket, store, data, key='datos/archivo.bin'):
+    return MultipartUploader(s3_client, bucket, key, part_size=PART,
+                             state_store=store, total_size=len(data))
+
+
+def test_upload_streams_parts_and_completes(s3_client, bucket, tmp_path):
+    data = os.urandom(2 * PART + 1000)
+    uploader = _uploader(s3_client, bucket, UploadStateStore(str(tmp_path)), data)
+
+    uploader.write(data)
+    assert uploader.complete() == len(data)
+
+    assert s3_client.get_object(Bucket=bucket, Key='datos/archivo.bin')['Body'].read() == data
+    assert list(UploadStateStore(str(tmp_path)).items()) == []
+
+
+def test_retry_resumes_without_resending_parts(s3_client, bucket, tmp_path):
+    store = UploadStateStore(str(tmp_path))
+    data = os.urandom(2 * PART + 1000)
+
+    first = _uploader(s3_client, bucket, store, data)
+    first.write(data[:2 * PART])
+    first.suspend()
+
+    retry = _uploader(s3_client, bucket, store, data)
+    retry.write(data)
+    retry.complete()
+
+    assert retry.upload_id == first.upload_id
+    assert retry.parts_skipped == 2
+    assert s3_client.get_object(Bucket=bucket, Key='datos/archivo.bin')['Body'].read() == data
+
+
+def test_same_name_and_size_with_other_content_gets_its_own_upload(s3_client, bucket, tmp_path):
+    store = UploadStateStore(str(tmp_path))
+    one, other = os.urandom(2 * PART), os.urandom(2 * PART)
+
+    first = _uploader(s3_client, bucket, store, one)
+    first.write(one[:PART])
+    second = _uploader(s3_client, bucket, store, other)
+    second.write(other[:PART])
+
+    assert first.upload_id != second.upload_id
+
+
+def test_upload_in_progress_is_not_shared(s3_client, bucket, tmp_path):
+    store = UploadStateStore(str(tmp_path))
+    data = os.urandom(2 * PART)
+
+    first = _uploader(s3_client, bucket, store, data)
+    first.write(data[:PART])
+    second = _uploader(s3_client, bucket, store, data)
+    second.write(data)
+    second.complete()
+
+    # La segunda subida no toca las partes ni el registro de la primera
+    assert second.upload_id != first.upload_id
+    assert not second.resumable
+    first.write(data[PART:])
+    first.complete()
+    assert s3_client.get_object(Bucket=bucket, Key='datos/archivo.bin')['Body'].read() == data
+
+
+def test_failed_start_releases_the_upload_for_a_retry(s3_client, bucket, tmp_path, monkeypatch):
+    store = UploadStateStore(str(tmp_path))
+    data = os.urandom(2 * PART)
+
+    first = _uploader(s3_client, bucket, store, data)
+    first.write(data[:PART])
+    first.suspend()
+
+    # El reintento no llega a confirmar las partes en S3 y se cancela
+    failing = _uploader(s3_client, bucket, store, data)
+    monkeypatch.setattr(failing, '_list_server_parts', lambda upload_id: (_ for _ in ()).throw(OSError('red')))
+    try:
+        failing.write(data)
+    except OSError:
+        failing.abort()
+
+    retry = _uploader(s3_client, bucket, store, data)
+    retry.write(data)
+    retry.complete()
+    assert retry.resumable
+    assert retry.upload_id == first.upload_id
+    assert retry.parts_skipped == 1
+
+
+def test_failed_create_releases_the_upload_for_a_retry(s3_client, bucket, tmp_path, monkeypatch):
+    store = UploadStateStore(str(tmp_path))
+    data = os.urandom(2 * PART)
+    create = s3_client.create_multipart_upload
+
+    def fail_once(**kwargs):
+        monkeypatch.setattr(s3_client, 'create_multipart_upload', create)
+        raise OSError('red')
+
+    monkeypatch.setattr(s3_client, 'create_multipart_upload', fail_once)
+    failing = _uploader(s3_client, bucket, store, data)
+    try:
+        failing.write(data)
+    except OSError:
+        failing.abort()
+
+    retry = _uploader(s3_client, bucket, store, data)
+    retry.write(data[:PART])
+    retry.suspend()
+    resumed = _uploader(s3_client, bucket, store, data)
+    resumed.write(data)
+    resumed.complete()
+
+    assert retry.resumable and resumed.parts_skipped == 1
+    assert s3_client.get_object(Bucket=bucket, Key='datos/archivo.bin')['Body'].read() == data
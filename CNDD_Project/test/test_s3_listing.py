@@ -0,0 +1,124 @@
+"""
+Pruebas del listado: el prefijo de miniaturas queda oculto, todos los roles
+encuentran las miniaturas ya generadas y solo los de escritura encolan nuevas
+"""
+
+import pytest
+
+from CNDD_Project.utils.S3_manager import S3Manager
+from CNDD_Project.utils.derivatives import DERIVATIVES_PREFIX, rendition_key
+
+
+def test_listing_hides_derivatives(s3_client, bucket):
+    for key in ['a.csv', f'{DERIVATIVES_PREFIX}abc.webp', 'z.csv']:
+        s3_client.put_object(Bucket=bucket, Key=key, Body=b'x')
+
+    pages = list(S3Manager().iter_pages(bucket))
+    assert [f['key'] for page in pages for f in page['files']] == ['a.csv', 'z.csv']
+
+    pages = list(S3Manager().iter_pages(bucket, delimiter='/'))
+    assert [f['prefix'] for page in pages for f in page['folders']] == []
+
+
+def _fresh_pipeline(monkeypatch):
+    from CNDD_Project.utils import derivatives
+
+    pipeline = derivatives.DerivativePipeline(workers=1)
+    monkeypatch.setattr(derivatives, '_pipeline', pipeline)
+    return pipeline
+
+
+def test_only_write_roles_queue_missing_thumbnails(s3_client, bucket, monkeypatch):
+    queued = []
+    pipeline = _fresh_pipeline(monkeypatch)
+    monkeypatch.setattr(pipeline, 'enqueue', lambda bucket_name, key, etag=None: queued.append(key))
+    rows = [{'key': 'fotos/perfil.png', 'etag': 'abc123'}]
+
+    s3 = S3Manager()
+    assert s3.get_thumbnail_urls(bucket, rows, role='solo-lectura') == (True, {}, None)
+    assert queued == []
+
+    s3.get_thumbnail_urls(bucket, rows, role='lectura-escritura')
+    assert queued == ['fotos/perfil.png']
+
+
+def test_read_only_roles_find_thumbnails_already_in_s3(s3_client, bucket, monkeypatch):
+    pipeline = _fresh_pipeline(monkeypatch)
+    monkeypatch.setattr(pipeline, 'enqueue', lambda *args, **kwargs: pytest.fail('no debe encolar'))
+    s3_client.put_object(Bucket=bucket, Key=rendition_key('abc123'), Body=b'webp')
+    rows = [{'key': 'fotos/perfil.png', 'etag': '"abc123"'}, {'key': 'fotos/otra.png', 'etag': 'def456'}]
+
+    success, urls, _ = S3Manager().get_thumbnail_urls(bucket, rows, role='solo-lectura')
+
+    assert success and list(urls) == ['fotos/perfil.png']
+    assert pipeline.has_rendition(bucket, 'abc123')
+    # La que falta no se vuelve a buscar en cada listado
+    monkeypatch.setattr(pipeline, '_exists', lambda *args: pytest.fail('HEAD repetido'))
+    assert pipeline.discover(bucket, ['def456']) == set()
+
+
+def _fresh_catalog(tmp_path, monkeypatch, crawl=()):
+    from CNDD_Project.utils import metadata_catalog
+
+    catalog = metadata_catalog.MetadataCatalog(str(tmp_path / 'catalogo.sqlite3'))
+    monkeypatch.setattr(metadata_catalog, '_catalog', catalog)
+    monkeypatch.setattr(metadata_catalog, 'CATALOG_CRAWL_BUCKETS', set(crawl))
+    return catalog
+
+
+def test_buckets_not_opted_in_are_not_crawled(s3_client, bucket, tmp_path, monkeypatch):
+    catalog = _fresh_catalog(tmp_path, monkeypatch)
+    s3_client.put_object(Bucket=bucket, Key='a.csv', Body=b'x')
+
+    s3 = S3Manager()
+    _, page, _ = s3.list_files_sorted(bucket)
+    assert (page['pending'], page['cataloged']) == (False, False)
+    _, result, _ = s3.search_objects([bucket], 'a.csv')
+    assert result['unavailable'] == [bucket] and result['pending'] == []
+    catalog.flush()
+    assert catalog.snapshot(bucket) is None
+
+
+def test_crawled_bucket_is_sorted_from_catalog_but_listed_from_s3(s3_client, bucket, tmp_path, monkeypatch):
+    catalog = _fresh_catalog(tmp_path, monkeypatch, crawl=[bucket])
+    s3_client.put_object(Bucket=bucket, Key='a.csv', Body=b'x')
+
+    s3 = S3Manager()
+    assert s3.list_files_sorted(bucket)[1]['pending']
+    catalog.flush()
+    _, page, _ = s3.list_files_sorted(bucket)
+    assert page['cataloged'] and [f['key'] for f in page['files']] == ['a.csv']
+
+    # Lo escrito por otras herramientas aparece en el listado por páginas sin esperar al catálogo
+    s3_client.put_object(Bucket=bucket, Key='b.csv', Body=b'x')
+    _, page, _ = s3.list_files_page(bucket, delimiter='/', use_cache=False)
+    assert [f['key'] for f in page['files']] == ['a.csv', 'b.csv']
+
+
+def test_concurrent_writes_never_lose_a_generation():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from CNDD_Project.utils import S3_manager
+
+    start = S3_manager._write_generation.get('concurrente', 0)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: S3_manager._bump_generation('concurrente'), range(8000)))
+
+    assert S3_manager._write_generation['concurrente'] == start + 8000
+
+
+def test_listing_started_before_a_write_is_not_cached(s3_client, bucket, monkeypatch):
+    from CNDD_Project.utils import S3_manager
+
+    s3_client.put_object(Bucket=bucket, Key='a.csv', Body=b'x')
+    s3 = S3Manager()
+    iter_pages = S3Manager.iter_pages
+
+    def write_while_listing(self, *args, **kwargs):
+        for page in iter_pages(self, *args, **kwargs):
+            S3_manager._bump_generation(bucket)
+            yield page
+
+    monkeypatch.setattr(S3Manager, 'iter_pages', write_while_listing)
+    assert s3.list_files_page(bucket, prefix='gen/', use_cache=False)[0]
+    assert not S3_manager.listing_cache.invalidate_where(lambda key: key[1:3] == (bucket, 'gen/'))
@@ -0,0 +1,51 @@
+"""
+Pruebas del plan de sincronización con objetos guardados comprimidos
+"""
+
+import gzip
+import importlib.util
+import os
+from pathlib import Path
+
+from CNDD_Project.utils.S3_manager import S3Manager
+from CNDD_Project.utils.compression import ORIGINAL_SIZE_METADATA_KEY
+
+SCRIPT = Path(__file__).resolve().parents[2] / 'scripts' / 'sincronizar_s3.py'
+spec = importlib.util.spec_from_file_location('sincronizar_s3', SCRIPT)
+sincronizar_s3 = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(sincronizar_s3)
+
+
+def test_downloaded_gzip_object_is_not_downloaded_again(s3_client, bucket, tmp_path):
+    data = b'fecha,valor\n' * 1000
+    s3_client.put_object(Bucket=bucket, Key='datos/tabla.csv', Body=gzip.compress(data),
+                         ContentEncoding='gzip', Metadata={ORIGINAL_SIZE_METADATA_KEY: str(len(data))})
+    s3 = S3Manager()
+    remotos = sincronizar_s3.escanear_remoto(s3, bucket, 'datos/', [])
+
+    # Copia local descomprimida con la misma fecha, como la deja una descarga
+    carpeta = tmp_path / 'local'
+    carpeta.mkdir()
+    local = carpeta / 'tabla.csv'
+    local.write_bytes(data)
+    os.utime(local, (remotos['tabla.csv']['mtime'], remotos['tabla.csv']['mtime']))
+    locales = sincronizar_s3.escanear_local(str(carpeta), [])
+
+    assert sincronizar_s3.planificar('bajar', locales, remotos, False) != []
+    sincronizar_s3.leer_tamanos_originales(s3, bucket, locales, remotos, 2)
+    assert sincronizar_s3.planificar('bajar', locales, remotos, False) == []
+
+
+def test_changed_local_file_is_still_uploaded(s3_client, bucket, tmp_path):
+    data = b'a' * 5000
+    s3_client.put_object(Bucket=bucket, Key='datos/tabla.csv', Body=gzip.compress(data),
+                         ContentEncoding='gzip', Metadata={ORIGINAL_SIZE_METADATA_KEY: str(len(data))})
+    carpeta = tmp_path / 'local'
+    carpeta.mkdir()
+    (carpeta / 'tabla.csv').write_bytes(b'a' * 6000)
+    s3 = S3Manager()
+    remotos = sincronizar_s3.escanear_remoto(s3, bucket, 'datos/', [])
+    locales = sincronizar_s3.escanear_local(str(carpeta), [])
+
+    sincronizar_s3.leer_tamanos_originales(s3, bucket, locales, remotos, 2)
+    assert [a['ruta'] for a in sincronizar_s3.planificar('subir', locales, remotos, False)] == ['tabla.csv']
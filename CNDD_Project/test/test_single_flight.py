@@ -0,0 +1,54 @@
+"""
+Pruebas de la agrupación de peticiones idénticas concurrentes
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from CNDD_Project.utils.single_flight import SingleFlight
+
+
+def test_identical_concurrent_calls_run_once():
+    flight = SingleFlight()
+    calls = []
+    ready = threading.Barrier(5)
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'files': ['a.csv']}
+
+    def request(_):
+        ready.wait()
+        return flight.do(('list', 'bucket', ''), fetch)
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(request, range(5)))
+
+    assert len(calls) == 1
+    assert all(result == {'files': ['a.csv']} for result in results)
+    assert flight.stats() == {'executed': 1, 'shared': 4, 'in_flight': 0}
+
+
+def test_error_is_shared_and_next_call_retries():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError('S3 no responde')
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, 'head', failing)
+        started.wait()
+        follower = pool.submit(flight.do, 'head', lambda: 'no debería ejecutarse')
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError):
+                future.result()
+
+    # Terminada la llamada, la clave queda libre para un nuevo intento
+    assert flight.do('head', lambda: 'ok') == 'ok'
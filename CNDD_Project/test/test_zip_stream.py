@@ -0,0 +1,63 @@
+"""
+Pruebas de la descarga en ZIP: tokens firmados y archivo generado por bloques
+"""
+
+import io
+import zipfile
+from datetime import datetime
+
+from CNDD_Project.utils.zip_stream import ERRORS_ENTRY, create_zip_token, stream_zip, verify_zip_token
+
+
+def test_token_roundtrip_and_tampering():
+    token = create_zip_token('cndd-publica', 'informes/', ['a.csv', 'b.csv'], 'informes')
+
+    assert verify_zip_token(token) == {
+        'bucket': 'cndd-publica',
+        'prefix': 'informes/',
+        'names': ['a.csv', 'b.csv'],
+        'archive_name': 'informes',
+    }
+    body, _, signature = token.partition('.')
+    forged = create_zip_token('cndd-recursoshumanos', 'informes/', None, 'informes').partition('.')[0]
+    assert verify_zip_token(f"{forged}.{signature}") is None
+    assert verify_zip_token(body) is None
+    assert verify_zip_token(create_zip_token('cndd-publica', '', None, 'todo', ttl=-1)) is None
+
+
+def test_stream_zip_includes_files_and_lists_failures(s3_client, bucket):
+    contents = {'informes/a.csv': b'a,b\n1,2\n', 'informes/sub/b.txt': b'hola' * 1000}
+    for key, body in contents.items():
+        s3_client.put_object(Bucket=bucket, Key=key, Body=body)
+
+    modified = datetime(2024, 5, 1, 12, 0, 0)
+    entries = [
+        {'key': key, 'arcname': key[len('informes/'):], 'size': len(body), 'last_modified': modified}
+        for key, body in contents.items()
+    ]
+    entries.append({'key': 'informes/borrado.csv', 'arcname': 'borrado.csv', 'size': 10, 'last_modified': modified})
+
+    data = b''.join(stream_zip(s3_client, bucket, entries, workers=2))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.read('a.csv') == contents['informes/a.csv']
+        assert archive.read('sub/b.txt') == contents['informes/sub/b.txt']
+        assert archive.getinfo('a.csv').date_time == (2024, 5, 1, 12, 0, 0)
+        assert 'borrado.csv' in archive.read(ERRORS_ENTRY).decode('utf-8')
+
+
+def test_known_or_short_secrets_disable_zip_downloads(monkeypatch):
+    from CNDD_Project.utils import zip_stream
+
+    monkeypatch.setenv('ZIP_TOKEN_SECRET', zip_stream.ZIP_SECRET_PLACEHOLDER)
+    assert zip_stream._load_secret() is None
+    monkeypatch.setenv('ZIP_TOKEN_SECRET', 'corto')
+    assert zip_stream._load_secret() is None
+    monkeypatch.setenv('ZIP_TOKEN_SECRET', 'x' * 40)
+    assert zip_stream._load_secret() == b'x' * 40
+    monkeypatch.delenv('ZIP_TOKEN_SECRET')
+    assert len(zip_stream._load_secret()) == 32
+
+    monkeypatch.setattr(zip_stream, 'ZIP_TOKEN_SECRET', None)
+    assert zip_stream.create_zip_token('cndd-publica', '', None, 'todo') is None
+    assert zip_stream.verify_zip_token('abc.def') is None
@@ -2,15 +2,121 @@
 Gestor de operaciones con AWS S3
 """
 
+import bisect
+import json
+import math
 import os
-import boto3
-from typing import List, Dict, Optional, Tuple
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 from botocore.exceptions import ClientError
+from .aws_clients import get_client
+from .cache import TTLCache
+from .multipart_upload import MAX_PARTS, MIN_PART_SIZE, MultipartUploader, choose_part_size
+from .upload_state import get_upload_state_store, transfer_fingerprint
+from .single_flight import SingleFlight
+from .transfer_profiles import get_transfer_config
+from .previews import build_preview
+from .derivatives import DERIVATIVES_PREFIX, get_derivative_pipeline, is_derivable, rendition_key
+from .compression import (
+    COMPRESS_MIN_SIZE, COMPRESS_UPLOADS, ORIGINAL_SIZE_METADATA_KEY, GzipReader,
+    gunzip_file, gunzip_prefix, is_compressible
+)
+from .content_index import DEDUP_MIN_SIZE, HASH_METADATA_KEY, HashingReader, get_content_index, hash_fileobj
+from .storage_rollup import get_storage_rollup, parent_folder
+from .metadata_catalog import get_metadata_catalog
+from .inventory import InventoryError, InventoryReport
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Máximo de objetos que S3 devuelve por llamada a list_objects_v2
+LIST_PAGE_SIZE = 1000
+
+# Bloque que se lee del origen en cada iteración de una subida en streaming
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Hasta este tamaño la subida directa desde el navegador usa un POST prefirmado;
+# por encima se divide en partes que el navegador sube en paralelo
+PRESIGNED_POST_MAX_SIZE = int(os.getenv('DIRECT_UPLOAD_MULTIPART_THRESHOLD', str(16 * 1024 * 1024)))
+
+# S3 acepta hasta 1000 claves por llamada a delete_objects
+DELETE_BATCH_SIZE = 1000
+
+# Lotes de eliminación que se envían a la vez
+DELETE_CONCURRENCY = int(os.getenv('S3_DELETE_CONCURRENCY', '8'))
+
+# CopyObject admite objetos de hasta 5 GB; por encima se copia por partes
+COPY_OBJECT_MAX_SIZE = 5 * 1024 * 1024 * 1024
+
+# Tamaño de cada UploadPartCopy y copias que se ejecutan a la vez
+COPY_PART_SIZE = max(int(os.getenv('S3_COPY_PART_SIZE', str(512 * 1024 * 1024))), MIN_PART_SIZE)
+COPY_CONCURRENCY = int(os.getenv('S3_COPY_CONCURRENCY', '8'))
+
+# Páginas del historial de versiones que se revisan como mucho por llamada
+# cuando se buscan solo los archivos eliminados
+VERSION_SCAN_PAGES = 10
+
+# Cursor que no es un ContinuationToken sino una clave desde la que seguir
+# (se usa para saltar de una vez el rango oculto de miniaturas)
+START_AFTER_CURSOR = 'after:'
+
+# Última clave posible dentro del prefijo de miniaturas
+DERIVATIVES_END = DERIVATIVES_PREFIX + '\U0010ffff'
+
+# Roles con permiso de escritura: solo sus listados encolan miniaturas que faltan
+WRITE_ROLES = ['admin', 'lectura-escritura', 'solo-carga']
+
+# Caché de páginas de listado compartida por todas las instancias de S3Manager.
+# Clave: ('list', bucket, prefijo, delimitador, cursor, tamaño_de_página)
+listing_cache = TTLCache(
+    ttl=float(os.getenv('S3_LISTING_CACHE_TTL', '60')),
+    max_entries=int(os.getenv('S3_LISTING_CACHE_MAX_ENTRIES', '512')),
+    max_bytes=int(os.getenv('S3_LISTING_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+)
+
+# URLs prefirmadas ya generadas, por (bucket, clave, disposición, rol).
+# Cada entrada vence PRESIGN_REFRESH_MARGIN segundos antes que su firma.
+presign_cache = TTLCache(
+    ttl=3600,
+    max_entries=int(os.getenv('PRESIGN_CACHE_MAX_ENTRIES', '20000')),
+    max_bytes=int(os.getenv('PRESIGN_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+)
+PRESIGN_REFRESH_MARGIN = 300
+
+# Vistas previas por (bucket, clave, ETag, bytes): mientras el ETag no cambie
+# el contenido tampoco, así que pueden vivir mucho tiempo
+PREVIEW_BYTES = int(os.getenv('S3_PREVIEW_BYTES', str(64 * 1024)))
+preview_cache = TTLCache(
+    ttl=float(os.getenv('S3_PREVIEW_CACHE_TTL', '3600')),
+    max_entries=int(os.getenv('S3_PREVIEW_CACHE_MAX_ENTRIES', '256')),
+    max_bytes=int(os.getenv('S3_PREVIEW_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+)
+
+# Listados y HEAD idénticos que estén en curso comparten una sola llamada a S3
+inflight = SingleFlight()
+
+# Contador de escrituras por bucket: un listado que empezó antes de una
+# subida o eliminación no debe guardar en caché un resultado ya obsoleto.
+# Se incrementa desde varios hilos: siempre bajo _generation_lock
+_write_generation: Dict[str, int] = {}
+_generation_lock = threading.Lock()
+
+
+def _bump_generation(bucket_name: str):
+    """Registrar una escritura en el bucket."""
+    with _generation_lock:
+        _write_generation[bucket_name] = _write_generation.get(bucket_name, 0) + 1
+
+
+def _cache_if_current(bucket_name: str, generation: int, cache_key: tuple, page: Dict):
+    """Guardar una página en caché solo si no hubo escrituras desde que se pidió."""
+    with _generation_lock:
+        if generation == _write_generation.get(bucket_name, 0):
+            listing_cache.set(cache_key, page)
+
 
 class S3Manager:
     """Clase para gestionar operaciones con S3."""
@@ -30,8 +136,8 @@ class S3Manager:
         self.bucket_rrhh = os.getenv('BUCKET_RRHH')
         self.bucket_logs = os.getenv('BUCKET_LOGS')
         
-        # Cliente de S3
-        self.s3_client = boto3.client('s3', region_name=self.region)
+        # Cliente de S3 compartido por todo el proceso
+        self.s3_client = get_client('s3', region_name=self.region)
     
     def get_available_buckets(self, role: str) -> List[str]:
         """
@@ -59,51 +165,547 @@ class S3Manager:
         
         return buckets
     
-    def list_files(self, bucket_name: str) -> Tuple[bool, List[Dict], Optional[str]]:
+    @staticmethod
+    def _format_object(obj: Dict) -> Dict:
+        """
+        Convertir un objeto de list_objects_v2 en una fila para la interfaz.
+        
+        Args:
+            obj: Elemento de 'Contents' devuelto por S3
+            
+        Returns:
+            Diccionario con los datos del archivo
+        """
+        return {
+            'key': obj['Key'],
+            'name': obj['Key'].split('/')[-1],  # Nombre del archivo
+            'size': obj['Size'],
+            'size_mb': round(obj['Size'] / (1024 * 1024), 2),
+            'last_modified': obj['LastModified'].strftime('%Y-%m-%d %H:%M:%S'),
+            'storage_class': obj.get('StorageClass', 'STANDARD'),
+            'etag': obj.get('ETag', '').strip('"')
+        }
+    
+    @staticmethod
+    def _format_folder(prefix: str) -> Dict:
+        """
+        Convertir un CommonPrefix de S3 en una fila de carpeta.
+        
+        Args:
+            prefix: Prefijo completo de la carpeta (termina en '/')
+            
+        Returns:
+            Diccionario con el prefijo y el nombre de la carpeta
+        """
+        return {
+            'prefix': prefix,
+            'name': prefix.rstrip('/').split('/')[-1]
+        }
+    
+    @staticmethod
+    def _list_error_message(e: ClientError, bucket_name: str) -> str:
+        """Traducir un ClientError de listado a un mensaje para el usuario."""
+        error_code = e.response['Error']['Code']
+        if error_code == 'NoSuchBucket':
+            return f"El bucket '{bucket_name}' no existe"
+        elif error_code == 'AccessDenied':
+            return "No tienes permisos para acceder a este bucket"
+        return f"Error: {str(e)}"
+    
+    def iter_pages(self, bucket_name: str, prefix: str = '', page_size: int = LIST_PAGE_SIZE,
+                   cursor: Optional[str] = None, start_after: Optional[str] = None,
+                   delimiter: str = '') -> Iterator[Dict]:
+        """
+        Recorrer un bucket página por página (generador perezoso).
+        
+        Cada página se pide a S3 solo cuando se consume, así que quien solo
+        necesita la primera no paga por el resto del bucket. Con delimiter='/'
+        solo se devuelve un nivel: las subcarpetas llegan en 'folders' sin
+        enumerar su contenido.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            prefix: Prefijo de las claves a listar (carpeta actual)
+            page_size: Máximo de objetos por página (S3 admite hasta 1000)
+            cursor: ContinuationToken de una página anterior para reanudar
+            start_after: Clave a partir de la cual empezar (si no hay cursor)
+            delimiter: Separador de carpetas ('' = listado plano)
+            
+        Yields:
+            Diccionario {'files': [...], 'folders': [...], 'next_cursor': str | None}
+            
+        Raises:
+            ClientError: Si S3 rechaza la petición
+        """
+        params = {
+            'Bucket': bucket_name,
+            'MaxKeys': min(page_size, LIST_PAGE_SIZE),
+        }
+        if prefix:
+            params['Prefix'] = prefix
+        if delimiter:
+            params['Delimiter'] = delimiter
+        self._set_cursor(params, cursor, start_after)
+        
+        # Las miniaturas viven en un prefijo oculto que no se lista
+        hide_derivatives = not prefix.startswith(DERIVATIVES_PREFIX)
+        
+        while True:
+            response = self.s3_client.list_objects_v2(**params)
+            contents = response.get('Contents', [])
+            
+            hidden = hide_derivatives and any(obj['Key'].startswith(DERIVATIVES_PREFIX) for obj in contents)
+            files = [
+                self._format_object(obj) for obj in contents
+                # El marcador de carpeta vacía creado desde la consola no es un archivo
+                if (obj['Key'] != prefix or not prefix.endswith('/'))
+                and not (hide_derivatives and obj['Key'].startswith(DERIVATIVES_PREFIX))
+            ]
+            folders = [
+                self._format_folder(p['Prefix']) for p in response.get('CommonPrefixes', [])
+                if not (hide_derivatives and p['Prefix'] == DERIVATIVES_PREFIX)
+            ]
+            next_cursor = response.get('NextContinuationToken') if response.get('IsTruncated') else None
+            
+            if next_cursor and hide_derivatives and contents and contents[-1]['Key'].startswith(DERIVATIVES_PREFIX):
+                # El resto del rango oculto se salta sin recorrerlo
+                next_cursor = START_AFTER_CURSOR + DERIVATIVES_END
+            
+            # Una página que solo traía miniaturas no se entrega vacía
+            if not (next_cursor and hidden and not files and not folders):
+                yield {'files': files, 'folders': folders, 'next_cursor': next_cursor}
+            
+            if not next_cursor:
+                return
+            self._set_cursor(params, next_cursor, None)
+    
+    @staticmethod
+    def _set_cursor(params: Dict, cursor: Optional[str], start_after: Optional[str]):
+        """Poner en los parámetros de list_objects_v2 el punto desde el que seguir."""
+        params.pop('ContinuationToken', None)
+        params.pop('StartAfter', None)
+        if cursor and cursor.startswith(START_AFTER_CURSOR):
+            params['StartAfter'] = cursor[len(START_AFTER_CURSOR):]
+        elif cursor:
+            params['ContinuationToken'] = cursor
+        elif start_after:
+            params['StartAfter'] = start_after
+    
+    def list_files_page(self, bucket_name: str, cursor: Optional[str] = None,
+                        page_size: int = LIST_PAGE_SIZE, prefix: str = '',
+                        delimiter: str = '', use_cache: bool = True) -> Tuple[bool, Dict, Optional[str]]:
         """
-        Listar archivos en un bucket.
+        Obtener una sola página del listado de un bucket.
         
         Args:
             bucket_name: Nombre del bucket
+            cursor: Cursor devuelto por la página anterior (None = primera página)
+            page_size: Máximo de objetos por página
+            prefix: Prefijo de las claves a listar (carpeta actual)
+            delimiter: '/' para listar solo un nivel de carpetas
+            use_cache: Si es False se ignora la caché y se vuelve a pedir a S3
             
         Returns:
-            Tuple (éxito, lista_archivos, mensaje_error)
+            Tuple (éxito, {'files': [...], 'folders': [...], 'next_cursor': str | None}, mensaje_error)
+        """
+        empty_page = {'files': [], 'folders': [], 'next_cursor': None}
+        cache_key = ('list', bucket_name, prefix, delimiter, cursor or '', page_size)
+        
+        catalog = get_metadata_catalog()
+        if (catalog.has_inventory(bucket_name) and not prefix.startswith(DERIVATIVES_PREFIX)
+                and (not cursor or cursor.startswith(START_AFTER_CURSOR))):
+            # Bucket con inventario importado: el listado sale del catálogo local
+            # y la carpeta visitada se contrasta con S3 en segundo plano (los
+            # buckets solo recorridos para ordenar o buscar se siguen listando en S3)
+            try:
+                page = catalog.list_page(bucket_name, prefix, page_size, cursor, delimiter)
+            except Exception as e:
+                return False, empty_page, f"Error leyendo el catálogo: {str(e)}"
+            if delimiter and not cursor:
+                catalog.refresh(bucket_name, prefix, force=not use_cache)
+            return True, page, None
+        
+        if use_cache:
+            page = listing_cache.get(cache_key)
+            if page is not None:
+                return True, self._copy_page(page), None
+        
+        def fetch():
+            generation = _write_generation.get(bucket_name, 0)
+            page = next(self.iter_pages(
+                bucket_name, prefix=prefix, page_size=page_size, cursor=cursor, delimiter=delimiter
+            ))
+            _cache_if_current(bucket_name, generation, cache_key, page)
+            return page
+        
+        try:
+            page = inflight.do(cache_key, fetch)
+            return True, self._copy_page(page), None
+            
+        except ClientError as e:
+            return False, empty_page, self._list_error_message(e, bucket_name)
+        except Exception as e:
+            return False, empty_page, f"Error inesperado: {str(e)}"
+    
+    def list_files_sorted(self, bucket_name: str, prefix: str = '', sort: str = 'key',
+                          descending: bool = False, offset: int = 0, page_size: int = LIST_PAGE_SIZE,
+                          delimiter: str = '/', use_cache: bool = True) -> Tuple[bool, Dict, Optional[str]]:
         """
+        Obtener una página de una carpeta ordenada por nombre, tamaño, fecha o clase.
+        
+        S3 solo lista en orden de clave, así que el orden y los totales salen
+        del catálogo local. Un bucket de S3_CATALOG_CRAWL_BUCKETS que aún no
+        está catalogado se empieza a recorrer en segundo plano y se informa
+        con 'pending'; uno sin inventario ni recorrido se informa con
+        'cataloged' en False. En ambos casos se puede usar list_files_page.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            prefix: Carpeta a listar
+            sort: 'key', 'size', 'last_modified' o 'storage_class'
+            descending: Orden descendente
+            offset: Posición de la primera entrada (carpetas + archivos)
+            page_size: Máximo de entradas por página
+            delimiter: '/' para listar solo un nivel de carpetas
+            use_cache: Si es False la carpeta se contrasta con S3 aunque se haya hecho hace poco
+            
+        Returns:
+            Tuple (éxito, {'files', 'folders', 'total_files', 'total_folders', 'offset',
+            'pending', 'cataloged'}, mensaje_error)
+        """
+        empty_page = {'files': [], 'folders': [], 'total_files': 0, 'total_folders': 0, 'offset': 0,
+                      'pending': False, 'cataloged': False}
+        if prefix.startswith(DERIVATIVES_PREFIX):
+            return True, empty_page, None
+        
         try:
-            response = self.s3_client.list_objects_v2(Bucket=bucket_name)
+            catalog = get_metadata_catalog()
+            if not catalog.can_index(bucket_name):
+                return True, empty_page, None
+            if catalog.index_bucket(bucket_name):
+                return True, {**empty_page, 'pending': True}, None
+            page = catalog.sorted_page(bucket_name, prefix, sort, descending, offset, page_size, delimiter)
+            if delimiter:
+                catalog.refresh(bucket_name, prefix, force=not use_cache)
+            return True, {**page, 'pending': False, 'cataloged': True}, None
+        except Exception as e:
+            return False, empty_page, f"Error leyendo el catálogo: {str(e)}"
+    
+    @staticmethod
+    def _copy_page(page: Dict) -> Dict:
+        """Copia superficial de una página para no exponer las listas de la caché."""
+        return {**page, 'files': list(page['files']), 'folders': list(page['folders'])}
+    
+    @staticmethod
+    def get_cache_stats() -> Dict[str, int]:
+        """
+        Contadores de la caché de listados y de las llamadas agrupadas.
+        
+        Returns:
+            Diccionario con las estadísticas de la caché
+        """
+        return {**listing_cache.stats(), **{f'inflight_{k}': v for k, v in inflight.stats().items()}}
+    
+    @staticmethod
+    def invalidate_listing_cache(bucket_name: str) -> int:
+        """
+        Descartar todas las páginas en caché de un bucket.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            
+        Returns:
+            Número de páginas descartadas
+        """
+        _bump_generation(bucket_name)
+        return listing_cache.invalidate_where(lambda key: key[0] == 'list' and key[1] == bucket_name)
+    
+    @staticmethod
+    def _cached_pages_for(bucket_name: str, object_key: str):
+        """Predicado: páginas en caché del bucket cuyo prefijo contiene la clave."""
+        return lambda key: (
+            key[0] == 'list'
+            and key[1] == bucket_name
+            and object_key.startswith(key[2])
+        )
+    
+    @staticmethod
+    def _subfolder_of(cache_key: tuple, object_key: str) -> Optional[str]:
+        """
+        Carpeta inmediata bajo la que aparece la clave en una página por niveles.
+        
+        Returns:
+            Prefijo de la subcarpeta, o None si la clave es un archivo de ese nivel
+        """
+        _, _, prefix, delimiter = cache_key[:4]
+        if not delimiter:
+            return None
+        rest = object_key[len(prefix):]
+        if delimiter not in rest:
+            return None
+        return prefix + rest.split(delimiter)[0] + delimiter
+    
+    def _after_upload(self, bucket_name: str, row: Dict):
+        """
+        Actualizar las páginas en caché tras subir un archivo.
+        
+        Si la clave ya estaba listada se reemplaza su fila; si cae dentro del
+        rango de una página se inserta en orden. Cuando no se puede saber a qué
+        página pertenece, se invalidan las páginas afectadas.
+        """
+        object_key = row['key']
+        stale = []
+        _bump_generation(bucket_name)
+        
+        def patch(cache_key, page):
+            folder = self._subfolder_of(cache_key, object_key)
+            if folder is not None:
+                # En la vista por carpetas el archivo solo hace aparecer su carpeta
+                if not any(f['prefix'] == folder for f in page['folders']):
+                    stale.append(cache_key)
+                return None
             
-            if 'Contents' not in response:
-                return True, [], None
+            keys = [f['key'] for f in page['files']]
+            if object_key in keys:
+                files = list(page['files'])
+                files[keys.index(object_key)] = row
+            elif keys and (keys[0] <= object_key <= keys[-1]
+                           or (object_key > keys[-1] and not page['next_cursor'])):
+                files = sorted(page['files'] + [row], key=lambda f: f['key'])
+            elif not keys and not page['next_cursor']:
+                files = [row]
+            else:
+                stale.append(cache_key)
+                return None
+            return {**page, 'files': files}
+        
+        listing_cache.update_where(self._cached_pages_for(bucket_name, object_key), patch)
+        for cache_key in stale:
+            listing_cache.invalidate(cache_key)
+        
+        # La miniatura se genera en segundo plano, sin retrasar la subida
+        get_derivative_pipeline().enqueue(bucket_name, object_key, row.get('etag') or None)
+        get_storage_rollup().folder_changed(bucket_name, parent_folder(object_key))
+        get_metadata_catalog().object_stored(bucket_name, row)
+    
+    def _after_delete(self, bucket_name: str, object_keys: List[str]):
+        """Quitar archivos eliminados de las páginas en caché que los contengan."""
+        if not object_keys:
+            return
+        removed = set(object_keys)
+        deleted = sorted(removed)
+        stale = []
+        _bump_generation(bucket_name)
+        
+        def keys_under(prefix: str) -> List[str]:
+            start = bisect.bisect_left(deleted, prefix)
+            end = start
+            while end < len(deleted) and deleted[end].startswith(prefix):
+                end += 1
+            return deleted[start:end]
+        
+        def affected(cache_key) -> bool:
+            return cache_key[0] == 'list' and cache_key[1] == bucket_name and bool(keys_under(cache_key[2]))
+        
+        def patch(cache_key, page):
+            if any(self._subfolder_of(cache_key, key) is not None for key in keys_under(cache_key[2])):
+                # La carpeta pudo quedar vacía: esa página debe volver a listarse
+                stale.append(cache_key)
+                return None
+            files = [f for f in page['files'] if f['key'] not in removed]
+            if len(files) == len(page['files']):
+                return None
+            return {**page, 'files': files}
+        
+        listing_cache.update_where(affected, patch)
+        for cache_key in stale:
+            listing_cache.invalidate(cache_key)
+        
+        rollup = get_storage_rollup()
+        for folder in {parent_folder(key) for key in deleted}:
+            rollup.folder_changed(bucket_name, folder)
+        get_metadata_catalog().objects_deleted(bucket_name, deleted)
+    
+    def _after_delete_prefix(self, bucket_name: str, prefix: str):
+        """Actualizar las páginas en caché tras eliminar una carpeta completa."""
+        stale = []
+        _bump_generation(bucket_name)
+        
+        def affected(cache_key) -> bool:
+            return cache_key[0] == 'list' and cache_key[1] == bucket_name and (
+                cache_key[2].startswith(prefix) or prefix.startswith(cache_key[2])
+            )
+        
+        def patch(cache_key, page):
+            if cache_key[2].startswith(prefix):
+                stale.append(cache_key)
+                return None
+            folder = self._subfolder_of(cache_key, prefix)
+            if folder == prefix:
+                # La carpeta eliminada cuelga directamente de este nivel
+                folders = [f for f in page['folders'] if f['prefix'] != prefix]
+                return {**page, 'folders': folders}
+            if folder is not None:
+                # Su carpeta contenedora pudo quedar vacía
+                stale.append(cache_key)
+                return None
+            files = [f for f in page['files'] if not f['key'].startswith(prefix)]
+            return {**page, 'files': files}
+        
+        listing_cache.update_where(affected, patch)
+        for cache_key in stale:
+            listing_cache.invalidate(cache_key)
+        
+        get_storage_rollup().subtree_removed(bucket_name, prefix)
+        get_metadata_catalog().prefix_deleted(bucket_name, prefix)
+    
+    def list_files(self, bucket_name: str, prefix: str = '') -> Tuple[bool, List[Dict], Optional[str]]:
+        """
+        Listar todos los archivos de un bucket (recorre todas las páginas).
+        
+        Args:
+            bucket_name: Nombre del bucket
+            prefix: Prefijo de las claves a listar
             
+        Returns:
+            Tuple (éxito, lista_archivos, mensaje_error)
+        """
+        try:
             files = []
-            for obj in response['Contents']:
-                file_info = {
-                    'key': obj['Key'],
-                    'name': obj['Key'].split('/')[-1],  # Nombre del archivo
-                    'size': obj['Size'],
-                    'size_mb': round(obj['Size'] / (1024 * 1024), 2),
-                    'last_modified': obj['LastModified'].strftime('%Y-%m-%d %H:%M:%S'),
-                    'storage_class': obj.get('StorageClass', 'STANDARD')
-                }
-                files.append(file_info)
+            for page in self.iter_pages(bucket_name, prefix=prefix):
+                files.extend(page['files'])
             
             # Ordenar por fecha (más recientes primero)
             files.sort(key=lambda x: x['last_modified'], reverse=True)
             
             return True, files, None
             
+        except ClientError as e:
+            return False, [], self._list_error_message(e, bucket_name)
+        except Exception as e:
+            return False, [], f"Error inesperado: {str(e)}"
+    
+    def get_file_info(self, bucket_name: str, object_key: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
+        """
+        Obtener los metadatos de un archivo (HEAD) sin descargarlo.
+        
+        Las consultas idénticas simultáneas comparten una sola llamada a S3.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            object_key: Nombre del archivo en S3
+            
+        Returns:
+            Tuple (éxito, metadatos, mensaje_error)
+        """
+        try:
+            response = inflight.do(
+                ('head', bucket_name, object_key),
+                lambda: self.s3_client.head_object(Bucket=bucket_name, Key=object_key)
+            )
+            
+            info = self._format_object({
+                'Key': object_key,
+                'Size': response['ContentLength'],
+                'LastModified': response['LastModified'],
+                'StorageClass': response.get('StorageClass', 'STANDARD')
+            })
+            info['etag'] = response.get('ETag', '').strip('"')
+            info['content_type'] = response.get('ContentType', '')
+            info['metadata'] = response.get('Metadata', {})
+            return True, info, None
+            
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code in ('404', 'NoSuchKey', 'NotFound'):
+                return False, None, f"El archivo '{object_key}' no existe"
+            elif error_code in ('403', 'AccessDenied'):
+                return False, None, "No tienes permisos para consultar este archivo"
+            else:
+                return False, None, f"Error: {str(e)}"
+        except Exception as e:
+            return False, None, f"Error inesperado: {str(e)}"
+    
+    def get_preview(self, bucket_name: str, object_key: str, etag: Optional[str] = None,
+                    max_bytes: int = PREVIEW_BYTES) -> Tuple[bool, Optional[Dict], Optional[str]]:
+        """
+        Vista previa de un archivo leyendo solo sus primeros bytes.
+        
+        Se pide a S3 un rango (Range: bytes=0-N), así que previsualizar un CSV
+        de varios GB cuesta lo mismo que uno pequeño. El resultado se guarda
+        en caché por ETag; si se conoce el ETag (viene en cada fila del
+        listado) una vista ya generada no hace ninguna petición.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            object_key: Nombre del archivo en S3
+            etag: ETag conocido del objeto
+            max_bytes: Bytes a leer desde el inicio
+            
+        Returns:
+            Tuple (éxito, vista_previa, mensaje_error). La vista incluye 'kind'
+            ('table', 'text' o 'unsupported'), 'columns', 'rows', 'text',
+            'truncated', 'bytes_read', 'total_size' y 'etag'
+        """
+        if etag:
+            preview = preview_cache.get(('preview', bucket_name, object_key, etag, max_bytes))
+            if preview is not None:
+                return True, preview, None
+        
+        def fetch():
+            response = self.s3_client.get_object(
+                Bucket=bucket_name,
+                Key=object_key,
+                Range=f'bytes=0-{max_bytes - 1}'
+            )
+            data = response['Body'].read()
+            # ContentRange: 'bytes 0-65535/3221225472' (ausente si el objeto es más pequeño)
+            content_range = response.get('ContentRange', '')
+            total_size = int(content_range.rsplit('/', 1)[1]) if '/' in content_range else len(data)
+            bytes_read = len(data)
+            truncated = total_size > len(data)
+            
+            if response.get('ContentEncoding') == 'gzip':
+                # Objeto subido comprimido: se descomprime el comienzo leído
+                compressed_truncated = truncated
+                data = gunzip_prefix(data, max_bytes + 1)
+                truncated = compressed_truncated or len(data) > max_bytes
+                data = data[:max_bytes]
+                total_size = int(response.get('Metadata', {}).get(ORIGINAL_SIZE_METADATA_KEY, total_size))
+            
+            preview = build_preview(data, object_key, response.get('ContentType'),
+                                    truncated=truncated)
+            preview.update({
+                'truncated': truncated,
+                'bytes_read': bytes_read,
+                'total_size': total_size,
+                'etag': response.get('ETag', '').strip('"')
+            })
+            preview_cache.set(('preview', bucket_name, object_key, preview['etag'], max_bytes), preview)
+            return preview
+        
+        try:
+            preview = inflight.do(('preview', bucket_name, object_key, max_bytes), fetch)
+            return True, preview, None
+            
         except ClientError as e:
             error_code = e.response['Error']['Code']
-            if error_code == 'NoSuchBucket':
-                return False, [], f"El bucket '{bucket_name}' no existe"
+            if error_code in ('NoSuchKey', '404'):
+                return False, None, f"El archivo '{object_key}' no existe"
+            elif error_code == 'InvalidRange':
+                # Objeto vacío: no hay bytes que pedir
+                preview = build_preview(b'', object_key)
+                preview.update({'truncated': False, 'bytes_read': 0, 'total_size': 0, 'etag': etag or ''})
+                return True, preview, None
             elif error_code == 'AccessDenied':
-                return False, [], "No tienes permisos para acceder a este bucket"
+                return False, None, "No tienes permisos para leer este archivo"
             else:
-                return False, [], f"Error: {str(e)}"
+                return False, None, f"Error: {str(e)}"
         except Exception as e:
-            return False, [], f"Error inesperado: {str(e)}"
+            return False, None, f"Error inesperado: {str(e)}"
     
-    def upload_file(self, file_path: str, bucket_name: str, object_key: str) -> Tuple[bool, Optional[str]]:
+    def upload_file(self, file_path: str, bucket_name: str, object_key: str,
+                    profile: Optional[str] = None) -> Tuple[bool, Optional[str]]:
         """
         Subir un archivo a S3.
         
@@ -111,12 +713,22 @@ class S3Manager:
             file_path: Ruta local del archivo
             bucket_name: Nombre del bucket
             object_key: Nombre del archivo en S3
+            profile: Perfil de transferencia (default: según el tamaño del archivo)
             
         Returns:
             Tuple (éxito, mensaje_error)
         """
         try:
-            self.s3_client.upload_file(file_path, bucket_name, object_key)
+            size = os.path.getsize(file_path)
+            self.s3_client.upload_file(
+                file_path, bucket_name, object_key,
+                Config=get_transfer_config(size, profile)
+            )
+            self._after_upload(bucket_name, self._format_object({
+                'Key': object_key,
+                'Size': size,
+                'LastModified': datetime.now(timezone.utc)
+            }))
             return True, None
             
         except FileNotFoundError:
@@ -130,84 +742,1326 @@ class S3Manager:
         except Exception as e:
             return False, f"Error inesperado: {str(e)}"
     
-    def download_file(self, bucket_name: str, object_key: str, download_path: str) -> Tuple[bool, Optional[str]]:
+    def upload_fileobj(self, fileobj: BinaryIO, bucket_name: str, object_key: str,
+                       content_type: Optional[str] = None,
+                       size: Optional[int] = None,
+                       progress_callback: Optional[Callable[[int], None]] = None,
+                       metadata: Optional[Dict[str, str]] = None,
+                       compress: Optional[bool] = None) -> Tuple[bool, Optional[str]]:
         """
-        Descargar un archivo de S3.
+        Subir a S3 el contenido de un archivo abierto, sin copiarlo antes.
+        
+        Los datos se leen por bloques y se envían como partes de una subida
+        multipart, así que la memoria usada no depende del tamaño del archivo.
+        
+        Con compresión, los archivos de texto de tamaño conocido se suben
+        comprimidos con gzip a medida que se leen, con Content-Encoding: gzip
+        (el navegador los descomprime al descargarlos) y el tamaño original
+        en el metadato original-size. Estas subidas no se pueden reanudar.
         
         Args:
+            fileobj: Objeto tipo archivo abierto en modo binario
             bucket_name: Nombre del bucket
             object_key: Nombre del archivo en S3
-            download_path: Ruta local donde guardar
+            content_type: Content-Type del objeto (opcional)
+            size: Tamaño total si se conoce (ajusta el tamaño de parte)
+            progress_callback: Función que recibe los bytes ya enviados a S3
+            metadata: Metadatos de usuario del objeto (opcional)
+            compress: Comprimir si es texto (default: S3_COMPRESS_UPLOADS)
             
         Returns:
             Tuple (éxito, mensaje_error)
         """
+        if compress is None:
+            compress = COMPRESS_UPLOADS
+        compress = bool(compress and size and size >= COMPRESS_MIN_SIZE
+                        and is_compressible(object_key, content_type))
+        
+        reader = None
+        if compress:
+            reader = fileobj = GzipReader(fileobj)
+            metadata = {**(metadata or {}), ORIGINAL_SIZE_METADATA_KEY: str(size)}
+        
+        uploader = MultipartUploader(
+            self.s3_client,
+            bucket_name,
+            object_key,
+            part_size=choose_part_size(size),
+            content_type=content_type,
+            # El contenido comprimido no se puede comparar con partes ya subidas
+            state_store=None if compress else get_upload_state_store(),
+            total_size=size,
+            metadata=metadata,
+            content_encoding='gzip' if compress else None
+        )
+        
         try:
-            self.s3_client.download_file(bucket_name, object_key, download_path)
+            while True:
+                chunk = fileobj.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                uploader.write(chunk)
+                if progress_callback:
+                    # El progreso se mide sobre el archivo original
+                    progress_callback(reader.raw_size if reader else uploader.bytes_uploaded)
+            
+            total = uploader.complete()
+            if progress_callback:
+                progress_callback(reader.raw_size if reader else total)
+            self._after_upload(bucket_name, self._format_object({
+                'Key': object_key,
+                'Size': total,
+                'LastModified': datetime.now(timezone.utc)
+            }))
             return True, None
             
         except ClientError as e:
+            uploader.abort()
             error_code = e.response['Error']['Code']
-            if error_code == 'NoSuchKey':
-                return False, f"El archivo '{object_key}' no existe"
-            elif error_code == 'AccessDenied':
-                return False, "No tienes permisos para descargar este archivo"
+            if error_code == 'AccessDenied':
+                return False, "No tienes permisos para subir archivos a este bucket"
             else:
                 return False, f"Error: {str(e)}"
         except Exception as e:
+            # Fallo de red o del proceso: se conservan las partes para reanudar
+            if uploader.resumable:
+                uploader.suspend()
+            else:
+                uploader.abort()
             return False, f"Error inesperado: {str(e)}"
     
-    def delete_file(self, bucket_name: str, object_key: str) -> Tuple[bool, Optional[str]]:
+    def store_fileobj(self, fileobj: BinaryIO, bucket_name: str, object_key: str,
+                      content_type: Optional[str] = None,
+                      size: Optional[int] = None,
+                      progress_callback: Optional[Callable[[int], None]] = None) -> Tuple[bool, Optional[str], Optional[str]]:
         """
-        Eliminar un archivo de S3.
+        Subir un archivo sin transferir contenido que ya está en S3.
+        
+        Se calcula el SHA-256 del archivo antes de subirlo. Si el destino ya
+        tiene ese contenido no se hace nada; si está en otra ubicación del
+        índice dentro del mismo bucket se hace una copia del lado de S3 (con
+        el Content-Type de la subida, no el del original). Si no, se sube
+        normalmente con el hash como metadato y se registra en el índice.
+        Nunca se copia desde otro bucket: el rol que sube podría no tener
+        acceso a él.
         
         Args:
+            fileobj: Objeto tipo archivo abierto en modo binario
             bucket_name: Nombre del bucket
             object_key: Nombre del archivo en S3
+            content_type: Content-Type del objeto (opcional)
+            size: Tamaño total si se conoce
+            progress_callback: Función que recibe los bytes ya enviados a S3
             
         Returns:
-            Tuple (éxito, mensaje_error)
+            Tuple (éxito, resultado, mensaje_error) con resultado 'uploaded',
+            'copied' (copia del lado de S3) o 'existing' (ya estaba en el destino)
         """
+        seekable = getattr(fileobj, 'seekable', lambda: False)()
+        
+        if not seekable:
+            # Sin poder releer el archivo, el hash solo sirve para futuras subidas
+            reader = HashingReader(fileobj)
+            success, error = self.upload_fileobj(
+                reader, bucket_name, object_key, content_type, size, progress_callback
+            )
+            if success and reader.size >= DEDUP_MIN_SIZE:
+                # El objeto no lleva el hash como metadato: se identifica por su ETag
+                try:
+                    etag = self.s3_client.head_object(Bucket=bucket_name, Key=object_key)['ETag']
+                    self._index_content(reader.hexdigest(), bucket_name, object_key, reader.size, etag)
+                except Exception as e:
+                    print(f"Error actualizando el índice de contenido: {e}")
+            return success, 'uploaded' if success else None, error
+        
         try:
-            self.s3_client.delete_object(Bucket=bucket_name, Key=object_key)
-            return True, None
+            digest, size = hash_fileobj(fileobj)
+        except Exception as e:
+            return False, None, f"Error leyendo el archivo: {str(e)}"
+        
+        if size >= DEDUP_MIN_SIZE:
+            source = self._find_content(digest, size, bucket_name, object_key)
+            if source and source[:2] == (bucket_name, object_key):
+                if progress_callback:
+                    progress_callback(size)
+                return True, 'existing', None
+            if source:
+                source_bucket, source_key, head = source
+                success, error = self.copy_file(
+                    source_bucket, source_key, bucket_name, object_key, head['ContentLength'],
+                    object_params=self._dedup_object_params(head, digest, content_type)
+                )
+                if success:
+                    if progress_callback:
+                        progress_callback(size)
+                    return True, 'copied', None
+                # Si la copia falla se intenta la subida normal
+        
+        success, error = self.upload_fileobj(
+            fileobj, bucket_name, object_key, content_type, size, progress_callback,
+            metadata={HASH_METADATA_KEY: digest}
+        )
+        if success:
+            self._index_content(digest, bucket_name, object_key, size)
+        return success, 'uploaded' if success else None, error
+    
+    def _find_content(self, digest: str, size: int, bucket_name: str,
+                      object_key: str) -> Optional[Tuple[str, str, Dict]]:
+        """
+        Buscar un objeto con el mismo contenido en el bucket de destino.
+        
+        Primero se mira el propio destino (la resubida del mismo archivo es
+        el caso más común) y después la ubicación registrada en el índice,
+        solo si está en el mismo bucket: el índice es común a todos los
+        buckets y no debe revelar ni copiar contenido de uno al que el rol no
+        accede. Cada candidato se verifica con HEAD (por el metadato con el
+        hash o por el ETag registrado): el índice puede estar desactualizado.
+        
+        Returns:
+            (bucket, clave, HEAD) del objeto con ese contenido, o None
+        """
+        candidates = [(bucket_name, object_key)]
+        record = get_content_index().get(digest)
+        if record and record['bucket'] != bucket_name:
+            record = None
+        if record and record['key'] != object_key:
+            candidates.append((record['bucket'], record['key']))
+        
+        for candidate in candidates:
+            try:
+                head = self.s3_client.head_object(Bucket=candidate[0], Key=candidate[1])
+            except Exception:
+                continue
+            stored_size = int(head.get('Metadata', {}).get(ORIGINAL_SIZE_METADATA_KEY, head['ContentLength']))
+            if stored_size != size:
+                continue
+            if head.get('Metadata', {}).get(HASH_METADATA_KEY) == digest:
+                return (*candidate, head)
+            if record and candidate == (record['bucket'], record['key']) and record.get('etag') == head['ETag']:
+                return (*candidate, head)
+        
+        if record:
+            # La ubicación registrada ya no tiene ese contenido
+            get_content_index().delete(digest)
+        return None
+    
+    @staticmethod
+    def _dedup_object_params(head: Dict, digest: str, content_type: Optional[str]) -> Dict:
+        """
+        Content-Type y metadatos de la copia que reemplaza a una subida.
+        
+        Son los de la subida; del original solo se conserva la compresión,
+        porque los bytes copiados siguen comprimidos.
+        """
+        metadata = {HASH_METADATA_KEY: digest}
+        params = {}
+        if content_type:
+            params['ContentType'] = content_type
+        if head.get('ContentEncoding'):
+            params['ContentEncoding'] = head['ContentEncoding']
+            original_size = head.get('Metadata', {}).get(ORIGINAL_SIZE_METADATA_KEY)
+            if original_size:
+                metadata[ORIGINAL_SIZE_METADATA_KEY] = original_size
+        params['Metadata'] = metadata
+        return params
+    
+    def _index_content(self, digest: str, bucket_name: str, object_key: str, size: int,
+                       etag: Optional[str] = None):
+        """Registrar dónde está un contenido recién subido."""
+        if size < DEDUP_MIN_SIZE:
+            return
+        record = {'bucket': bucket_name, 'key': object_key, 'size': size}
+        if etag:
+            record['etag'] = etag
+        try:
+            get_content_index().save(digest, record)
+        except Exception as e:
+            print(f"Error actualizando el índice de contenido: {e}")
+    
+    def create_direct_upload(self, bucket_name: str, object_key: str, size: int,
+                             content_type: Optional[str] = None,
+                             expiration: int = 3600) -> Tuple[bool, Optional[Dict], Optional[str]]:
+        """
+        Preparar una subida que el navegador hace directamente a S3.
+        
+        Los archivos pequeños reciben una política de POST prefirmada; los
+        grandes, una subida multipart con una URL prefirmada por parte. El
+        backend solo autoriza y, al final, completa la subida.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            object_key: Nombre del archivo en S3
+            size: Tamaño del archivo en bytes
+            content_type: Content-Type del objeto (opcional)
+            expiration: Validez de las firmas en segundos
+            
+        Returns:
+            Tuple (éxito, plan_de_subida, mensaje_error)
+        """
+        try:
+            if size <= PRESIGNED_POST_MAX_SIZE:
+                fields = {'Content-Type': content_type} if content_type else {}
+                conditions = [['content-length-range', 0, max(size, 1)]]
+                if content_type:
+                    conditions.append({'Content-Type': content_type})
+                
+                post = self.s3_client.generate_presigned_post(
+                    Bucket=bucket_name,
+                    Key=object_key,
+                    Fields=fields,
+                    Conditions=conditions,
+                    ExpiresIn=expiration
+                )
+                return True, {
+                    'method': 'post',
+                    'key': object_key,
+                    'url': post['url'],
+                    'fields': post['fields']
+                }, None
+            
+            part_size = choose_part_size(size)
+            params = {'Bucket': bucket_name, 'Key': object_key}
+            if content_type:
+                params['ContentType'] = content_type
+            upload_id = self.s3_client.create_multipart_upload(**params)['UploadId']
+            
+            part_count = -(-size // part_size)
+            urls = [
+                self.s3_client.generate_presigned_url(
+                    'upload_part',
+                    Params={
+                        'Bucket': bucket_name,
+                        'Key': object_key,
+                        'UploadId': upload_id,
+                        'PartNumber': part_number
+                    },
+                    ExpiresIn=expiration
+                )
+                for part_number in range(1, part_count + 1)
+            ]
+            return True, {
+                'method': 'multipart',
+                'key': object_key,
+                'upload_id': upload_id,
+                'part_size': part_size,
+                'urls': urls
+            }, None
             
         except ClientError as e:
             error_code = e.response['Error']['Code']
             if error_code == 'AccessDenied':
-                return False, "No tienes permisos para eliminar archivos"
+                return False, None, "No tienes permisos para subir archivos a este bucket"
             else:
-                return False, f"Error: {str(e)}"
+                return False, None, f"Error: {str(e)}"
         except Exception as e:
-            return False, f"Error inesperado: {str(e)}"
+            return False, None, f"Error inesperado: {str(e)}"
     
-    def get_download_url(self, bucket_name: str, object_key: str, expiration: int = 3600) -> Tuple[bool, Optional[str], Optional[str]]:
+    def complete_direct_upload(self, bucket_name: str, object_key: str,
+                               upload_id: Optional[str] = None,
+                               parts: Optional[List[Dict]] = None) -> Tuple[bool, Optional[str]]:
         """
-        Generar URL pre-firmada para descargar un archivo.
+        Cerrar una subida directa hecha por el navegador.
+        
+        Para las subidas multipart se completa la subida con las partes
+        reportadas; en ambos casos se confirma el objeto con un HEAD antes de
+        actualizar la caché de listados.
         
         Args:
             bucket_name: Nombre del bucket
-            object_key: Nombre del archivo
-            expiration: Tiempo de expiración en segundos (default: 1 hora)
+            object_key: Nombre del archivo en S3
+            upload_id: UploadId de la subida multipart (None para POST)
+            parts: Lista de {'PartNumber', 'ETag'} devuelta por el navegador
             
         Returns:
-            Tuple (éxito, url, mensaje_error)
+            Tuple (éxito, mensaje_error)
         """
         try:
-            filename = object_key.split('/')[-1]
-
-            url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': bucket_name, 
-                    'Key': object_key,
-                    'ResponseContentDisposition': f'attachment; filename="{filename}"'
-                },
-                ExpiresIn=expiration
-            )
-            return True, url, None
+            if upload_id:
+                self.s3_client.complete_multipart_upload(
+                    Bucket=bucket_name,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    MultipartUpload={'Parts': sorted(parts or [], key=lambda p: p['PartNumber'])}
+                )
+            
+            success, info, error = self.get_file_info(bucket_name, object_key)
+            if not success:
+                return False, error
+            
+            self._after_upload(bucket_name, {
+                key: info[key] for key in ('key', 'name', 'size', 'size_mb', 'last_modified', 'storage_class')
+            })
+            return True, None
             
         except ClientError as e:
-            return False, None, f"Error generando URL: {str(e)}"
+            if upload_id:
+                self.abort_direct_upload(bucket_name, object_key, upload_id)
+            return False, f"Error completando la subida: {str(e)}"
         except Exception as e:
-            return False, None, f"Error inesperado: {str(e)}"
+            return False, f"Error inesperado: {str(e)}"
+    
+    def abort_direct_upload(self, bucket_name: str, object_key: str, upload_id: str):
+        """Cancelar una subida multipart directa que el navegador no terminó."""
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=bucket_name,
+                Key=object_key,
+                UploadId=upload_id
+            )
+        except Exception as e:
+            print(f"Error cancelando subida directa: {e}")
+    
+    def abort_stale_multipart_uploads(self, bucket_name: str, max_age_hours: float = 24) -> Tuple[bool, int, Optional[str]]:
+        """
+        Cancelar subidas multipart abandonadas para que no sigan cobrando almacenamiento.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            max_age_hours: Antigüedad a partir de la cual una subida se considera abandonada
+            
+        Returns:
+            Tuple (éxito, subidas_canceladas, mensaje_error)
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+        store = get_upload_state_store()
+        aborted = 0
+        
+        try:
+            stale = []
+            paginator = self.s3_client.get_paginator('list_multipart_uploads')
+            for page in paginator.paginate(Bucket=bucket_name):
+                for upload in page.get('Uploads', []):
+                    if upload['Initiated'] < cutoff:
+                        stale.append(upload)
+            
+            if not stale:
+                return True, 0, None
+            
+            # Registros locales de esas subidas, para borrarlos también
+            stale_ids = {upload['UploadId'] for upload in stale}
+            records = {
+                record['upload_id']: fingerprint
+                for fingerprint, record in store.items()
+                if record.get('upload_id') in stale_ids
+            }
+            
+            for upload in stale:
+                self.s3_client.abort_multipart_upload(
+                    Bucket=bucket_name,
+                    Key=upload['Key'],
+                    UploadId=upload['UploadId']
+                )
+                if upload['UploadId'] in records:
+                    store.delete(records[upload['UploadId']])
+                aborted += 1
+            
+            return True, aborted, None
+            
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code == 'AccessDenied':
+                return False, aborted, "No tienes permisos para cancelar subidas en este bucket"
+            else:
+                return False, aborted, f"Error: {str(e)}"
+        except Exception as e:
+            return False, aborted, f"Error inesperado: {str(e)}"
+    
+    def download_file(self, bucket_name: str, object_key: str, download_path: str,
+                      size: Optional[int] = None, profile: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Descargar un archivo de S3.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            object_key: Nombre del archivo en S3
+            download_path: Ruta local donde guardar
+            size: Tamaño del objeto si ya se conoce (si no, se toma del HEAD)
+            profile: Perfil de transferencia (default: según el tamaño del objeto)
+            
+        Returns:
+            Tuple (éxito, mensaje_error)
+        """
+        try:
+            # El HEAD indica además si el objeto se guardó comprimido
+            head = self.s3_client.head_object(Bucket=bucket_name, Key=object_key)
+            self.s3_client.download_file(
+                bucket_name, object_key, download_path,
+                Config=get_transfer_config(size or head['ContentLength'], profile)
+            )
+            if head.get('ContentEncoding') == 'gzip':
+                gunzip_file(download_path)
+            return True, None
+            
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code in ('404', 'NoSuchKey', 'NotFound'):
+                return False, f"El archivo '{object_key}' no existe"
+            elif error_code == 'AccessDenied':
+                return False, "No tienes permisos para descargar este archivo"
+            else:
+                return False, f"Error: {str(e)}"
+        except Exception as e:
+            return False, f"Error inesperado: {str(e)}"
+    
+    def delete_file(self, bucket_name: str, object_key: str) -> Tuple[bool, Optional[str]]:
+        """
+        Eliminar un archivo de S3.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            object_key: Nombre del archivo en S3
+            
+        Returns:
+            Tuple (éxito, mensaje_error)
+        """
+        try:
+            self.s3_client.delete_object(Bucket=bucket_name, Key=object_key)
+            self._after_delete(bucket_name, [object_key])
+            return True, None
+            
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code == 'AccessDenied':
+                return False, "No tienes permisos para eliminar archivos"
+            else:
+                return False, f"Error: {str(e)}"
+        except Exception as e:
+            return False, f"Error inesperado: {str(e)}"
+    
+    @staticmethod
+    def _copy_error_message(e: ClientError) -> str:
+        """Traducir un ClientError de copia a un mensaje para el usuario."""
+        error_code = e.response['Error']['Code']
+        if error_code in ('404', 'NoSuchKey', 'NotFound'):
+            return "El archivo de origen no existe"
+        elif error_code == 'NoSuchBucket':
+            return "El bucket de origen o de destino no existe"
+        elif error_code == 'AccessDenied':
+            return "No tienes permisos para copiar entre estos buckets"
+        return f"Error: {str(e)}"
+    
+    def _copy_object(self, source_bucket: str, source_key: str,
+                     dest_bucket: str, dest_key: str, size: int,
+                     source_version: Optional[str] = None,
+                     object_params: Optional[Dict] = None):
+        """
+        Copiar un objeto dentro de S3 sin pasar los datos por la aplicación.
+        
+        Args:
+            object_params: ContentType, ContentEncoding y Metadata de la copia
+                (None = los del origen)
+        
+        Raises:
+            ClientError: Si S3 rechaza la copia
+        """
+        if size <= COPY_OBJECT_MAX_SIZE:
+            extra = {'MetadataDirective': 'REPLACE', **object_params} if object_params is not None else {}
+            self.s3_client.copy_object(
+                CopySource=self._copy_source(source_bucket, source_key, source_version),
+                Bucket=dest_bucket,
+                Key=dest_key,
+                **extra
+            )
+        else:
+            self._multipart_copy(source_bucket, source_key, dest_bucket, dest_key, size,
+                                 source_version, object_params)
+    
+    @staticmethod
+    def _copy_source(bucket_name: str, object_key: str, version_id: Optional[str] = None) -> Dict:
+        """Origen de una copia (una versión concreta si se indica)."""
+        source = {'Bucket': bucket_name, 'Key': object_key}
+        if version_id:
+            source['VersionId'] = version_id
+        return source
+    
+    def _multipart_copy(self, source_bucket: str, source_key: str,
+                        dest_bucket: str, dest_key: str, size: int,
+                        source_version: Optional[str] = None,
+                        object_params: Optional[Dict] = None):
+        """
+        Copiar un objeto de más de 5 GB con UploadPartCopy en paralelo.
+        
+        Las partes son rangos del objeto de origen que S3 copia internamente;
+        si alguna falla se cancela la subida para no dejar partes huérfanas.
+        
+        Raises:
+            ClientError: Si S3 rechaza alguna parte o la finalización
+        """
+        if object_params is not None:
+            params = {'Bucket': dest_bucket, 'Key': dest_key, **object_params}
+        else:
+            head_params = {'Bucket': source_bucket, 'Key': source_key}
+            if source_version:
+                head_params['VersionId'] = source_version
+            head = self.s3_client.head_object(**head_params)
+            params = {'Bucket': dest_bucket, 'Key': dest_key, 'Metadata': head.get('Metadata', {})}
+            for field in ('ContentType', 'ContentEncoding', 'ContentDisposition', 'CacheControl'):
+                if head.get(field):
+                    params[field] = head[field]
+        
+        upload_id = self.s3_client.create_multipart_upload(**params)['UploadId']
+        part_size = max(COPY_PART_SIZE, math.ceil(size / MAX_PARTS))
+        ranges = [
+            (number, start, min(start + part_size, size) - 1)
+            for number, start in enumerate(range(0, size, part_size), start=1)
+        ]
+        
+        def copy_part(part):
+            number, start, end = part
+            response = self.s3_client.upload_part_copy(
+                Bucket=dest_bucket,
+                Key=dest_key,
+                UploadId=upload_id,
+                PartNumber=number,
+                CopySource=self._copy_source(source_bucket, source_key, source_version),
+                CopySourceRange=f'bytes={start}-{end}'
+            )
+            return {'PartNumber': number, 'ETag': response['CopyPartResult']['ETag']}
+        
+        try:
+            with ThreadPoolExecutor(max_workers=min(COPY_CONCURRENCY, len(ranges))) as pool:
+                parts = list(pool.map(copy_part, ranges))
+            self.s3_client.complete_multipart_upload(
+                Bucket=dest_bucket,
+                Key=dest_key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            try:
+                self.s3_client.abort_multipart_upload(Bucket=dest_bucket, Key=dest_key, UploadId=upload_id)
+            except Exception as e:
+                print(f"Error cancelando copia multipart: {e}")
+            raise
+    
+    def copy_file(self, source_bucket: str, source_key: str, dest_bucket: str, dest_key: str,
+                  size: Optional[int] = None,
+                  object_params: Optional[Dict] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Copiar un archivo entre buckets (o dentro del mismo) del lado de S3.
+        
+        Args:
+            source_bucket: Bucket de origen
+            source_key: Clave de origen
+            dest_bucket: Bucket de destino
+            dest_key: Clave de destino
+            size: Tamaño del objeto si ya se conoce (si no, se consulta con HEAD)
+            object_params: ContentType, ContentEncoding y Metadata de la copia
+                (None = se conservan los del origen)
+            
+        Returns:
+            Tuple (éxito, mensaje_error)
+        """
+        if source_bucket == dest_bucket and source_key == dest_key:
+            return False, "El origen y el destino son el mismo archivo"
+        
+        try:
+            if size is None:
+                size = self.s3_client.head_object(Bucket=source_bucket, Key=source_key)['ContentLength']
+            self._copy_object(source_bucket, source_key, dest_bucket, dest_key, size,
+                              object_params=object_params)
+            self._after_upload(dest_bucket, self._format_object({
+                'Key': dest_key,
+                'Size': size,
+                'LastModified': datetime.now(timezone.utc)
+            }))
+            return True, None
+            
+        except ClientError as e:
+            return False, self._copy_error_message(e)
+        except Exception as e:
+            return False, f"Error inesperado: {str(e)}"
+    
+    def move_file(self, source_bucket: str, source_key: str, dest_bucket: str, dest_key: str,
+                  size: Optional[int] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Mover un archivo: copia del lado de S3 y, si salió bien, elimina el origen.
+        
+        Args:
+            source_bucket: Bucket de origen
+            source_key: Clave de origen
+            dest_bucket: Bucket de destino
+            dest_key: Clave de destino
+            size: Tamaño del objeto si ya se conoce
+            
+        Returns:
+            Tuple (éxito, mensaje_error)
+        """
+        success, error = self.copy_file(source_bucket, source_key, dest_bucket, dest_key, size)
+        if not success:
+            return False, error
+        
+        success, error = self.delete_file(source_bucket, source_key)
+        if not success:
+            return False, f"Se copió el archivo pero no se pudo eliminar el original: {error}"
+        return True, None
+    
+    def copy_prefix(self, source_bucket: str, source_prefix: str, dest_bucket: str, dest_prefix: str,
+                    delete_source: bool = False) -> Tuple[bool, int, List[Dict]]:
+        """
+        Copiar (o mover) una carpeta completa del lado de S3.
+        
+        El listado se recorre página a página y los objetos de cada página se
+        copian en paralelo. Al terminar una página se guarda un punto de
+        control con su última clave, así que si el proceso se interrumpe la
+        misma operación continúa desde ahí en lugar de empezar de nuevo.
+        
+        Args:
+            source_bucket: Bucket de origen
+            source_prefix: Carpeta de origen (termina en '/')
+            dest_bucket: Bucket de destino
+            dest_prefix: Carpeta de destino ('' = raíz del bucket)
+            delete_source: Si es True, cada página se elimina del origen tras copiarse
+            
+        Returns:
+            Tuple (éxito, archivos_copiados, errores [{'key', 'error'}])
+        """
+        if not source_prefix:
+            return False, 0, [{'key': '', 'error': "Debes indicar una carpeta"}]
+        if source_bucket == dest_bucket and dest_prefix.startswith(source_prefix):
+            return False, 0, [{'key': source_prefix, 'error': "No se puede copiar una carpeta dentro de sí misma"}]
+        
+        operation = 'move' if delete_source else 'copy'
+        store = get_upload_state_store()
+        fingerprint = transfer_fingerprint(operation, source_bucket, source_prefix, dest_bucket, dest_prefix)
+        checkpoint = store.get(fingerprint) or {
+            'operation': operation,
+            'source_bucket': source_bucket,
+            'source_prefix': source_prefix,
+            'dest_bucket': dest_bucket,
+            'dest_prefix': dest_prefix,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'last_key': None,
+            'copied': 0
+        }
+        copied = checkpoint['copied']
+        errors: List[Dict] = []
+        
+        def copy_one(row: Dict) -> Tuple[str, Optional[str]]:
+            dest_key = dest_prefix + row['key'][len(source_prefix):]
+            try:
+                self._copy_object(source_bucket, row['key'], dest_bucket, dest_key, row['size'])
+                return row['key'], None
+            except ClientError as e:
+                return row['key'], self._copy_error_message(e)
+            except Exception as e:
+                return row['key'], f"Error inesperado: {str(e)}"
+        
+        try:
+            with ThreadPoolExecutor(max_workers=COPY_CONCURRENCY) as pool:
+                for page in self.iter_pages(source_bucket, prefix=source_prefix,
+                                            start_after=checkpoint['last_key']):
+                    if not page['files']:
+                        continue
+                    
+                    results = list(pool.map(copy_one, page['files']))
+                    done = [key for key, error in results if error is None]
+                    errors.extend({'key': key, 'error': error} for key, error in results if error)
+                    
+                    if delete_source and done:
+                        deleted, delete_errors = self._delete_batch(source_bucket, done)
+                        errors.extend(delete_errors)
+                        self._after_delete(source_bucket, deleted)
+                    
+                    copied += len(done)
+                    checkpoint.update(last_key=page['files'][-1]['key'], copied=copied)
+                    store.save(fingerprint, checkpoint)
+            
+            if delete_source and source_prefix.endswith('/'):
+                # El marcador de carpeta vacía no aparece en el listado
+                _, marker_errors = self._delete_batch(source_bucket, [source_prefix])
+                errors.extend(marker_errors)
+                self._after_delete_prefix(source_bucket, source_prefix)
+            
+            store.delete(fingerprint)
+            
+        except ClientError as e:
+            # El punto de control se conserva para reanudar
+            errors.append({'key': source_prefix, 'error': self._list_error_message(e, source_bucket)})
+        except Exception as e:
+            errors.append({'key': source_prefix, 'error': f"Error inesperado: {str(e)}"})
+        finally:
+            self.invalidate_listing_cache(dest_bucket)
+            get_storage_rollup().subtree_changed(dest_bucket, dest_prefix)
+            get_metadata_catalog().refresh(dest_bucket, dest_prefix, recursive=True)
+        
+        return not errors, copied, errors
+    
+    def move_prefix(self, source_bucket: str, source_prefix: str,
+                    dest_bucket: str, dest_prefix: str) -> Tuple[bool, int, List[Dict]]:
+        """
+        Mover una carpeta completa del lado de S3 (ver copy_prefix).
+        
+        Returns:
+            Tuple (éxito, archivos_movidos, errores [{'key', 'error'}])
+        """
+        return self.copy_prefix(source_bucket, source_prefix, dest_bucket, dest_prefix, delete_source=True)
+    
+    @staticmethod
+    def _delete_error_message(error_code: Optional[str], detail: str) -> str:
+        """Traducir un error de eliminación a un mensaje para el usuario."""
+        if error_code == 'AccessDenied':
+            return "No tienes permisos para eliminar archivos"
+        return f"Error: {detail}"
+    
+    def _delete_batch(self, bucket_name: str, object_keys: List[str]) -> Tuple[List[str], List[Dict]]:
+        """
+        Eliminar hasta DELETE_BATCH_SIZE claves con una sola llamada.
+        
+        Returns:
+            Tuple (claves_eliminadas, errores [{'key', 'error'}])
+        """
+        try:
+            response = self.s3_client.delete_objects(
+                Bucket=bucket_name,
+                Delete={'Objects': [{'Key': key} for key in object_keys], 'Quiet': True}
+            )
+        except ClientError as e:
+            message = self._delete_error_message(e.response['Error']['Code'], str(e))
+            return [], [{'key': key, 'error': message} for key in object_keys]
+        except Exception as e:
+            return [], [{'key': key, 'error': f"Error inesperado: {str(e)}"} for key in object_keys]
+        
+        # En modo Quiet S3 solo informa de las claves que fallaron
+        errors = [
+            {'key': err['Key'], 'error': self._delete_error_message(err.get('Code'), err.get('Message', ''))}
+            for err in response.get('Errors', [])
+        ]
+        failed = {err['key'] for err in errors}
+        return [key for key in object_keys if key not in failed], errors
+    
+    def delete_files(self, bucket_name: str, object_keys: List[str]) -> Tuple[bool, List[str], List[Dict]]:
+        """
+        Eliminar varios archivos en lotes de delete_objects enviados en paralelo.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            object_keys: Claves a eliminar
+            
+        Returns:
+            Tuple (éxito, claves_eliminadas, errores [{'key', 'error'}])
+        """
+        keys = list(dict.fromkeys(object_keys))
+        batches = [keys[i:i + DELETE_BATCH_SIZE] for i in range(0, len(keys), DELETE_BATCH_SIZE)]
+        deleted: List[str] = []
+        errors: List[Dict] = []
+        
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(DELETE_CONCURRENCY, len(batches))) as pool:
+                for batch_deleted, batch_errors in pool.map(lambda batch: self._delete_batch(bucket_name, batch), batches):
+                    deleted.extend(batch_deleted)
+                    errors.extend(batch_errors)
+        
+        self._after_delete(bucket_name, deleted)
+        return not errors, deleted, errors
+    
+    def delete_prefix(self, bucket_name: str, prefix: str) -> Tuple[bool, int, List[Dict]]:
+        """
+        Eliminar una carpeta completa (todas las claves bajo un prefijo).
+        
+        El listado se recorre página a página y cada página se envía como un
+        lote de delete_objects mientras se pide la siguiente, así que nunca hay
+        en memoria más que unas pocas páginas de claves.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            prefix: Prefijo de la carpeta (termina en '/')
+            
+        Returns:
+            Tuple (éxito, número_de_archivos_eliminados, errores [{'key', 'error'}])
+        """
+        if not prefix:
+            return False, 0, [{'key': '', 'error': "Debes indicar una carpeta"}]
+        
+        deleted = 0
+        errors: List[Dict] = []
+        pending = set()
+        
+        def collect(futures):
+            nonlocal deleted
+            for future in futures:
+                batch_deleted, batch_errors = future.result()
+                deleted += len(batch_deleted)
+                errors.extend(batch_errors)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=DELETE_CONCURRENCY) as pool:
+                try:
+                    for page in self.iter_pages(bucket_name, prefix=prefix, page_size=DELETE_BATCH_SIZE):
+                        keys = [f['key'] for f in page['files']]
+                        if keys:
+                            pending.add(pool.submit(self._delete_batch, bucket_name, keys))
+                        if len(pending) >= DELETE_CONCURRENCY * 2:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            collect(done)
+                    
+                    # El marcador de carpeta vacía no aparece en el listado
+                    if prefix.endswith('/'):
+                        _, marker_errors = self._delete_batch(bucket_name, [prefix])
+                        errors.extend(marker_errors)
+                finally:
+                    collect(pending)
+        
+        except ClientError as e:
+            errors.append({'key': prefix, 'error': self._list_error_message(e, bucket_name)})
+        except Exception as e:
+            errors.append({'key': prefix, 'error': f"Error inesperado: {str(e)}"})
+        finally:
+            self._after_delete_prefix(bucket_name, prefix)
+        
+        return not errors, deleted, errors
+    
+    # === Versiones ===
+    
+    @staticmethod
+    def _format_version(entry: Dict, delete_marker: bool) -> Dict:
+        """
+        Convertir una versión (o un marcador de borrado) de list_object_versions en una fila.
+        
+        Returns:
+            Diccionario con los datos de la fila de archivo más 'version_id',
+            'is_latest' e 'is_delete_marker'
+        """
+        size = entry.get('Size', 0)
+        return {
+            'key': entry['Key'],
+            'name': entry['Key'].split('/')[-1],
+            'version_id': entry.get('VersionId') or 'null',
+            'is_latest': entry.get('IsLatest', False),
+            'is_delete_marker': delete_marker,
+            'size': size,
+            'size_mb': round(size / (1024 * 1024), 2),
+            'last_modified': entry['LastModified'].strftime('%Y-%m-%d %H:%M:%S'),
+            'storage_class': entry.get('StorageClass', '' if delete_marker else 'STANDARD'),
+            'etag': entry.get('ETag', '').strip('"'),
+        }
+    
+    def list_versions_page(self, bucket_name: str, prefix: str = '', cursor: Optional[str] = None,
+                           page_size: int = LIST_PAGE_SIZE, object_key: Optional[str] = None,
+                           only_deleted: bool = False) -> Tuple[bool, Dict, Optional[str]]:
+        """
+        Obtener una página del historial de versiones de una carpeta o de un archivo.
+        
+        Las versiones de cada archivo llegan juntas y de la más reciente a la
+        más antigua. Con only_deleted solo se devuelven los archivos cuyo
+        estado actual es un marcador de borrado (los que se pueden recuperar);
+        si hay pocos, se revisan hasta VERSION_SCAN_PAGES páginas por llamada
+        y la página puede volver vacía pero con cursor.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            prefix: Carpeta cuyo historial se recorre (incluye subcarpetas)
+            cursor: Cursor devuelto por la página anterior (None = primera página)
+            page_size: Máximo de versiones pedidas a S3 por página
+            object_key: Solo las versiones de este archivo (ignora prefix)
+            only_deleted: Solo los marcadores de borrado vigentes
+            
+        Returns:
+            Tuple (éxito, {'versions': [...], 'next_cursor': str | None}, mensaje_error)
+        """
+        params = {
+            'Bucket': bucket_name,
+            'Prefix': object_key or prefix,
+            'MaxKeys': min(page_size, LIST_PAGE_SIZE),
+        }
+        if cursor:
+            key_marker, version_marker = json.loads(cursor)
+            params['KeyMarker'] = key_marker
+            if version_marker:
+                params['VersionIdMarker'] = version_marker
+        hide_derivatives = not params['Prefix'].startswith(DERIVATIVES_PREFIX)
+        
+        rows: List[Dict] = []
+        next_cursor = None
+        try:
+            for _ in range(VERSION_SCAN_PAGES):
+                response = self.s3_client.list_object_versions(**params)
+                entries = [(v, False) for v in response.get('Versions', [])]
+                entries += [(m, True) for m in response.get('DeleteMarkers', [])]
+                # S3 separa versiones y marcadores: se mezclan por clave, la más reciente primero
+                entries.sort(key=lambda e: (e[0]['Key'], -e[0]['LastModified'].timestamp()))
+                
+                past_key = False
+                for entry, delete_marker in entries:
+                    if object_key and entry['Key'] != object_key:
+                        past_key = past_key or entry['Key'] > object_key
+                        continue
+                    if hide_derivatives and entry['Key'].startswith(DERIVATIVES_PREFIX):
+                        continue
+                    if only_deleted and not (delete_marker and entry.get('IsLatest')):
+                        continue
+                    rows.append(self._format_version(entry, delete_marker))
+                
+                next_cursor = None
+                if response.get('IsTruncated') and not past_key:
+                    next_cursor = json.dumps([response.get('NextKeyMarker', ''),
+                                              response.get('NextVersionIdMarker', '')])
+                if rows or not next_cursor:
+                    break
+                params['KeyMarker'], params['VersionIdMarker'] = json.loads(next_cursor)
+                if not params['VersionIdMarker']:
+                    del params['VersionIdMarker']
+            
+            return True, {'versions': rows, 'next_cursor': next_cursor}, None
+            
+        except ClientError as e:
+            return False, {'versions': [], 'next_cursor': None}, self._list_error_message(e, bucket_name)
+        except Exception as e:
+            return False, {'versions': [], 'next_cursor': None}, f"Error inesperado: {str(e)}"
+    
+    def _delete_versions_batch(self, bucket_name: str, versions: List[Dict]) -> Tuple[List[str], List[Dict]]:
+        """
+        Eliminar hasta DELETE_BATCH_SIZE versiones concretas ({'key', 'version_id'}).
+        
+        Returns:
+            Tuple (claves_afectadas, errores [{'key', 'error'}])
+        """
+        try:
+            response = self.s3_client.delete_objects(
+                Bucket=bucket_name,
+                Delete={
+                    'Objects': [{'Key': v['key'], 'VersionId': v['version_id']} for v in versions],
+                    'Quiet': True
+                }
+            )
+        except ClientError as e:
+            message = self._delete_error_message(e.response['Error']['Code'], str(e))
+            return [], [{'key': v['key'], 'error': message} for v in versions]
+        except Exception as e:
+            return [], [{'key': v['key'], 'error': f"Error inesperado: {str(e)}"} for v in versions]
+        
+        errors = [
+            {'key': err['Key'], 'error': self._delete_error_message(err.get('Code'), err.get('Message', ''))}
+            for err in response.get('Errors', [])
+        ]
+        failed = {err['key'] for err in errors}
+        return [v['key'] for v in versions if v['key'] not in failed], errors
+    
+    def remove_delete_markers(self, bucket_name: str, markers: List[Dict]) -> Tuple[bool, List[str], List[Dict]]:
+        """
+        Recuperar archivos eliminados quitando su marcador de borrado.
+        
+        Al desaparecer el marcador vuelve a ser actual la versión anterior; no
+        se copia ningún dato. Los lotes se envían en paralelo como en delete_files.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            markers: Marcadores a quitar [{'key', 'version_id'}]
+            
+        Returns:
+            Tuple (éxito, claves_recuperadas, errores [{'key', 'error'}])
+        """
+        batches = [markers[i:i + DELETE_BATCH_SIZE] for i in range(0, len(markers), DELETE_BATCH_SIZE)]
+        restored: List[str] = []
+        errors: List[Dict] = []
+        
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(DELETE_CONCURRENCY, len(batches))) as pool:
+                for batch_restored, batch_errors in pool.map(
+                        lambda batch: self._delete_versions_batch(bucket_name, batch), batches):
+                    restored.extend(batch_restored)
+                    errors.extend(batch_errors)
+        
+        self._after_restore(bucket_name, restored)
+        return not errors, restored, errors
+    
+    def undelete_prefix(self, bucket_name: str, prefix: str,
+                        deleted_since: Optional[datetime] = None) -> Tuple[bool, int, List[Dict]]:
+        """
+        Recuperar todo lo eliminado bajo una carpeta en una sola operación.
+        
+        Se recorre el historial página a página y los marcadores de borrado
+        vigentes de cada página se quitan en un lote de delete_objects
+        mientras se pide la siguiente (como delete_prefix), así que el tiempo
+        depende del número de versiones de la carpeta y no de llamadas por archivo.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            prefix: Carpeta a recuperar ('' = el bucket completo)
+            deleted_since: Solo los archivos eliminados desde este momento (UTC)
+            
+        Returns:
+            Tuple (éxito, número_de_archivos_recuperados, errores [{'key', 'error'}])
+        """
+        restored: List[str] = []
+        errors: List[Dict] = []
+        pending = set()
+        
+        def collect(futures):
+            for future in futures:
+                batch_restored, batch_errors = future.result()
+                restored.extend(batch_restored)
+                errors.extend(batch_errors)
+        
+        try:
+            paginator = self.s3_client.get_paginator('list_object_versions')
+            with ThreadPoolExecutor(max_workers=DELETE_CONCURRENCY) as pool:
+                try:
+                    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix,
+                                                   PaginationConfig={'PageSize': DELETE_BATCH_SIZE}):
+                        markers = [
+                            {'key': m['Key'], 'version_id': m['VersionId']}
+                            for m in page.get('DeleteMarkers', [])
+                            if m.get('IsLatest') and (deleted_since is None or m['LastModified'] >= deleted_since)
+                        ]
+                        if markers:
+                            pending.add(pool.submit(self._delete_versions_batch, bucket_name, markers))
+                        if len(pending) >= DELETE_CONCURRENCY * 2:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            collect(done)
+                finally:
+                    collect(pending)
+        
+        except ClientError as e:
+            errors.append({'key': prefix, 'error': self._list_error_message(e, bucket_name)})
+        except Exception as e:
+            errors.append({'key': prefix, 'error': f"Error inesperado: {str(e)}"})
+        finally:
+            self._after_restore(bucket_name, restored)
+        
+        return not errors, len(restored), errors
+    
+    def restore_versions(self, bucket_name: str, versions: List[Dict]) -> Tuple[bool, List[str], List[Dict]]:
+        """
+        Volver a poner como actual una versión anterior de cada archivo.
+        
+        La versión elegida se copia sobre la misma clave del lado de S3 (la
+        actual queda en el historial); las copias van en paralelo.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            versions: Versiones a restaurar [{'key', 'version_id', 'size'}]
+            
+        Returns:
+            Tuple (éxito, claves_restauradas, errores [{'key', 'error'}])
+        """
+        def restore(version: Dict) -> Optional[Dict]:
+            try:
+                self._copy_object(bucket_name, version['key'], bucket_name, version['key'],
+                                  version['size'], source_version=version['version_id'])
+                return None
+            except ClientError as e:
+                return {'key': version['key'], 'error': self._copy_error_message(e)}
+            except Exception as e:
+                return {'key': version['key'], 'error': f"Error inesperado: {str(e)}"}
+        
+        restored: List[str] = []
+        errors: List[Dict] = []
+        if versions:
+            with ThreadPoolExecutor(max_workers=min(COPY_CONCURRENCY, len(versions))) as pool:
+                for version, error in zip(versions, pool.map(restore, versions)):
+                    if error:
+                        errors.append(error)
+                    else:
+                        restored.append(version['key'])
+        
+        self._after_restore(bucket_name, restored)
+        return not errors, restored, errors
+    
+    def _after_restore(self, bucket_name: str, object_keys: List[str]):
+        """Actualizar cachés y resúmenes tras recuperar o restaurar archivos."""
+        if not object_keys:
+            return
+        common = os.path.commonprefix(object_keys)
+        prefix = common[:common.rfind('/') + 1]
+        self.invalidate_listing_cache(bucket_name)
+        get_storage_rollup().subtree_changed(bucket_name, prefix)
+        get_metadata_catalog().refresh(bucket_name, prefix, recursive=True)
+    
+    def _presign_get(self, bucket_name: str, object_key: str, disposition: str, expiration: int) -> str:
+        """Firmar una URL GET con el Content-Disposition indicado."""
+        filename = object_key.split('/')[-1]
+        
+        return self.s3_client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': bucket_name, 
+                'Key': object_key,
+                'ResponseContentDisposition': f'{disposition}; filename="{filename}"'
+            },
+            ExpiresIn=expiration
+        )
+    
+    def get_download_url(self, bucket_name: str, object_key: str, expiration: int = 3600) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Generar URL pre-firmada para descargar un archivo.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            object_key: Nombre del archivo
+            expiration: Tiempo de expiración en segundos (default: 1 hora)
+            
+        Returns:
+            Tuple (éxito, url, mensaje_error)
+        """
+        try:
+            url = self._presign_get(bucket_name, object_key, 'attachment', expiration)
+            return True, url, None
+            
+        except ClientError as e:
+            return False, None, f"Error generando URL: {str(e)}"
+        except Exception as e:
+            return False, None, f"Error inesperado: {str(e)}"
+    
+    def get_download_urls(self, bucket_name: str, object_keys: List[str], role: str,
+                          disposition: str = 'attachment',
+                          expiration: int = 3600) -> Tuple[bool, Dict[str, str], Optional[str]]:
+        """
+        Firmar de una vez las URLs de descarga de varios archivos.
+        
+        Las URLs se reutilizan desde la caché mientras les queden al menos
+        PRESIGN_REFRESH_MARGIN segundos de validez; solo se firman las que faltan.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            object_keys: Claves de los archivos (p. ej. la página visible)
+            role: Rol del usuario (las URLs no se comparten entre roles)
+            disposition: 'attachment' para descargar o 'inline' para ver en el navegador
+            expiration: Validez de cada firma en segundos
+            
+        Returns:
+            Tuple (éxito, {clave: url}, mensaje_error)
+        """
+        urls = {}
+        ttl = max(expiration - PRESIGN_REFRESH_MARGIN, 0)
+        
+        try:
+            for object_key in object_keys:
+                cache_key = ('url', bucket_name, object_key, disposition, role)
+                url = presign_cache.get(cache_key)
+                if url is None:
+                    url = self._presign_get(bucket_name, object_key, disposition, expiration)
+                    if ttl:
+                        presign_cache.set(cache_key, url, ttl=ttl)
+                urls[object_key] = url
+            
+            return True, urls, None
+            
+        except ClientError as e:
+            return False, urls, f"Error generando URLs: {str(e)}"
+        except Exception as e:
+            return False, urls, f"Error inesperado: {str(e)}"
+    
+    def get_thumbnail_urls(self, bucket_name: str, files: List[Dict], role: str,
+                           expiration: int = 3600) -> Tuple[bool, Dict[str, str], Optional[str]]:
+        """
+        Firmar las URLs de las miniaturas ya generadas de una página de archivos.
+        
+        Las miniaturas que este proceso no conoce se buscan en S3 (solo
+        lectura, para cualquier rol). Las que faltan (archivos subidos antes
+        de activar las miniaturas o por otras herramientas) se encolan solo si
+        el rol puede escribir: un rol de lectura no provoca escrituras en el
+        prefijo de miniaturas. Las subidas desde la aplicación ya encolan la suya.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            files: Filas de la página (con 'key' y 'etag')
+            role: Rol del usuario (las URLs no se comparten entre roles)
+            expiration: Validez de cada firma en segundos
+            
+        Returns:
+            Tuple (éxito, {clave del archivo: url de la miniatura}, mensaje_error)
+        """
+        pipeline = get_derivative_pipeline()
+        targets = {}
+        rows = [row for row in files if row.get('etag') and is_derivable(row['key'])]
+        found = pipeline.discover(bucket_name, [row['etag'] for row in rows])
+        
+        for row in rows:
+            if row['etag'].strip('"') in found:
+                targets[row['key']] = rendition_key(row['etag'])
+            elif role in WRITE_ROLES:
+                pipeline.enqueue(bucket_name, row['key'], row['etag'])
+        
+        if not targets:
+            return True, {}, None
+        
+        success, urls, error = self.get_download_urls(
+            bucket_name, list(set(targets.values())), role, 'inline', expiration
+        )
+        return success, {key: urls[target] for key, target in targets.items() if target in urls}, error
+    
+    def get_storage_usage(self, bucket_name: str, prefix: str = '') -> Tuple[bool, Optional[Dict], Optional[str]]:
+        """
+        Obtener el uso de almacenamiento de una carpeta y de sus subcarpetas.
+        
+        Se responde desde el resumen en memoria; la primera consulta de un
+        bucket empieza a calcularlo en segundo plano y devuelve None.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            prefix: Carpeta ('' = el bucket completo)
+            
+        Returns:
+            Tuple (éxito, uso o None si aún se está calculando, mensaje_error).
+            El uso tiene 'count', 'bytes', 'classes' ({clase: {'count', 'bytes'}}),
+            'children' ({prefijo: {'count', 'bytes'}}), 'built_at' y 'building'
+        """
+        try:
+            return True, get_storage_rollup().usage(bucket_name, prefix), None
+        except Exception as e:
+            return False, None, f"Error calculando el uso de almacenamiento: {str(e)}"
+    
+    def search_objects(self, bucket_names: List[str], query: str, prefix: str = '',
+                       sort: str = 'key', descending: bool = False,
+                       limit: int = 200) -> Tuple[bool, Dict, Optional[str]]:
+        """
+        Buscar archivos por texto en la clave en uno o varios buckets.
+        
+        La búsqueda corre en el catálogo local (índice de trigramas), no en S3.
+        Un bucket de S3_CATALOG_CRAWL_BUCKETS que aún no está catalogado se
+        empieza a recorrer en segundo plano y se informa en 'pending' hasta
+        que esté listo; los que no tienen inventario ni se pueden recorrer se
+        informan en 'unavailable'.
+        
+        Args:
+            bucket_names: Buckets en los que buscar (los que permite el rol)
+            query: Texto a buscar (ruta o nombre, sin distinguir mayúsculas)
+            prefix: Solo dentro de esta carpeta
+            sort: 'key', 'size' o 'last_modified'
+            descending: Orden descendente
+            limit: Máximo de resultados
+            
+        Returns:
+            Tuple (éxito, {'results': [...], 'total': int, 'pending': [buckets],
+            'unavailable': [buckets]}, mensaje_error)
+        """
+        try:
+            catalog = get_metadata_catalog()
+            unavailable = [bucket for bucket in bucket_names if not catalog.can_index(bucket)]
+            pending = [bucket for bucket in bucket_names
+                       if bucket not in unavailable and catalog.index_bucket(bucket)]
+            ready = [bucket for bucket in bucket_names if bucket not in unavailable and bucket not in pending]
+            results, total = catalog.search(ready, query, prefix, sort, descending, limit)
+            return True, {'results': results, 'total': total, 'pending': pending, 'unavailable': unavailable}, None
+        except Exception as e:
+            return False, {'results': [], 'total': 0, 'pending': [], 'unavailable': []}, f"Error en la búsqueda: {str(e)}"
+    
+    def import_inventory(self, location: str) -> Tuple[bool, int, Optional[str]]:
+        """
+        Importar un informe de S3 Inventory al catálogo local.
+        
+        Desde ese momento los listados del bucket inventariado salen del
+        catálogo; los cambios posteriores a la foto se superponen a medida
+        que ocurren (aplicación) o que se visitan las carpetas (S3).
+        
+        Args:
+            location: 's3://bucket/.../manifest.json' o la ruta a un manifest local
+            
+        Returns:
+            Tuple (éxito, objetos importados, mensaje_error)
+        """
+        try:
+            report = InventoryReport(location, self.s3_client)
+            count = get_metadata_catalog().replace_bucket(
+                report.source_bucket, report.rows(), report.taken_at, location
+            )
+            self.invalidate_listing_cache(report.source_bucket)
+            return True, count, None
+            
+        except InventoryError as e:
+            return False, 0, str(e)
+        except ClientError as e:
+            return False, 0, f"Error leyendo el inventario: {str(e)}"
+        except Exception as e:
+            return False, 0, f"Error inesperado: {str(e)}"
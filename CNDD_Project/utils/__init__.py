@@ -1,7 +1,9 @@
 """Utilidades para la aplicación CNDD Project."""
 
+from .aws_clients import get_client
 from .aws_cognito import CognitoAuth
 from .S3_manager import S3Manager
+from .async_s3 import AsyncS3Manager
 from .opensearch_client import OpenSearchClient
 
-__all__ = ['CognitoAuth', 'S3Manager', 'OpenSearchClient']
\ No newline at end of file
+__all__ = ['CognitoAuth', 'S3Manager', 'AsyncS3Manager', 'OpenSearchClient', 'get_client']
\ No newline at end of file
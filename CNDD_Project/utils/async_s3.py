@@ -0,0 +1,88 @@
+"""
+Fachada asíncrona de S3Manager para usar desde los handlers de Reflex
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from dotenv import load_dotenv
+from .S3_manager import S3Manager
+
+# Cargar variables de entorno
+load_dotenv()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_s3_executor() -> ThreadPoolExecutor:
+    """
+    Obtener el pool de hilos dedicado a las llamadas bloqueantes de S3.
+
+    Es independiente del pool por defecto de asyncio, así que una ráfaga de
+    subidas no deja sin hilos al resto de la aplicación. El tamaño se
+    configura con S3_EXECUTOR_WORKERS.
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('S3_EXECUTOR_WORKERS', '16')),
+                thread_name_prefix='cndd-s3'
+            )
+        return _executor
+
+
+async def run_blocking(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Ejecutar una función bloqueante en el pool de S3 sin detener el event loop.
+
+    Args:
+        fn: Función a ejecutar
+        *args, **kwargs: Argumentos de la función
+
+    Returns:
+        El resultado de la función
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_s3_executor(), functools.partial(fn, *args, **kwargs))
+
+
+class AsyncS3Manager:
+    """
+    Versión awaitable de S3Manager.
+
+    Cada método público de S3Manager está disponible con el mismo nombre,
+    argumentos y valor de retorno, pero se ejecuta en el pool dedicado:
+
+        success, page, error = await AsyncS3Manager().list_files_page(bucket)
+    """
+
+    def __init__(self, access_token: Optional[str] = None):
+        """
+        Inicializar la fachada.
+
+        Args:
+            access_token: Token de acceso de Cognito (para credenciales temporales)
+        """
+        self.sync = S3Manager(access_token)
+
+    def get_available_buckets(self, role: str):
+        """Buckets según el rol (no hace llamadas de red, no necesita await)."""
+        return self.sync.get_available_buckets(role)
+
+    def __getattr__(self, name: str):
+        """Envolver los métodos de S3Manager en corrutinas."""
+        attr = getattr(self.sync, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def wrapper(*args, **kwargs):
+            return await run_blocking(attr, *args, **kwargs)
+
+        return wrapper
@@ -0,0 +1,87 @@
+"""
+Registro compartido de sesiones y clientes de AWS
+"""
+
+import os
+import threading
+import boto3
+from typing import Dict, Optional, Tuple
+from botocore.config import Config
+from dotenv import load_dotenv
+
+# Cargar variables de entorno (una sola vez por proceso)
+load_dotenv()
+
+# Conexiones HTTP que cada cliente mantiene abiertas (boto3 usa 10 por defecto)
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+
+_lock = threading.Lock()
+_session: Optional[boto3.session.Session] = None
+_clients: Dict[Tuple[str, Optional[str]], object] = {}
+
+
+def get_max_pool_connections() -> int:
+    """Tamaño del pool de conexiones configurado en AWS_MAX_POOL_CONNECTIONS."""
+    try:
+        return int(os.getenv('AWS_MAX_POOL_CONNECTIONS', DEFAULT_MAX_POOL_CONNECTIONS))
+    except ValueError:
+        return DEFAULT_MAX_POOL_CONNECTIONS
+
+
+def get_session() -> boto3.session.Session:
+    """
+    Obtener la sesión de boto3 compartida por todo el proceso.
+
+    Returns:
+        Sesión de boto3 (se crea la primera vez que se pide)
+    """
+    global _session
+
+    with _lock:
+        if _session is None:
+            _session = boto3.session.Session(region_name=os.getenv('AWS_REGION'))
+        return _session
+
+
+def get_client(service_name: str, region_name: Optional[str] = None):
+    """
+    Obtener un cliente de larga duración para un servicio de AWS.
+
+    Los clientes de boto3 son seguros entre hilos, así que todos los
+    handlers reutilizan el mismo cliente (y sus conexiones TLS abiertas)
+    en lugar de crear uno nuevo en cada acción.
+
+    Args:
+        service_name: Nombre del servicio ('s3', 'cognito-idp', ...)
+        region_name: Región (default: AWS_REGION)
+
+    Returns:
+        Cliente de boto3 para el servicio
+    """
+    region = region_name or os.getenv('AWS_REGION')
+    key = (service_name, region)
+
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    session = get_session()
+
+    with _lock:
+        # Otro hilo pudo haberlo creado mientras esperábamos el lock
+        if key not in _clients:
+            _clients[key] = session.client(
+                service_name,
+                region_name=region,
+                config=Config(max_pool_connections=get_max_pool_connections())
+            )
+        return _clients[key]
+
+
+def reset_clients():
+    """Descartar la sesión y los clientes (p. ej. tras rotar credenciales)."""
+    global _session
+
+    with _lock:
+        _clients.clear()
+        _session = None
@@ -3,9 +3,9 @@ Módulo de autenticación con AWS Cognito
 """
 
 import os
-import boto3
 from typing import Optional, Dict, Tuple, List
 from dotenv import load_dotenv
+from .aws_clients import get_client
 
 # Cargar variables de entorno
 load_dotenv()
@@ -20,11 +20,8 @@ class CognitoAuth:
         self.user_pool_id = os.getenv('COGNITO_USER_POOL_ID')
         self.client_id = os.getenv('COGNITO_CLIENT_ID')
         
-        # Cliente de Cognito
-        self.client = boto3.client(
-            'cognito-idp',
-            region_name=self.region
-        )
+        # Cliente de Cognito compartido por todo el proceso
+        self.client = get_client('cognito-idp', region_name=self.region)
     
     def authenticate(self, username: str, password: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
         """
@@ -0,0 +1,34 @@
+"""
+Tareas de mantenimiento que corren en segundo plano mientras vive la aplicación
+"""
+
+import asyncio
+import os
+from dotenv import load_dotenv
+from .async_s3 import AsyncS3Manager
+
+# Cargar variables de entorno
+load_dotenv()
+
+
+async def multipart_sweeper():
+    """Cancelar periódicamente las subidas multipart abandonadas en todos los buckets."""
+    interval = float(os.getenv('MULTIPART_SWEEP_INTERVAL', '3600'))
+    max_age_hours = float(os.getenv('MULTIPART_MAX_AGE_HOURS', '24'))
+    
+    while True:
+        try:
+            s3 = AsyncS3Manager()
+            for bucket in s3.get_available_buckets('admin'):
+                if not bucket:
+                    continue
+                
+                success, aborted, error = await s3.abort_stale_multipart_uploads(bucket, max_age_hours)
+                if not success:
+                    print(f"Error limpiando subidas en {bucket}: {error}")
+                elif aborted:
+                    print(f"Se cancelaron {aborted} subidas abandonadas en {bucket}")
+        except Exception as e:
+            print(f"Error en el barrido de subidas multipart: {e}")
+        
+        await asyncio.sleep(interval)
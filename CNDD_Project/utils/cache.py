@@ -0,0 +1,196 @@
+"""
+Caché en memoria con expiración (TTL), desalojo LRU y presupuesto de memoria
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimar cuántos bytes ocupa un valor (recorre listas, tuplas y diccionarios).
+
+    Args:
+        value: Valor a medir
+
+    Returns:
+        Tamaño aproximado en bytes
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class TTLCache:
+    """Caché acotada y segura entre hilos con contadores de uso."""
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int):
+        """
+        Inicializar la caché.
+
+        Args:
+            ttl: Segundos que vive una entrada por defecto
+            max_entries: Máximo de entradas antes de desalojar la menos usada
+            max_bytes: Presupuesto de memoria aproximado para todas las entradas
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # clave -> (expira_en, tamaño, valor); el orden es de menos a más reciente
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Obtener un valor si existe y no ha expirado.
+
+        Args:
+            key: Clave de la entrada
+
+        Returns:
+            El valor guardado o None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Guardar un valor, desalojando entradas antiguas si hace falta.
+
+        Args:
+            key: Clave de la entrada
+            value: Valor a guardar
+            ttl: Segundos de vida (default: el TTL de la caché)
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            # Nunca cabría: no vale la pena vaciar la caché por él
+            return
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            self._evict()
+
+    def invalidate(self, key: Hashable):
+        """Eliminar una entrada concreta."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Eliminar todas las entradas cuya clave cumpla una condición.
+
+        Args:
+            predicate: Función que recibe la clave y devuelve True para borrarla
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def update_where(self, predicate: Callable[[Hashable], bool],
+                     patch: Callable[[Hashable, Any], Optional[Any]]) -> int:
+        """
+        Reemplazar en sitio las entradas cuya clave cumpla una condición.
+
+        La función `patch` recibe la clave y el valor actual y devuelve el nuevo
+        valor, o None si no aplica a esa entrada. Se conserva la expiración
+        original; si las entradas crecen se desaloja como en `set`, y una
+        entrada que ya no cabe en el presupuesto se descarta.
+
+        Returns:
+            Número de entradas modificadas
+        """
+        updated = 0
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                expires_at, size, value = self._entries[key]
+                new_value = patch(key, value)
+                if new_value is None:
+                    continue
+
+                new_size = estimate_size(new_value)
+                updated += 1
+                if new_size > self.max_bytes:
+                    self._remove(key)
+                    self.evictions += 1
+                    continue
+                self._entries[key] = (expires_at, new_size, new_value)
+                self._bytes += new_size - size
+            self._evict()
+        return updated
+
+    def clear(self):
+        """Vaciar la caché (los contadores se conservan)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Contadores de uso para dimensionar la caché.
+
+        Returns:
+            Diccionario con aciertos, fallos, desalojos, expiraciones y ocupación
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _evict(self):
+        """Desalojar las entradas menos usadas hasta respetar los límites (el lock ya debe estar tomado)."""
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        """Quitar una entrada (el lock ya debe estar tomado)."""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
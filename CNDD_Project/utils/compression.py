@@ -0,0 +1,107 @@
+"""
+Compresión gzip transparente de archivos de texto al subirlos a S3
+"""
+
+import os
+import shutil
+import zlib
+from typing import BinaryIO, Optional
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Modo de subida comprimida (desactivado salvo que se habilite)
+COMPRESS_UPLOADS = os.getenv('S3_COMPRESS_UPLOADS', 'false').lower() in ('1', 'true', 'yes')
+
+# Nivel de gzip (1 = más rápido, 9 = más pequeño)
+COMPRESSION_LEVEL = int(os.getenv('S3_COMPRESSION_LEVEL', '6'))
+
+# Archivos más pequeños no se comprimen (no compensa)
+COMPRESS_MIN_SIZE = int(os.getenv('S3_COMPRESS_MIN_SIZE', '4096'))
+
+# Metadato con el tamaño sin comprimir (x-amz-meta-original-size)
+ORIGINAL_SIZE_METADATA_KEY = 'original-size'
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.txt', '.log', '.csv', '.tsv', '.json', '.ndjson', '.jsonl', '.xml', '.html',
+    '.htm', '.md', '.yaml', '.yml', '.sql', '.svg', '.js', '.css'
+)
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/x-ndjson', 'application/xml',
+    'application/javascript', 'image/svg+xml'
+)
+
+
+def is_compressible(object_key: str, content_type: Optional[str] = None) -> bool:
+    """Indica si el archivo es texto que vale la pena comprimir."""
+    content_type = (content_type or '').lower()
+    return (
+        object_key.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+        or content_type.startswith(COMPRESSIBLE_TYPES)
+    )
+
+
+class GzipReader:
+    """
+    Envoltorio de un archivo que entrega su contenido comprimido con gzip.
+
+    Se comprime bloque a bloque a medida que se lee, así que la memoria
+    usada no depende del tamaño del archivo. La cabecera gzip no lleva
+    fecha, de modo que el mismo contenido produce siempre los mismos bytes.
+    """
+
+    def __init__(self, fileobj: BinaryIO, level: int = COMPRESSION_LEVEL):
+        self.fileobj = fileobj
+        self.raw_size = 0
+        self.compressed_size = 0
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        self._buffer = b''
+        self._finished = False
+
+    def read(self, size: int = -1) -> bytes:
+        """Leer hasta `size` bytes comprimidos."""
+        while not self._finished and (size < 0 or len(self._buffer) < size):
+            chunk = self.fileobj.read(size if size > 0 else 1024 * 1024)
+            if chunk:
+                self.raw_size += len(chunk)
+                self._buffer += self._compressor.compress(chunk)
+            else:
+                self._buffer += self._compressor.flush()
+                self._finished = True
+
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self.compressed_size += len(data)
+        return data
+
+
+def gunzip_prefix(data: bytes, max_bytes: Optional[int] = None) -> bytes:
+    """
+    Descomprimir el comienzo de un gzip (p. ej. leído con Range).
+
+    Args:
+        data: Primeros bytes del objeto comprimido
+        max_bytes: Máximo de bytes descomprimidos a devolver
+
+    Returns:
+        Lo que se pudo descomprimir de esos bytes
+    """
+    decompressor = zlib.decompressobj(31)
+    return decompressor.decompress(data, max_bytes or 0)
+
+
+def gunzip_file(path: str):
+    """Descomprimir en el sitio un archivo gzip descargado."""
+    tmp_path = path + '.gunzip'
+    decompressor = zlib.decompressobj(31)
+    with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        while True:
+            chunk = src.read(1024 * 1024)
+            if not chunk:
+                break
+            dst.write(decompressor.decompress(chunk))
+        dst.write(decompressor.flush())
+    shutil.move(tmp_path, path)
@@ -0,0 +1,96 @@
+"""
+Índice de contenido por SHA-256 para no volver a subir archivos idénticos
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import BinaryIO, Optional, Tuple
+from dotenv import load_dotenv
+from .upload_state import RedisUploadStateStore, UploadStateStore
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Metadato del objeto donde se guarda el hash (x-amz-meta-sha256)
+HASH_METADATA_KEY = 'sha256'
+
+# Directorio del índice si no hay Redis configurado
+DEFAULT_INDEX_DIR = os.path.join(tempfile.gettempdir(), 'cndd-content-index')
+
+# Prefijo de las claves del índice en Redis
+REDIS_INDEX_PREFIX = 'cndd:content-index:'
+
+# Archivos más pequeños se suben siempre (la consulta costaría más que la subida)
+DEDUP_MIN_SIZE = int(os.getenv('S3_DEDUP_MIN_SIZE', str(256 * 1024)))
+
+# Tamaño de los bloques al calcular el hash
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_fileobj(fileobj: BinaryIO) -> Tuple[str, int]:
+    """
+    Calcular el SHA-256 de un archivo abierto leyéndolo por bloques.
+
+    El archivo queda en la misma posición en la que estaba.
+
+    Returns:
+        Tuple (hash en hexadecimal, bytes leídos)
+    """
+    start = fileobj.tell()
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = fileobj.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(start)
+    return digest.hexdigest(), size
+
+
+class HashingReader:
+    """Envoltorio de un archivo que calcula el SHA-256 a medida que se lee."""
+
+    def __init__(self, fileobj: BinaryIO):
+        self.fileobj = fileobj
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """Leer del archivo original actualizando el hash."""
+        chunk = self.fileobj.read(size)
+        self.digest.update(chunk)
+        self.size += len(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        """Hash de lo leído hasta ahora."""
+        return self.digest.hexdigest()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_content_index():
+    """
+    Obtener el índice hash -> ubicación del proceso.
+
+    Cada registro es {'bucket', 'key', 'size'} (y 'etag' si el objeto
+    no lleva el hash como metadato). Usa Redis si REDIS_URL está
+    definido; si no, archivos en CONTENT_INDEX_DIR. Los registros no se
+    borran al eliminar el objeto: quien los usa verifica antes con HEAD.
+    """
+    global _index
+
+    with _index_lock:
+        if _index is None:
+            redis_url = os.getenv('REDIS_URL')
+            if redis_url:
+                _index = RedisUploadStateStore(redis_url, key_prefix=REDIS_INDEX_PREFIX)
+            else:
+                _index = UploadStateStore(os.getenv('CONTENT_INDEX_DIR', DEFAULT_INDEX_DIR))
+        return _index
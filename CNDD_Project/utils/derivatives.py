@@ -0,0 +1,288 @@
+"""
+Miniaturas de imágenes y PDF generadas en segundo plano y guardadas en S3
+"""
+
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Set, Tuple
+from dotenv import load_dotenv
+from .aws_clients import get_client
+from .cache import TTLCache
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Prefijo oculto donde se guardan las miniaturas (no aparece en los listados)
+DERIVATIVES_PREFIX = os.getenv('S3_DERIVATIVES_PREFIX', '.derivatives/')
+
+# Lado máximo de la miniatura en píxeles
+THUMBNAIL_SIZE = int(os.getenv('S3_THUMBNAIL_SIZE', '256'))
+
+# Archivos más grandes no se procesan (se descargarían completos)
+MAX_SOURCE_SIZE = int(os.getenv('S3_DERIVATIVE_MAX_SOURCE', str(50 * 1024 * 1024)))
+
+# Trabajos que pueden esperar en cola; por encima se descartan
+MAX_PENDING = int(os.getenv('S3_DERIVATIVE_MAX_PENDING', '1000'))
+
+# HEAD en paralelo para descubrir miniaturas ya guardadas en S3, y segundos durante
+# los que una miniatura que no se encontró no se vuelve a buscar
+LOOKUP_CONCURRENCY = int(os.getenv('S3_DERIVATIVE_LOOKUPS', '8'))
+MISSING_TTL = float(os.getenv('S3_DERIVATIVE_MISSING_TTL', '300'))
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff')
+PDF_EXTENSIONS = ('.pdf',)
+
+
+def is_derivable(object_key: str) -> bool:
+    """Indica si se puede generar una miniatura para el archivo."""
+    name = object_key.lower()
+    if object_key.startswith(DERIVATIVES_PREFIX):
+        return False
+    return name.endswith(IMAGE_EXTENSIONS) or name.endswith(PDF_EXTENSIONS)
+
+
+def rendition_key(etag: str) -> str:
+    """
+    Clave de la miniatura de un contenido.
+
+    Depende solo del ETag del original (y del tamaño de miniatura), así que
+    un archivo sin cambios nunca se vuelve a procesar y dos copias del mismo
+    contenido comparten miniatura.
+    """
+    etag = etag.strip('"')
+    return f"{DERIVATIVES_PREFIX}thumbs/{etag}-{THUMBNAIL_SIZE}.webp"
+
+
+def render_thumbnail(data: bytes, object_key: str) -> Optional[bytes]:
+    """
+    Generar la miniatura WebP de una imagen o de la primera página de un PDF.
+
+    Pillow es obligatorio para las miniaturas; PyMuPDF (fitz) es opcional y
+    solo se usa para los PDF.
+
+    Returns:
+        Bytes de la miniatura, o None si el formato no se puede procesar
+    """
+    from PIL import Image, ImageOps
+
+    if object_key.lower().endswith(PDF_EXTENSIONS):
+        try:
+            import fitz
+        except ImportError:
+            return None
+        with fitz.open(stream=data, filetype='pdf') as document:
+            if document.page_count == 0:
+                return None
+            page = document[0]
+            scale = THUMBNAIL_SIZE / max(page.rect.width, page.rect.height, 1)
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(scale * 2, scale * 2))
+            data = pixmap.tobytes('png')
+
+    with Image.open(io.BytesIO(data)) as image:
+        # En JPEG se decodifica directamente a baja resolución
+        image.draft('RGB', (THUMBNAIL_SIZE * 2, THUMBNAIL_SIZE * 2))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        output = io.BytesIO()
+        image.save(output, format='WEBP', quality=80)
+        return output.getvalue()
+
+
+class DerivativePipeline:
+    """
+    Cola de miniaturas procesada por un pool de hilos.
+
+    Las subidas encolan sus archivos y los trabajadores descargan el
+    original, generan la miniatura y la guardan en DERIVATIVES_PREFIX.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Inicializar la cola.
+
+        Args:
+            workers: Hilos que generan miniaturas (default: S3_DERIVATIVE_WORKERS o 2)
+        """
+        self.s3_client = get_client('s3', region_name=os.getenv('AWS_REGION'))
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or int(os.getenv('S3_DERIVATIVE_WORKERS', '2')),
+            thread_name_prefix='cndd-derivatives'
+        )
+        self._pending: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+        # Miniaturas que ya se sabe que existen: (bucket, clave de la miniatura)
+        self._known = TTLCache(ttl=24 * 3600, max_entries=100000, max_bytes=64 * 1024 * 1024)
+
+        # Miniaturas buscadas en S3 sin éxito hace poco (no se repite el HEAD)
+        self._missing = TTLCache(ttl=MISSING_TTL, max_entries=100000, max_bytes=16 * 1024 * 1024)
+        self._lookups = ThreadPoolExecutor(
+            max_workers=LOOKUP_CONCURRENCY,
+            thread_name_prefix='cndd-derivative-lookup'
+        )
+
+        # Sin Pillow instalado el pipeline queda desactivado
+        self.enabled = True
+
+        self.queued = 0
+        self.generated = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def has_rendition(self, bucket_name: str, etag: str) -> bool:
+        """Indica si ya se sabe que la miniatura de ese contenido existe."""
+        return self._known.get((bucket_name, rendition_key(etag))) is not None
+
+    def discover(self, bucket_name: str, etags: Iterable[str]) -> Set[str]:
+        """
+        Buscar en S3 las miniaturas que no se conocen en este proceso.
+
+        Solo lee (HEAD en paralelo): sirve para cualquier rol. Las que se
+        encuentran quedan en la caché de conocidas; las que faltan no se
+        vuelven a buscar durante MISSING_TTL segundos.
+
+        Args:
+            bucket_name: Nombre del bucket
+            etags: ETags de los originales
+
+        Returns:
+            ETags cuya miniatura existe
+        """
+        etags = {etag.strip('"') for etag in etags}
+        found = {etag for etag in etags if self.has_rendition(bucket_name, etag)}
+        unknown = [etag for etag in etags - found
+                   if self._missing.get((bucket_name, rendition_key(etag))) is None]
+
+        for etag, exists in zip(unknown, self._lookups.map(
+                lambda etag: self._exists(bucket_name, rendition_key(etag)), unknown)):
+            target = (bucket_name, rendition_key(etag))
+            if exists:
+                self._known.set(target, True)
+                found.add(etag)
+            else:
+                self._missing.set(target, True)
+        return found
+
+    def enqueue(self, bucket_name: str, object_key: str, etag: Optional[str] = None) -> bool:
+        """
+        Encolar un archivo para generar su miniatura.
+
+        Args:
+            bucket_name: Nombre del bucket
+            object_key: Nombre del archivo en S3
+            etag: ETag del archivo si se conoce
+
+        Returns:
+            True si se encoló, False si no aplica o ya estaba en cola
+        """
+        if not self.enabled or not is_derivable(object_key):
+            return False
+        if etag and self.has_rendition(bucket_name, etag):
+            return False
+
+        with self._lock:
+            if (bucket_name, object_key) in self._pending or len(self._pending) >= MAX_PENDING:
+                return False
+            self._pending.add((bucket_name, object_key))
+            self.queued += 1
+
+        self._executor.submit(self._process, bucket_name, object_key, etag)
+        return True
+
+    def _process(self, bucket_name: str, object_key: str, etag: Optional[str]):
+        """Generar y guardar la miniatura de un archivo (corre en el pool)."""
+        result = 'failed'
+        try:
+            if etag and self._has_or_finds(bucket_name, rendition_key(etag)):
+                result = 'skipped'
+                return
+
+            head = self.s3_client.head_object(Bucket=bucket_name, Key=object_key)
+            etag = head['ETag'].strip('"')
+            target = rendition_key(etag)
+
+            if self._has_or_finds(bucket_name, target) or head['ContentLength'] > MAX_SOURCE_SIZE:
+                result = 'skipped'
+                return
+
+            data = self.s3_client.get_object(
+                Bucket=bucket_name, Key=object_key, IfMatch=head['ETag']
+            )['Body'].read()
+            thumbnail = render_thumbnail(data, object_key)
+            if thumbnail is None:
+                result = 'skipped'
+                return
+
+            self.s3_client.put_object(
+                Bucket=bucket_name,
+                Key=target,
+                Body=thumbnail,
+                ContentType='image/webp',
+                CacheControl='max-age=31536000, immutable',
+                Metadata={'source-etag': etag}
+            )
+            self._known.set((bucket_name, target), True)
+            self._missing.invalidate((bucket_name, target))
+            result = 'generated'
+
+        except ImportError:
+            self.enabled = False
+            print("Pillow no está instalado: no se generarán miniaturas")
+        except Exception as e:
+            print(f"Error generando miniatura de {object_key}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard((bucket_name, object_key))
+                setattr(self, result, getattr(self, result) + 1)
+
+    def _has_or_finds(self, bucket_name: str, target: str) -> bool:
+        """Indica si la miniatura existe (consultando S3 si no se sabe aún)."""
+        if self._known.get((bucket_name, target)) is not None:
+            return True
+        if self._exists(bucket_name, target):
+            self._known.set((bucket_name, target), True)
+            return True
+        return False
+
+    def _exists(self, bucket_name: str, object_key: str) -> bool:
+        """Comprobar con HEAD si un objeto existe."""
+        try:
+            self.s3_client.head_object(Bucket=bucket_name, Key=object_key)
+            return True
+        except Exception:
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Contadores del pipeline.
+
+        Returns:
+            Diccionario con trabajos encolados, generados, omitidos, fallidos y pendientes
+        """
+        with self._lock:
+            return {
+                'queued': self.queued,
+                'generated': self.generated,
+                'skipped': self.skipped,
+                'failed': self.failed,
+                'pending': len(self._pending),
+            }
+
+
+_pipeline: Optional[DerivativePipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_derivative_pipeline() -> DerivativePipeline:
+    """Obtener el pipeline de miniaturas del proceso (se crea la primera vez)."""
+    global _pipeline
+
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = DerivativePipeline()
+        return _pipeline
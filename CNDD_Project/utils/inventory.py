@@ -0,0 +1,264 @@
+"""
+Lectura de informes de S3 Inventory (manifest.json + archivos CSV o Parquet)
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote_plus, unquote_plus
+
+# Columnas de un inventario CSV sin versiones
+DEFAULT_SCHEMA = ['Bucket', 'Key', 'Size', 'LastModifiedDate', 'ETag', 'StorageClass']
+
+# Objetos por archivo de datos en los inventarios generados
+ROWS_PER_FILE = 100000
+
+
+class InventoryError(Exception):
+    """El informe de inventario no se puede leer."""
+
+
+def parse_location(location: str) -> Tuple[Optional[str], str]:
+    """
+    Separar la ubicación de un manifest.
+
+    Returns:
+        (bucket, clave) para 's3://bucket/clave', o (None, ruta) para un archivo local
+    """
+    if location.startswith('s3://'):
+        bucket_name, _, key = location[len('s3://'):].partition('/')
+        return bucket_name, key
+    return None, location
+
+
+class InventoryReport:
+    """
+    Un informe de S3 Inventory, en S3 o copiado a disco.
+
+    Los archivos de datos se leen de a uno y por bloques: la memoria no
+    depende del tamaño del bucket inventariado.
+    """
+
+    def __init__(self, location: str, s3_client=None):
+        """
+        Args:
+            location: 's3://bucket/.../manifest.json' o la ruta a un manifest local
+            s3_client: Cliente de S3 (solo para informes guardados en S3)
+        """
+        self.location = location
+        self.s3_client = s3_client
+        self.bucket_name, self.manifest_key = parse_location(location)
+        if self.bucket_name and s3_client is None:
+            raise InventoryError("Se necesita un cliente de S3 para leer un inventario guardado en S3")
+        self.manifest = self._read_manifest()
+
+        self.file_format = self.manifest.get('fileFormat', 'CSV').upper()
+        if self.file_format not in ('CSV', 'PARQUET'):
+            raise InventoryError(f"Formato de inventario no soportado: {self.manifest.get('fileFormat')}")
+
+    def _read_manifest(self) -> Dict:
+        try:
+            if self.bucket_name:
+                body = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.manifest_key)['Body']
+                return json.loads(body.read())
+            with open(self.manifest_key, 'rb') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise InventoryError(f"No se pudo leer el manifest: {e}")
+
+    @property
+    def source_bucket(self) -> str:
+        """Bucket inventariado."""
+        return self.manifest['sourceBucket']
+
+    @property
+    def taken_at(self) -> float:
+        """Momento de la foto (creationTimestamp, en epoch)."""
+        return int(self.manifest['creationTimestamp']) / 1000
+
+    @property
+    def columns(self) -> List[str]:
+        """Columnas de los archivos CSV, en orden."""
+        return [name.strip() for name in self.manifest.get('fileSchema', '').split(',')]
+
+    def _data_files(self) -> List[str]:
+        return [entry['key'] for entry in self.manifest.get('files', [])]
+
+    def _local_path(self, key: str) -> str:
+        """
+        Ruta local de un archivo de datos.
+
+        En un informe copiado a disco las claves del manifest son relativas
+        a la raíz del bucket de destino: se busca esa raíz subiendo desde la
+        carpeta del manifest, y si no, se usa la carpeta del propio manifest.
+        """
+        directory = os.path.dirname(os.path.abspath(self.manifest_key))
+        candidate = directory
+        while True:
+            path = os.path.join(candidate, key)
+            if os.path.exists(path):
+                return path
+            parent = os.path.dirname(candidate)
+            if parent == candidate:
+                return os.path.join(directory, os.path.basename(key))
+            candidate = parent
+
+    def _open(self, key: str):
+        """Abrir un archivo de datos como flujo binario (sin descargarlo entero)."""
+        if not self.bucket_name:
+            return open(self._local_path(key), 'rb')
+        destination = self.manifest.get('destinationBucket', '').split(':::')[-1] or self.bucket_name
+        return self.s3_client.get_object(Bucket=destination, Key=key)['Body']
+
+    def rows(self) -> Iterator[Dict]:
+        """
+        Recorrer los objetos vigentes del inventario.
+
+        Se omiten las versiones anteriores y los marcadores de borrado de los
+        inventarios con versiones.
+
+        Yields:
+            {'key', 'size', 'last_modified' ('%Y-%m-%d %H:%M:%S', UTC), 'storage_class', 'etag'}
+        """
+        for key in self._data_files():
+            if self.file_format == 'CSV':
+                yield from self._csv_rows(key)
+            else:
+                yield from self._parquet_rows(key)
+
+    def _csv_rows(self, key: str) -> Iterator[Dict]:
+        columns = self.columns
+        with self._open(key) as raw:
+            stream = gzip.GzipFile(fileobj=raw) if key.endswith('.gz') else raw
+            reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+            for values in reader:
+                record = dict(zip(columns, values))
+                # Las claves vienen codificadas como URL en los CSV
+                record['Key'] = unquote_plus(record.get('Key', ''))
+                row = self._to_row(record)
+                if row:
+                    yield row
+
+    def _parquet_rows(self, key: str) -> Iterator[Dict]:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise InventoryError("Los inventarios en Parquet necesitan pyarrow (pip install pyarrow)")
+
+        # Parquet guarda su índice al final: se copia a un temporal para poder saltar
+        if self.bucket_name:
+            with tempfile.NamedTemporaryFile(suffix='.parquet') as local, self._open(key) as raw:
+                shutil.copyfileobj(raw, local, 1024 * 1024)
+                local.flush()
+                yield from self._parquet_file_rows(pq, local.name)
+        else:
+            yield from self._parquet_file_rows(pq, self._local_path(key))
+
+    def _parquet_file_rows(self, pq, path: str) -> Iterator[Dict]:
+        parquet = pq.ParquetFile(path)
+        names = {field.lower(): field for field in parquet.schema_arrow.names}
+        for batch in parquet.iter_batches(batch_size=10000):
+            for values in batch.to_pylist():
+                record = {
+                    column: values.get(names.get(column.lower(), ''))
+                    for column in ('Key', 'Size', 'LastModifiedDate', 'ETag', 'StorageClass',
+                                   'IsLatest', 'IsDeleteMarker')
+                }
+                row = self._to_row(record)
+                if row:
+                    yield row
+
+    @staticmethod
+    def _to_row(record: Dict) -> Optional[Dict]:
+        """Convertir un registro del inventario en una fila del catálogo."""
+        if str(record.get('IsLatest', 'true')).lower() == 'false':
+            return None
+        if str(record.get('IsDeleteMarker', 'false')).lower() == 'true':
+            return None
+        if not record.get('Key') or record.get('Size') in (None, ''):
+            return None
+
+        modified = record.get('LastModifiedDate')
+        if isinstance(modified, str):
+            modified = datetime.fromisoformat(modified.replace('Z', '+00:00'))
+        elif isinstance(modified, (int, float)):
+            modified = datetime.fromtimestamp(modified / 1000, tz=timezone.utc)
+        if modified is None:
+            return None
+        if modified.tzinfo is not None:
+            modified = modified.astimezone(timezone.utc)
+
+        return {
+            'key': record['Key'],
+            'size': int(record['Size']),
+            'last_modified': modified.strftime('%Y-%m-%d %H:%M:%S'),
+            'storage_class': record.get('StorageClass') or 'STANDARD',
+            'etag': (record.get('ETag') or '').strip('"'),
+        }
+
+
+
+def write_csv_inventory(directory: str, bucket_name: str, records: Iterable[Dict],
+                        columns: Optional[List[str]] = None, taken_at: Optional[float] = None,
+                        rows_per_file: int = ROWS_PER_FILE) -> str:
+    """
+    Escribir un inventario CSV local con la misma estructura que genera S3.
+
+    Sirve para probar la importación sin acceso a S3: las claves se
+    codifican como URL y los archivos de datos se comprimen con gzip.
+
+    Args:
+        directory: Carpeta que hace de raíz del bucket de destino
+        bucket_name: Bucket inventariado
+        records: Registros {columna: valor}; 'Bucket' se completa si falta
+        columns: Columnas del informe (default: DEFAULT_SCHEMA)
+        taken_at: Momento de la foto (epoch, default: ahora)
+        rows_per_file: Registros por archivo de datos
+
+    Returns:
+        Ruta del manifest.json
+    """
+    columns = columns or DEFAULT_SCHEMA
+    root = os.path.join(directory, 'inventario', bucket_name, 'diario')
+    os.makedirs(os.path.join(root, 'data'), exist_ok=True)
+    files = []
+    output = None
+
+    try:
+        for index, record in enumerate(records):
+            if index % rows_per_file == 0:
+                if output:
+                    output.close()
+                key = f"inventario/{bucket_name}/diario/data/parte-{index // rows_per_file:04d}.csv.gz"
+                files.append({'key': key})
+                output = gzip.open(os.path.join(directory, key), 'wt', encoding='utf-8', newline='')
+                writer = csv.writer(output, quoting=csv.QUOTE_ALL)
+            record = {'Bucket': bucket_name, **record}
+            record['Key'] = quote_plus(record['Key'], safe='/')
+            writer.writerow([record.get(column, '') for column in columns])
+    finally:
+        if output:
+            output.close()
+    for entry in files:
+        entry['size'] = os.path.getsize(os.path.join(directory, entry['key']))
+
+    manifest = os.path.join(root, '2024-05-01T01-00Z', 'manifest.json')
+    os.makedirs(os.path.dirname(manifest), exist_ok=True)
+    with open(manifest, 'w', encoding='utf-8') as f:
+        json.dump({
+            'sourceBucket': bucket_name,
+            'destinationBucket': 'arn:aws:s3:::inventario-local',
+            'version': '2016-11-30',
+            'creationTimestamp': str(int((time.time() if taken_at is None else taken_at) * 1000)),
+            'fileFormat': 'CSV',
+            'fileSchema': ', '.join(columns),
+            'files': files,
+        }, f)
+    return manifest
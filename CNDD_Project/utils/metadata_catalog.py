@@ -0,0 +1,686 @@
+"""
+Catálogo local (SQLite) de los objetos de los buckets, con búsqueda por texto
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+from .aws_clients import get_client
+from .derivatives import DERIVATIVES_PREFIX
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Archivo de la base de datos del catálogo
+DEFAULT_CATALOG_PATH = os.path.join(tempfile.gettempdir(), 'cndd-catalog.sqlite3')
+
+# Segundos durante los que una carpeta ya contrastada con S3 no se vuelve a listar
+CATALOG_REFRESH_TTL = float(os.getenv('S3_CATALOG_REFRESH_TTL', '300'))
+
+# Un bucket catalogado recorriendo el listado se vuelve a recorrer pasado este tiempo
+# (los importados desde un inventario se renuevan importando uno nuevo)
+CATALOG_MAX_AGE = float(os.getenv('S3_CATALOG_MAX_AGE', str(24 * 3600)))
+
+# Origen de las fotos tomadas recorriendo el listado del bucket
+LISTING_SOURCE = 'list_objects_v2'
+
+# Buckets sin inventario que se pueden recorrer completos para ordenarlos y buscar en ellos
+CATALOG_CRAWL_BUCKETS = {
+    name.strip() for name in os.getenv('S3_CATALOG_CRAWL_BUCKETS', '').split(',') if name.strip()
+}
+
+# Filas que se insertan por lote al importar un inventario
+INGEST_BATCH_SIZE = 10000
+
+# Mismo formato de cursor que S3Manager.iter_pages ("seguir después de esta clave")
+START_AFTER_CURSOR = 'after:'
+
+# Límite superior de todas las claves que empiezan por un prefijo
+KEY_RANGE_END = '\U0010ffff'
+
+# Si cambia el esquema, el catálogo (que es una copia) se vuelve a crear
+CATALOG_SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    id INTEGER PRIMARY KEY,
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_modified TEXT NOT NULL,
+    storage_class TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    -- Carpeta del objeto (hasta la última '/', incluida): rtrim quita por la
+    -- derecha todo carácter que no sea '/'
+    parent TEXT GENERATED ALWAYS AS (rtrim(key, replace(key, '/', ''))) STORED,
+    UNIQUE (bucket, key)
+);
+CREATE INDEX IF NOT EXISTS objects_size ON objects (bucket, size);
+CREATE INDEX IF NOT EXISTS objects_modified ON objects (bucket, last_modified);
+
+-- Listado de una carpeta sin recorrer sus subcarpetas (por nombre sale en orden;
+-- por otra columna se ordenan solo los archivos directos de la carpeta)
+CREATE INDEX IF NOT EXISTS objects_parent ON objects (bucket, parent, key);
+
+-- Índice de texto por trigramas: búsqueda de subcadenas sin distinguir mayúsculas
+CREATE VIRTUAL TABLE IF NOT EXISTS objects_fts USING fts5(
+    key, content='objects', content_rowid='id', tokenize='trigram case_sensitive 0'
+);
+CREATE TRIGGER IF NOT EXISTS objects_fts_insert AFTER INSERT ON objects BEGIN
+    INSERT INTO objects_fts (rowid, key) VALUES (new.id, new.key);
+END;
+CREATE TRIGGER IF NOT EXISTS objects_fts_delete AFTER DELETE ON objects BEGIN
+    INSERT INTO objects_fts (objects_fts, rowid, key) VALUES ('delete', old.id, old.key);
+END;
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    bucket TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    ingested_at REAL NOT NULL,
+    object_count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS changes (
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    row TEXT,
+    changed_at REAL NOT NULL,
+    PRIMARY KEY (bucket, key, kind)
+);
+"""
+
+# Alta o actualización de un objeto (la clave no cambia: el índice de texto sigue válido)
+_UPSERT = (
+    'INSERT INTO objects (bucket, key, size, last_modified, storage_class, etag) VALUES (?, ?, ?, ?, ?, ?) '
+    'ON CONFLICT (bucket, key) DO UPDATE SET size = excluded.size, last_modified = excluded.last_modified, '
+    'storage_class = excluded.storage_class, etag = excluded.etag'
+)
+
+# Coincidencias que se cuentan como mucho en una búsqueda
+SEARCH_COUNT_LIMIT = 10000
+
+# Columnas por las que se pueden ordenar los listados y los resultados de búsqueda
+SORT_COLUMNS = {
+    'key': 'o.key',
+    'size': 'o.size',
+    'last_modified': 'o.last_modified',
+    'storage_class': 'o.storage_class',
+}
+
+def format_row(row: Tuple) -> Dict:
+    """Convertir una fila (key, size, last_modified, storage_class, etag) al formato de los listados."""
+    key, size, last_modified, storage_class, etag = row
+    return {
+        'key': key,
+        'name': key.split('/')[-1],
+        'size': size,
+        'size_mb': round(size / (1024 * 1024), 2),
+        'last_modified': last_modified,
+        'storage_class': storage_class,
+        'etag': etag,
+    }
+
+
+class MetadataCatalog:
+    """
+    Copia local de los metadatos de los objetos de los buckets catalogados.
+
+    Un bucket entra al catálogo cuando se importa su inventario de S3 o,
+    si está en S3_CATALOG_CRAWL_BUCKETS, cuando se recorre con
+    list_objects_v2 (la primera vez que se ordena o se busca en él). Los
+    listados ordenados y las búsquedas salen de aquí en milisegundos; los
+    listados por páginas solo en los buckets con inventario (los demás
+    siguen listándose en S3). Encima de la foto inicial se aplican:
+
+    - los cambios hechos desde la aplicación (subidas, borrados, copias),
+      que se guardan también en la tabla `changes` para volver a aplicarse
+      si se importa un inventario anterior a ellos;
+    - un contraste con S3 de cada carpeta que se visita (un listado de ese
+      nivel en segundo plano, como mucho cada S3_CATALOG_REFRESH_TTL s),
+      que corrige lo cambiado por otras herramientas.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('METADATA_CATALOG_PATH', DEFAULT_CATALOG_PATH)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._refreshed: Dict[Tuple[str, str], float] = {}
+        self._pending: Set[Tuple[str, str, bool]] = set()
+        self._indexing: Set[str] = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cndd-catalog')
+        self._s3_client = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = self._connect()
+        if connection.execute('PRAGMA user_version').fetchone()[0] != CATALOG_SCHEMA_VERSION:
+            connection.executescript(
+                'DROP TABLE IF EXISTS objects_fts; DROP TABLE IF EXISTS objects; '
+                'DROP TABLE IF EXISTS snapshots; DROP TABLE IF EXISTS changes;'
+            )
+            connection.executescript(_SCHEMA)
+            connection.execute(f'PRAGMA user_version = {CATALOG_SCHEMA_VERSION}')
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (SQLite no comparte conexiones entre hilos)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            # WAL: las lecturas no esperan a una importación en curso
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    # === Consultas ===
+
+    def has_bucket(self, bucket_name: str) -> bool:
+        """
+        Indica si el bucket está catalogado (inventario importado o recorrido).
+
+        Se consulta la tabla cada vez (una fila por clave primaria): los
+        inventarios se importan desde otro proceso (scripts/importar_inventario.py)
+        y la aplicación en marcha tiene que verlos sin reiniciarse.
+        """
+        return self._connect().execute(
+            'SELECT 1 FROM snapshots WHERE bucket = ?', (bucket_name,)
+        ).fetchone() is not None
+
+    def has_inventory(self, bucket_name: str) -> bool:
+        """Indica si la foto del bucket viene de un inventario (no de recorrer el listado)."""
+        info = self.snapshot(bucket_name)
+        return info is not None and info['source'] != LISTING_SOURCE
+
+    def can_index(self, bucket_name: str) -> bool:
+        """Indica si el bucket tiene inventario o se puede recorrer (S3_CATALOG_CRAWL_BUCKETS)."""
+        return bucket_name in CATALOG_CRAWL_BUCKETS or self.has_inventory(bucket_name)
+
+    def snapshot(self, bucket_name: str) -> Optional[Dict]:
+        """Datos de la última importación de un bucket."""
+        row = self._connect().execute(
+            'SELECT source, taken_at, ingested_at, object_count FROM snapshots WHERE bucket = ?',
+            (bucket_name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'source': row[0], 'taken_at': row[1], 'ingested_at': row[2], 'object_count': row[3]}
+
+    def _rows_after(self, bucket_name: str, prefix: str, after: str, limit: int) -> List[Tuple]:
+        """Filas del prefijo con clave mayor que `after`, en el orden de S3."""
+        # SQLite compara TEXT byte a byte en UTF-8: el mismo orden que S3.
+        # Una sola cota inferior para que el rango salga directo del índice
+        if after >= prefix:
+            condition, start = 'key > ?', after
+        else:
+            condition, start = 'key >= ?', prefix
+        return self._connect().execute(
+            'SELECT key, size, last_modified, storage_class, etag FROM objects '
+            f'WHERE bucket = ? AND {condition} AND key < ? ORDER BY key LIMIT ?',
+            (bucket_name, start, prefix + KEY_RANGE_END, limit)
+        ).fetchall()
+
+    def list_page(self, bucket_name: str, prefix: str = '', page_size: int = 1000,
+                  cursor: Optional[str] = None, delimiter: str = '') -> Dict:
+        """
+        Una página del listado con el mismo formato que S3Manager.iter_pages.
+
+        Con delimitador, cada subcarpeta cuenta como una entrada y su
+        contenido se salta de un solo salto (no se recorre).
+
+        Args:
+            bucket_name: Nombre del bucket
+            prefix: Carpeta a listar
+            page_size: Máximo de entradas (archivos + carpetas)
+            cursor: 'after:<clave>' devuelto por la página anterior
+            delimiter: Separador de carpetas ('' = listado plano)
+
+        Returns:
+            Diccionario {'files': [...], 'folders': [...], 'next_cursor': str | None}
+        """
+        after = cursor[len(START_AFTER_CURSOR):] if cursor else ''
+        files, folders = [], []
+
+        while len(files) + len(folders) < page_size:
+            limit = page_size - len(files) - len(folders)
+            # Por carpetas, cada subcarpeta corta el lote: se piden lotes cortos
+            rows = self._rows_after(bucket_name, prefix, after, min(limit, 32) if delimiter else limit)
+            if not rows:
+                break
+            for row in rows:
+                key = row[0]
+                rest = key[len(prefix):]
+                if delimiter and delimiter in rest:
+                    folder = prefix + rest.split(delimiter)[0] + delimiter
+                    folders.append({'prefix': folder, 'name': folder.rstrip('/').split('/')[-1]})
+                    after = folder + KEY_RANGE_END
+                    break
+                after = key
+                # El marcador de carpeta vacía no es un archivo
+                if key != prefix or not prefix.endswith('/'):
+                    files.append(format_row(row))
+                if len(files) + len(folders) >= page_size:
+                    break
+
+        next_cursor = None
+        if len(files) + len(folders) >= page_size and self._rows_after(bucket_name, prefix, after, 1):
+            next_cursor = START_AFTER_CURSOR + after
+        return {'files': files, 'folders': folders, 'next_cursor': next_cursor}
+
+    def _child_folders(self, bucket_name: str, prefix: str) -> List[str]:
+        """Subcarpetas inmediatas de una carpeta, en orden (un salto por subcarpeta)."""
+        connection = self._connect()
+        folders, after = [], prefix
+        while True:
+            row = connection.execute(
+                'SELECT parent FROM objects INDEXED BY objects_parent WHERE bucket = ? AND parent > ? AND parent < ? '
+                'ORDER BY parent LIMIT 1',
+                (bucket_name, after, prefix + KEY_RANGE_END)
+            ).fetchone()
+            if row is None:
+                return folders
+            folder = prefix + row[0][len(prefix):].split('/')[0] + '/'
+            folders.append(folder)
+            after = folder + KEY_RANGE_END
+
+    def sorted_page(self, bucket_name: str, prefix: str = '', sort: str = 'key', descending: bool = False,
+                    offset: int = 0, page_size: int = 200, delimiter: str = '/') -> Dict:
+        """
+        Una página de una carpeta ordenada por cualquier columna.
+
+        Por carpetas, primero van las subcarpetas (por nombre) y después los
+        archivos; los totales y el corte de la página salen del índice por
+        carpeta, sin recorrer el contenido de las subcarpetas.
+
+        Args:
+            bucket_name: Nombre del bucket
+            prefix: Carpeta a listar
+            sort: 'key', 'size', 'last_modified' o 'storage_class'
+            descending: Orden descendente
+            offset: Posición de la primera entrada (carpetas + archivos)
+            page_size: Máximo de entradas de la página
+            delimiter: '/' para listar un solo nivel, '' para todo el contenido
+
+        Returns:
+            {'files': [...], 'folders': [...], 'total_files': int, 'total_folders': int,
+             'offset': int} (offset se corrige si la carpeta se ha quedado más corta)
+        """
+        connection = self._connect()
+        # El marcador de la propia carpeta no es un archivo
+        if delimiter:
+            folders = self._child_folders(bucket_name, prefix)
+            if sort == 'key' and descending:
+                folders.reverse()
+            # Sin estadísticas el planificador puede preferir un índice de todo el bucket
+            source = 'objects o INDEXED BY objects_parent'
+            where, params = 'o.bucket = ? AND o.parent = ? AND o.key <> ?', [bucket_name, prefix, prefix]
+        else:
+            folders = []
+            source = 'objects o'
+            where = 'o.bucket = ? AND o.key > ? AND o.key < ?'
+            params = [bucket_name, prefix, prefix + KEY_RANGE_END]
+
+        total_files = connection.execute(f'SELECT count(*) FROM {source} WHERE {where}', params).fetchone()[0]
+        total = len(folders) + total_files
+        if offset >= total:
+            offset = max(0, (total - 1) // page_size * page_size)
+
+        page_folders = folders[offset:offset + page_size]
+        limit = page_size - len(page_folders)
+        rows = []
+        if limit > 0:
+            direction = 'DESC' if descending else 'ASC'
+            rows = connection.execute(
+                f'SELECT o.key, o.size, o.last_modified, o.storage_class, o.etag FROM {source} '
+                f"WHERE {where} ORDER BY {SORT_COLUMNS.get(sort, 'o.key')} {direction}, o.key {direction} "
+                'LIMIT ? OFFSET ?',
+                params + [limit, max(0, offset - len(folders))]
+            ).fetchall()
+
+        return {
+            'files': [format_row(row) for row in rows],
+            'folders': [{'prefix': folder, 'name': folder.rstrip('/').split('/')[-1]} for folder in page_folders],
+            'total_files': total_files,
+            'total_folders': len(folders),
+            'offset': offset,
+        }
+
+    # === Importación ===
+
+    def replace_bucket(self, bucket_name: str, rows: Iterable[Dict], taken_at: float, source: str) -> int:
+        """
+        Reemplazar los objetos de un bucket por los de un inventario.
+
+        Las filas se insertan por lotes dentro de una sola transacción; hasta
+        que termina, los listados siguen viendo la foto anterior. Después se
+        vuelven a aplicar los cambios de la aplicación posteriores a la foto.
+
+        Args:
+            bucket_name: Bucket inventariado
+            rows: Filas {'key', 'size', 'last_modified', 'storage_class', 'etag'}
+            taken_at: Momento de la foto del inventario (epoch)
+            source: Origen del inventario (para mostrarlo)
+
+        Returns:
+            Número de objetos importados
+        """
+        connection = self._connect()
+        count = 0
+        with connection:
+            connection.execute('DELETE FROM objects WHERE bucket = ?', (bucket_name,))
+            batch = []
+            for row in rows:
+                if row['key'].startswith(DERIVATIVES_PREFIX):
+                    continue
+                batch.append((bucket_name, row['key'], row['size'], row['last_modified'],
+                              row['storage_class'], row['etag']))
+                if len(batch) >= INGEST_BATCH_SIZE:
+                    count += self._insert(connection, batch)
+                    batch = []
+            count += self._insert(connection, batch)
+
+            changes = connection.execute(
+                'SELECT key, kind, row FROM changes WHERE bucket = ? AND changed_at > ? ORDER BY changed_at',
+                (bucket_name, taken_at)
+            ).fetchall()
+            for key, kind, row in changes:
+                self._apply(connection, bucket_name, key, kind, json.loads(row) if row else None)
+            connection.execute('DELETE FROM changes WHERE bucket = ? AND changed_at <= ?', (bucket_name, taken_at))
+
+            connection.execute(
+                'INSERT OR REPLACE INTO snapshots (bucket, source, taken_at, ingested_at, object_count) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (bucket_name, source, taken_at, time.time(), count)
+            )
+
+        with self._lock:
+            self._refreshed = {k: v for k, v in self._refreshed.items() if k[0] != bucket_name}
+        return count
+
+    @staticmethod
+    def _insert(connection: sqlite3.Connection, batch: List[Tuple]) -> int:
+        connection.executemany(_UPSERT, batch)
+        return len(batch)
+
+    # === Cambios de la aplicación ===
+
+    @staticmethod
+    def _apply(connection: sqlite3.Connection, bucket_name: str, key: str, kind: str, row: Optional[Dict]):
+        """Aplicar un cambio ('put', 'delete' o 'delete_prefix') a la tabla de objetos."""
+        if kind == 'put':
+            connection.execute(
+                _UPSERT,
+                (bucket_name, key, row['size'], row['last_modified'], row['storage_class'], row['etag'])
+            )
+        elif kind == 'delete':
+            connection.execute('DELETE FROM objects WHERE bucket = ? AND key = ?', (bucket_name, key))
+        elif kind == 'delete_prefix':
+            connection.execute(
+                'DELETE FROM objects WHERE bucket = ? AND key >= ? AND key < ?',
+                (bucket_name, key, key + KEY_RANGE_END)
+            )
+
+    def _record(self, bucket_name: str, changes: List[Tuple[str, str, Optional[Dict]]]):
+        """Aplicar y anotar cambios hechos desde la aplicación."""
+        connection = self._connect()
+        now = time.time()
+        with connection:
+            for key, kind, row in changes:
+                self._apply(connection, bucket_name, key, kind, row)
+                # Solo el último cambio de cada clave importa
+                connection.execute(
+                    "DELETE FROM changes WHERE bucket = ? AND key = ? AND kind IN ('put', 'delete')",
+                    (bucket_name, key)
+                )
+                connection.execute(
+                    'INSERT OR REPLACE INTO changes (bucket, key, kind, row, changed_at) VALUES (?, ?, ?, ?, ?)',
+                    (bucket_name, key, kind, json.dumps(row) if row else None, now)
+                )
+
+    def object_stored(self, bucket_name: str, row: Dict):
+        """Registrar un objeto subido o copiado (fila con el formato de los listados)."""
+        if self.has_bucket(bucket_name) and not row['key'].startswith(DERIVATIVES_PREFIX):
+            fields = {name: row.get(name, '') for name in ('size', 'last_modified', 'storage_class', 'etag')}
+            self._record(bucket_name, [(row['key'], 'put', fields)])
+
+    def objects_deleted(self, bucket_name: str, object_keys: List[str]):
+        """Registrar objetos eliminados."""
+        if self.has_bucket(bucket_name) and object_keys:
+            self._record(bucket_name, [(key, 'delete', None) for key in object_keys])
+
+    def prefix_deleted(self, bucket_name: str, prefix: str):
+        """Registrar una carpeta eliminada con todo su contenido."""
+        if self.has_bucket(bucket_name):
+            self._record(bucket_name, [(prefix, 'delete_prefix', None)])
+
+    # === Contraste con S3 ===
+
+    def refresh(self, bucket_name: str, prefix: str, recursive: bool = False, force: bool = False):
+        """
+        Encolar el contraste de una carpeta con S3.
+
+        Args:
+            bucket_name: Nombre del bucket
+            prefix: Carpeta a contrastar
+            recursive: True = todo el contenido (p. ej. tras copiar una carpeta);
+                False = solo el nivel de la carpeta
+            force: Contrastar aunque se haya hecho hace poco
+        """
+        if not self.has_bucket(bucket_name):
+            return
+        job = (bucket_name, prefix, recursive)
+        with self._lock:
+            checked_at = self._refreshed.get((bucket_name, prefix), 0)
+            if job in self._pending or (not force and not recursive and time.time() - checked_at < CATALOG_REFRESH_TTL):
+                return
+            self._pending.add(job)
+        self._executor.submit(self._run_refresh, job)
+
+    def _run_refresh(self, job: Tuple[str, str, bool]):
+        bucket_name, prefix, recursive = job
+        with self._lock:
+            self._pending.discard(job)
+            self._refreshed[(bucket_name, prefix)] = time.time()
+        try:
+            self._reconcile(bucket_name, prefix, recursive)
+        except Exception as e:
+            print(f"Error contrastando el catálogo de {bucket_name}/{prefix}: {e}")
+
+    def _live_pages(self, bucket_name: str, prefix: str, delimiter: str = '') -> Iterator[Dict]:
+        """Páginas de list_objects_v2 bajo un prefijo."""
+        if self._s3_client is None:
+            self._s3_client = get_client('s3', region_name=os.getenv('AWS_REGION'))
+        params = {'Bucket': bucket_name, 'Prefix': prefix}
+        if delimiter:
+            params['Delimiter'] = delimiter
+        return self._s3_client.get_paginator('list_objects_v2').paginate(**params)
+
+    @staticmethod
+    def _live_rows(page: Dict) -> Iterator[Dict]:
+        """Filas del catálogo de una página de list_objects_v2 (sin miniaturas)."""
+        for obj in page.get('Contents', []):
+            if obj['Key'].startswith(DERIVATIVES_PREFIX):
+                continue
+            yield {
+                'key': obj['Key'],
+                'size': obj['Size'],
+                'last_modified': obj['LastModified'].strftime('%Y-%m-%d %H:%M:%S'),
+                'storage_class': obj.get('StorageClass', 'STANDARD'),
+                'etag': obj.get('ETag', '').strip('"'),
+            }
+
+    def _live(self, bucket_name: str, prefix: str, delimiter: str) -> Tuple[Dict[str, Dict], Set[str]]:
+        """Objetos y subcarpetas actuales de S3 bajo un prefijo."""
+        objects, folders = {}, set()
+        for page in self._live_pages(bucket_name, prefix, delimiter):
+            for row in self._live_rows(page):
+                objects[row.pop('key')] = row
+            folders.update(p['Prefix'] for p in page.get('CommonPrefixes', [])
+                           if p['Prefix'] != DERIVATIVES_PREFIX)
+        return objects, folders
+
+    def _catalog_level(self, bucket_name: str, prefix: str, delimiter: str) -> Iterator[Dict]:
+        """Recorrer las páginas del catálogo de una carpeta."""
+        cursor = None
+        while True:
+            page = self.list_page(bucket_name, prefix, page_size=1000, cursor=cursor, delimiter=delimiter)
+            yield page
+            cursor = page['next_cursor']
+            if not cursor:
+                return
+
+    def _reconcile(self, bucket_name: str, prefix: str, recursive: bool):
+        """Igualar el catálogo con S3 en una carpeta (o en todo su contenido)."""
+        started = time.time()
+        delimiter = '' if recursive else '/'
+        live, live_folders = self._live(bucket_name, prefix, delimiter)
+
+        stored, stored_folders = {}, set()
+        for page in self._catalog_level(bucket_name, prefix, delimiter):
+            for row in page['files']:
+                stored[row['key']] = {name: row[name] for name in ('size', 'last_modified', 'storage_class', 'etag')}
+            stored_folders.update(folder['prefix'] for folder in page['folders'])
+        if prefix.endswith('/'):
+            live.pop(prefix, None)
+
+        connection = self._connect()
+        with connection:
+            # Lo cambiado desde la aplicación mientras se listaba no se toca
+            recent = {row[0] for row in connection.execute(
+                'SELECT key FROM changes WHERE bucket = ? AND changed_at >= ?', (bucket_name, started)
+            )}
+            for key, row in live.items():
+                if key not in recent and stored.get(key) != row:
+                    self._apply(connection, bucket_name, key, 'put', row)
+            for key in stored.keys() - live.keys() - recent:
+                self._apply(connection, bucket_name, key, 'delete', None)
+            for folder in stored_folders - live_folders - recent:
+                self._apply(connection, bucket_name, folder, 'delete_prefix', None)
+
+        # Las carpetas que el catálogo no conocía se importan completas
+        for folder in live_folders - stored_folders:
+            self.refresh(bucket_name, folder, recursive=True)
+
+    # === Catalogar recorriendo el listado ===
+
+    def index_bucket(self, bucket_name: str) -> bool:
+        """
+        Encolar el recorrido completo de un bucket si no está catalogado (o
+        si su foto del listado es más vieja que S3_CATALOG_MAX_AGE).
+
+        Solo se recorren los buckets de S3_CATALOG_CRAWL_BUCKETS; comprobar
+        antes can_index.
+
+        Returns:
+            True si el bucket se está catalogando (aún no se puede buscar en él)
+        """
+        if not self.can_index(bucket_name):
+            return False
+        info = self.snapshot(bucket_name) if self.has_bucket(bucket_name) else None
+        stale = (info is not None and info['source'] == LISTING_SOURCE
+                 and time.time() - info['taken_at'] > CATALOG_MAX_AGE)
+        with self._lock:
+            if bucket_name in self._indexing:
+                return info is None
+            if info is not None and not stale:
+                return False
+            self._indexing.add(bucket_name)
+        self._executor.submit(self._run_index, bucket_name)
+        return info is None
+
+    def _run_index(self, bucket_name: str):
+        started = time.time()
+        try:
+            rows = (row for page in self._live_pages(bucket_name, '') for row in self._live_rows(page))
+            self.replace_bucket(bucket_name, rows, started, LISTING_SOURCE)
+        except Exception as e:
+            print(f"Error catalogando {bucket_name}: {e}")
+        finally:
+            with self._lock:
+                self._indexing.discard(bucket_name)
+
+    # === Búsqueda ===
+
+    def search(self, bucket_names: List[str], query: str, prefix: str = '', sort: str = 'key',
+               descending: bool = False, limit: int = 200) -> Tuple[List[Dict], int]:
+        """
+        Buscar archivos cuya clave contiene un texto (sin distinguir mayúsculas).
+
+        Con 3 caracteres o más se usa el índice de trigramas; con menos se
+        recorren las claves de los buckets pedidos.
+
+        Args:
+            bucket_names: Buckets en los que buscar
+            query: Texto a buscar en la clave (ruta y nombre)
+            prefix: Solo dentro de esta carpeta
+            sort: 'key', 'size' o 'last_modified'
+            descending: Orden descendente
+            limit: Máximo de resultados devueltos
+
+        Returns:
+            Tuple (filas con 'bucket' además de los campos del listado, total de
+            coincidencias; SEARCH_COUNT_LIMIT + 1 significa "más de SEARCH_COUNT_LIMIT")
+        """
+        query = query.strip()
+        if not bucket_names or not query:
+            return [], 0
+
+        placeholders = ', '.join('?' for _ in bucket_names)
+        if len(query) >= 3:
+            # CROSS JOIN fija el orden: primero el índice de texto, después la fila
+            source = 'objects_fts f CROSS JOIN objects o ON o.id = f.rowid'
+            condition = 'objects_fts MATCH ?'
+            # Entre comillas el texto es una sola frase: los símbolos no son operadores
+            params = ['"' + query.replace('"', '""') + '"']
+        else:
+            source = 'objects o'
+            condition = "o.key LIKE ? ESCAPE '\\'"
+            escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params = [f'%{escaped}%']
+        where = f'{condition} AND o.bucket IN ({placeholders})'
+        params += bucket_names
+        if prefix:
+            where += ' AND o.key >= ? AND o.key < ?'
+            params += [prefix, prefix + KEY_RANGE_END]
+
+        connection = self._connect()
+        # Con búsquedas muy amplias se deja de contar en SEARCH_COUNT_LIMIT
+        total = connection.execute(
+            f'SELECT count(*) FROM (SELECT 1 FROM {source} WHERE {where} LIMIT ?)',
+            params + [SEARCH_COUNT_LIMIT + 1]
+        ).fetchone()[0]
+        order = f"{SORT_COLUMNS.get(sort, 'o.key')} {'DESC' if descending else 'ASC'}, o.key"
+        rows = connection.execute(
+            f'SELECT o.bucket, o.key, o.size, o.last_modified, o.storage_class, o.etag '
+            f'FROM {source} WHERE {where} ORDER BY {order} LIMIT ?',
+            params + [limit]
+        ).fetchall()
+        return [{'bucket': row[0], **format_row(row[1:])} for row in rows], total
+
+    def flush(self):
+        """Esperar a que terminen los contrastes y recorridos encolados."""
+        while True:
+            self._executor.submit(lambda: None).result()
+            with self._lock:
+                if not self._pending and not self._indexing:
+                    return
+
+
+_catalog: Optional[MetadataCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_metadata_catalog() -> MetadataCatalog:
+    """Obtener el catálogo del proceso (se abre la primera vez)."""
+    global _catalog
+
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = MetadataCatalog()
+        return _catalog
@@ -0,0 +1,318 @@
+"""
+Subida por partes (multipart) a S3 con memoria acotada
+"""
+
+import hashlib
+import math
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from botocore.exceptions import ClientError
+from .upload_state import upload_fingerprint
+
+# S3 exige partes de al menos 5 MiB (salvo la última) y como máximo 10 000 partes
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+# Tamaño de parte por defecto (configurable con S3_UPLOAD_PART_SIZE)
+DEFAULT_PART_SIZE = int(os.getenv('S3_UPLOAD_PART_SIZE', str(8 * 1024 * 1024)))
+
+# Segundos sin enviar partes tras los que otra instancia puede reanudar una subida registrada
+UPLOAD_LEASE = float(os.getenv('S3_UPLOAD_LEASE', '300'))
+
+# Registros que están usando las subidas en curso de este proceso
+_active_uploads = set()
+_active_lock = threading.Lock()
+
+
+def choose_part_size(total_size: Optional[int] = None) -> int:
+    """
+    Elegir el tamaño de parte para una subida.
+
+    Args:
+        total_size: Tamaño total del archivo si se conoce
+
+    Returns:
+        Tamaño de parte en bytes que respeta los límites de S3
+    """
+    part_size = max(DEFAULT_PART_SIZE, MIN_PART_SIZE)
+    if total_size:
+        part_size = max(part_size, math.ceil(total_size / MAX_PARTS))
+    return part_size
+
+
+class MultipartUploader:
+    """
+    Escritor que envía a S3 los datos a medida que llegan.
+
+    Nunca guarda en memoria más de una parte: cuando el búfer alcanza
+    `part_size` se sube como UploadPart y se descarta. Si el archivo completo
+    cabe en una sola parte se usa un PutObject normal.
+
+    Con un `state_store` y el tamaño total, el UploadId y el ETag/MD5 de cada
+    parte se persisten; si la misma subida se reintenta, las partes que ya
+    están en S3 con el mismo contenido no se vuelven a enviar. Un registro
+    que otra subida en curso está usando (en este proceso, o en otro que
+    envió una parte hace menos de S3_UPLOAD_LEASE s) no se comparte: la
+    segunda subida va por su cuenta y sin reanudación.
+    """
+
+    def __init__(self, s3_client, bucket_name: str, object_key: str,
+                 part_size: Optional[int] = None, content_type: Optional[str] = None,
+                 state_store=None, total_size: Optional[int] = None,
+                 metadata: Optional[Dict[str, str]] = None,
+                 content_encoding: Optional[str] = None):
+        """
+        Inicializar el escritor.
+
+        Args:
+            s3_client: Cliente de S3 de boto3
+            bucket_name: Nombre del bucket
+            object_key: Nombre del archivo en S3
+            part_size: Tamaño de cada parte (default: choose_part_size())
+            content_type: Content-Type del objeto
+            state_store: Almacén donde persistir el progreso (None = no reanudable)
+            total_size: Tamaño total del archivo (necesario para reanudar)
+            metadata: Metadatos de usuario del objeto (x-amz-meta-*)
+            content_encoding: Content-Encoding del objeto (p. ej. 'gzip')
+        """
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.object_key = object_key
+        self.part_size = part_size or choose_part_size()
+        self.content_type = content_type
+        self.metadata = metadata
+        self.content_encoding = content_encoding
+
+        self.upload_id: Optional[str] = None
+        self.parts: List[Dict] = []
+        self.bytes_written = 0
+        self.bytes_uploaded = 0
+        self.parts_skipped = 0
+
+        self._buffer = bytearray()
+
+        self.state_store = state_store if total_size else None
+        self.total_size = total_size
+        self._owner = uuid.uuid4().hex
+        self._fingerprint: Optional[str] = None
+        self._record: Optional[Dict] = None
+        self._resumable_parts: Dict[int, Dict] = {}
+
+    @property
+    def resumable(self) -> bool:
+        """Indica si el progreso de esta subida se está persistiendo."""
+        return self.state_store is not None and self.upload_id is not None
+
+    def _object_params(self) -> Dict:
+        """Parámetros comunes para crear el objeto."""
+        params = {'Bucket': self.bucket_name, 'Key': self.object_key}
+        if self.content_type:
+            params['ContentType'] = self.content_type
+        if self.content_encoding:
+            params['ContentEncoding'] = self.content_encoding
+        if self.metadata:
+            params['Metadata'] = self.metadata
+        return params
+
+    def write(self, data: bytes):
+        """
+        Añadir datos al objeto, subiendo cada parte en cuanto está completa.
+
+        Args:
+            data: Bloque de bytes leído del origen
+
+        Raises:
+            ClientError: Si S3 rechaza alguna parte
+        """
+        self._buffer += data
+        self.bytes_written += len(data)
+
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+
+    def _claim(self, first_part: bytes) -> Optional[Dict]:
+        """
+        Reservar el registro de esta subida para que nadie más lo use a la vez.
+
+        Returns:
+            El registro guardado (si lo hay y está libre); si otra subida en
+            curso lo está usando, esta deja de ser reanudable
+        """
+        self._fingerprint = upload_fingerprint(
+            self.bucket_name, self.object_key, self.total_size, self.part_size,
+            hashlib.md5(first_part).hexdigest()
+        )
+        with _active_lock:
+            record = None if self._fingerprint in _active_uploads else self.state_store.get(self._fingerprint)
+            in_use = self._fingerprint in _active_uploads or (
+                record is not None and record.get('owner') != self._owner
+                and time.time() - record.get('heartbeat', 0) < UPLOAD_LEASE
+            )
+            if in_use:
+                self.state_store = None
+                self._fingerprint = None
+                return None
+            _active_uploads.add(self._fingerprint)
+        return record
+
+    def _release(self):
+        """Liberar el registro reservado por esta subida."""
+        if self._fingerprint:
+            with _active_lock:
+                _active_uploads.discard(self._fingerprint)
+
+    def _save_record(self):
+        """Guardar el progreso y renovar la reserva del registro."""
+        self._record['owner'] = self._owner
+        self._record['heartbeat'] = time.time()
+        self.state_store.save(self._fingerprint, self._record)
+
+    def _start(self, first_part: bytes):
+        """Reanudar una subida registrada o iniciar una nueva."""
+        record = self._claim(first_part) if self.state_store else None
+        if self.state_store:
+            server_parts = self._list_server_parts(record['upload_id']) if record else None
+
+            if server_parts is not None:
+                self.upload_id = record['upload_id']
+                self._record = record
+                # Solo se reutilizan las partes que S3 confirma con el mismo ETag
+                self._resumable_parts = {
+                    int(number): part for number, part in record['parts'].items()
+                    if server_parts.get(int(number)) == part['etag']
+                }
+                return
+            elif record:
+                self.state_store.delete(self._fingerprint)
+
+        response = self.s3_client.create_multipart_upload(**self._object_params())
+        self.upload_id = response['UploadId']
+
+        if self.state_store:
+            self._record = {
+                'bucket': self.bucket_name,
+                'key': self.object_key,
+                'upload_id': self.upload_id,
+                'part_size': self.part_size,
+                'created': datetime.now(timezone.utc).isoformat(),
+                'parts': {}
+            }
+            self._save_record()
+
+    def _list_server_parts(self, upload_id: str) -> Optional[Dict[int, str]]:
+        """
+        Partes que S3 tiene de una subida (número -> ETag).
+
+        Returns:
+            Diccionario de partes, o None si la subida ya no existe
+        """
+        parts = {}
+        try:
+            paginator = self.s3_client.get_paginator('list_parts')
+            for page in paginator.paginate(Bucket=self.bucket_name, Key=self.object_key, UploadId=upload_id):
+                for part in page.get('Parts', []):
+                    parts[part['PartNumber']] = part['ETag']
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchUpload', '404'):
+                return None
+            raise
+        return parts
+
+    def _upload_part(self, body: bytes):
+        """Subir una parte (inicia o reanuda la subida multipart si hace falta)."""
+        if self.upload_id is None:
+            self._start(body)
+
+        part_number = len(self.parts) + 1
+        md5 = hashlib.md5(body).hexdigest() if self.state_store else None
+        previous = self._resumable_parts.get(part_number)
+
+        if previous and previous['md5'] == md5:
+            # Esta parte ya está en S3 con el mismo contenido
+            etag = previous['etag']
+            self.parts_skipped += 1
+        else:
+            response = self.s3_client.upload_part(
+                Bucket=self.bucket_name,
+                Key=self.object_key,
+                UploadId=self.upload_id,
+                PartNumber=part_number,
+                Body=body
+            )
+            etag = response['ETag']
+            if self.state_store:
+                self._record['parts'][str(part_number)] = {'etag': etag, 'md5': md5}
+                self._save_record()
+
+        self.parts.append({'PartNumber': part_number, 'ETag': etag})
+        self.bytes_uploaded += len(body)
+
+    def complete(self) -> int:
+        """
+        Terminar la subida con lo que quede en el búfer.
+
+        Returns:
+            Total de bytes escritos
+
+        Raises:
+            ClientError: Si S3 rechaza la última parte o la finalización
+        """
+        if self.upload_id is None:
+            # Todo cupo en una parte: un PutObject es más barato que un multipart
+            self.s3_client.put_object(Body=bytes(self._buffer), **self._object_params())
+            self.bytes_uploaded = len(self._buffer)
+        else:
+            if self._buffer:
+                self._upload_part(bytes(self._buffer))
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.object_key,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': self.parts}
+            )
+            if self.state_store:
+                self.state_store.delete(self._fingerprint)
+            self._release()
+
+        self._buffer = bytearray()
+        return self.bytes_written
+
+    def abort(self):
+        """Cancelar la subida y liberar las partes ya almacenadas en S3."""
+        self._buffer = bytearray()
+        try:
+            if self.upload_id is None:
+                # Falló el inicio: no hay partes que cancelar, pero sí una reserva
+                return
+            try:
+                self.s3_client.abort_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=self.object_key,
+                    UploadId=self.upload_id
+                )
+            except Exception as e:
+                print(f"Error cancelando subida multipart: {e}")
+            if self.state_store:
+                self.state_store.delete(self._fingerprint)
+            self.upload_id = None
+        finally:
+            self._release()
+
+    def suspend(self):
+        """
+        Dejar la subida pendiente para reanudarla en un reintento.
+
+        Las partes ya enviadas se conservan en S3 y en el almacén de estado;
+        si nadie la reanuda, el barrido de subidas abandonadas la cancela.
+        La reserva se libera para que un reintento pueda reanudarla ya.
+        """
+        self._buffer = bytearray()
+        if self.state_store and self._record is not None:
+            self._record['heartbeat'] = 0
+            self.state_store.save(self._fingerprint, self._record)
+        self._release()
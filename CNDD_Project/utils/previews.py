@@ -0,0 +1,210 @@
+"""
+Vistas previas de texto, CSV y JSON a partir de los primeros bytes de un objeto
+"""
+
+import codecs
+import csv
+import io
+import json
+from typing import Dict, List, Optional
+
+# Límites de lo que se muestra en la interfaz
+PREVIEW_MAX_ROWS = 50
+PREVIEW_MAX_COLUMNS = 20
+PREVIEW_MAX_CELL = 200
+PREVIEW_MAX_CHARS = 8000
+
+CSV_EXTENSIONS = ('.csv', '.tsv')
+JSON_EXTENSIONS = ('.json',)
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+TEXT_EXTENSIONS = (
+    '.txt', '.log', '.md', '.xml', '.yaml', '.yml', '.ini', '.cfg', '.conf',
+    '.sql', '.html', '.htm', '.js', '.css', '.py', '.sh', '.ps1', '.env'
+)
+
+
+def detect_format(object_key: str, content_type: Optional[str] = None) -> Optional[str]:
+    """
+    Deducir el formato de la vista previa por la extensión o el Content-Type.
+
+    Returns:
+        'csv', 'json', 'ndjson', 'text', o None si no se puede previsualizar
+    """
+    name = object_key.lower()
+    content_type = (content_type or '').lower()
+
+    if name.endswith(CSV_EXTENSIONS) or 'csv' in content_type:
+        return 'csv'
+    if name.endswith(NDJSON_EXTENSIONS) or 'ndjson' in content_type:
+        return 'ndjson'
+    if name.endswith(JSON_EXTENSIONS) or 'json' in content_type:
+        return 'json'
+    if name.endswith(TEXT_EXTENSIONS) or content_type.startswith('text/'):
+        return 'text'
+    return None
+
+
+def _decode(data: bytes, truncated: bool) -> str:
+    """Decodificar UTF-8 descartando un carácter multibyte cortado al final."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    return decoder.decode(data, final=not truncated)
+
+
+def _complete_lines(text: str, truncated: bool) -> str:
+    """Quitar la última línea si el rango la cortó a la mitad."""
+    if not truncated:
+        return text
+    end = text.rfind('\n')
+    return text[:end + 1] if end >= 0 else ''
+
+
+def _cell(value) -> str:
+    """Convertir un valor en texto acotado para una celda."""
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    text = '' if value is None else str(value)
+    return text if len(text) <= PREVIEW_MAX_CELL else text[:PREVIEW_MAX_CELL] + '…'
+
+
+def _table(columns: List[str], rows: List[List[str]]) -> Dict:
+    """Vista previa en forma de tabla."""
+    return {
+        'kind': 'table',
+        'columns': [_cell(c) for c in columns[:PREVIEW_MAX_COLUMNS]],
+        'rows': [
+            [_cell(v) for v in row[:PREVIEW_MAX_COLUMNS]]
+            for row in rows[:PREVIEW_MAX_ROWS]
+        ],
+        'text': '',
+    }
+
+
+def _text(text: str) -> Dict:
+    """Vista previa como fragmento de texto."""
+    if len(text) > PREVIEW_MAX_CHARS:
+        text = text[:PREVIEW_MAX_CHARS] + '\n…'
+    return {'kind': 'text', 'columns': [], 'rows': [], 'text': text}
+
+
+def _records_table(records: List) -> Optional[Dict]:
+    """Tabla a partir de una lista de objetos JSON (columnas en orden de aparición)."""
+    if not records or not all(isinstance(r, dict) for r in records):
+        return None
+    columns: List[str] = []
+    for record in records:
+        for key in record:
+            if key not in columns:
+                columns.append(key)
+    return _table(columns, [[record.get(c) for c in columns] for record in records])
+
+
+def _csv_preview(text: str, truncated: bool) -> Dict:
+    """Leer las primeras filas completas de un CSV."""
+    text = _complete_lines(text, truncated)
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;\t|')
+    except csv.Error:
+        dialect = csv.excel
+
+    rows = []
+    for row in csv.reader(io.StringIO(text), dialect):
+        rows.append(row)
+        if len(rows) > PREVIEW_MAX_ROWS:
+            break
+    if not rows:
+        return _text(text)
+    return _table(rows[0], rows[1:])
+
+
+def _ndjson_preview(text: str, truncated: bool) -> Dict:
+    """Leer los primeros registros de un JSON por líneas."""
+    records = []
+    for line in _complete_lines(text, truncated).splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break
+        if len(records) >= PREVIEW_MAX_ROWS:
+            break
+    return _records_table(records) or _text('\n'.join(
+        json.dumps(r, ensure_ascii=False, indent=2) for r in records
+    ) or text)
+
+
+def _json_preview(text: str, truncated: bool) -> Dict:
+    """
+    Interpretar un JSON que puede estar cortado.
+
+    Si el documento llegó completo se muestra formateado. Si es un arreglo
+    cortado se decodifican uno a uno los elementos que llegaron enteros.
+    """
+    if not truncated:
+        try:
+            document = json.loads(text)
+        except ValueError:
+            return _text(text)
+        if isinstance(document, list):
+            table = _records_table(document[:PREVIEW_MAX_ROWS])
+            if table:
+                return table
+        return _text(json.dumps(document, ensure_ascii=False, indent=2))
+
+    stripped = text.lstrip()
+    if not stripped.startswith('['):
+        # Un objeto cortado no se puede decodificar: se muestra el texto tal cual
+        return _text(text)
+
+    decoder = json.JSONDecoder()
+    records = []
+    position = 1
+    while len(records) < PREVIEW_MAX_ROWS:
+        while position < len(stripped) and stripped[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(stripped) or stripped[position] == ']':
+            break
+        try:
+            record, position = decoder.raw_decode(stripped, position)
+        except ValueError:
+            break
+        records.append(record)
+
+    return _records_table(records) or _text(
+        json.dumps(records, ensure_ascii=False, indent=2) if records else text
+    )
+
+
+def build_preview(data: bytes, object_key: str, content_type: Optional[str] = None,
+                  truncated: bool = False) -> Dict:
+    """
+    Construir la vista previa de los primeros bytes de un objeto.
+
+    Args:
+        data: Bytes leídos desde el inicio del objeto
+        object_key: Nombre del archivo en S3 (para deducir el formato)
+        content_type: Content-Type del objeto
+        truncated: Si el objeto es más grande que `data`
+
+    Returns:
+        Diccionario {'kind': 'table' | 'text' | 'unsupported', 'format',
+        'columns', 'rows', 'text'}
+    """
+    preview_format = detect_format(object_key, content_type)
+
+    if preview_format is None or b'\x00' in data[:1024]:
+        return {'kind': 'unsupported', 'format': preview_format or 'binary',
+                'columns': [], 'rows': [], 'text': ''}
+
+    text = _decode(data, truncated)
+    if preview_format == 'csv':
+        preview = _csv_preview(text, truncated)
+    elif preview_format == 'ndjson':
+        preview = _ndjson_preview(text, truncated)
+    elif preview_format == 'json':
+        preview = _json_preview(text, truncated)
+    else:
+        preview = _text(_complete_lines(text, truncated) or text)
+
+    preview['format'] = preview_format
+    return preview
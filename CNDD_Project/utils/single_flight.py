@@ -0,0 +1,90 @@
+"""
+Agrupación de peticiones idénticas concurrentes (single-flight)
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """Una llamada en curso y su resultado compartido."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Ejecutar una sola vez cada operación idéntica que esté en curso.
+
+    Si varios hilos piden la misma clave a la vez, solo el primero llama a
+    AWS; el resto espera y recibe el mismo resultado (o la misma excepción).
+    """
+
+    def __init__(self):
+        """Inicializar el registro de llamadas en curso."""
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Ejecutar `fn` o unirse a la ejecución en curso con la misma clave.
+
+        Args:
+            key: Identificador de la operación (debe incluir todos sus parámetros)
+            fn: Función sin argumentos que hace la llamada real
+
+        Returns:
+            El resultado de `fn`
+
+        Raises:
+            La misma excepción que haya lanzado `fn`
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Contadores de uso.
+
+        Returns:
+            Diccionario con llamadas ejecutadas, compartidas y en curso
+        """
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'shared': self.shared,
+                'in_flight': len(self._calls),
+            }
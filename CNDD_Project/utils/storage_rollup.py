@@ -0,0 +1,332 @@
+"""
+Uso de almacenamiento por carpeta (cantidad, bytes y clases de almacenamiento)
+"""
+
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Optional, Set, Tuple
+from dotenv import load_dotenv
+from .aws_clients import get_client
+from .derivatives import DERIVATIVES_PREFIX
+from .upload_state import RedisUploadStateStore, UploadStateStore
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Directorio de los resúmenes guardados si no hay Redis configurado
+DEFAULT_ROLLUP_DIR = os.path.join(tempfile.gettempdir(), 'cndd-storage-rollup')
+
+# Prefijo de las claves en Redis
+REDIS_ROLLUP_PREFIX = 'cndd:storage-rollup:'
+
+# Pasado este tiempo el resumen se recalcula completo en segundo plano
+# (corrige lo que hayan cambiado otras herramientas fuera de la aplicación)
+ROLLUP_MAX_AGE = float(os.getenv('S3_ROLLUP_MAX_AGE', str(24 * 3600)))
+
+# Segundos mínimos entre dos escrituras del resumen de un bucket
+ROLLUP_SAVE_INTERVAL = float(os.getenv('S3_ROLLUP_SAVE_INTERVAL', '5'))
+
+
+def _empty() -> Dict:
+    """Estadística vacía: {'count', 'bytes', 'classes': {clase: [count, bytes]}}."""
+    return {'count': 0, 'bytes': 0, 'classes': {}}
+
+
+def _add(target: Dict, other: Dict, sign: int = 1):
+    """Sumar (o restar con sign=-1) una estadística a otra."""
+    target['count'] += sign * other['count']
+    target['bytes'] += sign * other['bytes']
+    for storage_class, (count, size) in other['classes'].items():
+        current = target['classes'].setdefault(storage_class, [0, 0])
+        current[0] += sign * count
+        current[1] += sign * size
+        if current == [0, 0]:
+            del target['classes'][storage_class]
+
+
+def _ancestors(folder: str) -> Iterator[str]:
+    """La raíz y cada carpeta hasta `folder` inclusive ('a/b/' -> '', 'a/', 'a/b/')."""
+    yield ''
+    position = folder.find('/')
+    while position >= 0:
+        yield folder[:position + 1]
+        position = folder.find('/', position + 1)
+
+
+def parent_folder(key: str) -> str:
+    """Carpeta que contiene una clave o carpeta ('a/b/c.txt' -> 'a/b/', 'a/b/' -> 'a/')."""
+    trimmed = key[:-1] if key.endswith('/') else key
+    return trimmed[:trimmed.rfind('/') + 1]
+
+
+class StorageRollup:
+    """
+    Resumen de uso por carpeta, a todas las profundidades, de cada bucket.
+
+    Por cada carpeta se guarda lo que contiene directamente y el total con
+    sus subcarpetas. Se calcula una vez recorriendo el listado y después se
+    actualiza por carpeta: tras una subida o un borrado solo se vuelve a
+    listar el nivel de la carpeta afectada (una página casi siempre), y el
+    cambio se propaga a las carpetas superiores. Los trabajos corren en un
+    único hilo en segundo plano y los repetidos se agrupan.
+    """
+
+    def __init__(self):
+        self.s3_client = get_client('s3', region_name=os.getenv('AWS_REGION'))
+
+        # bucket -> carpeta -> {'direct': estadística, 'total': estadística}
+        self._folders: Dict[str, Dict[str, Dict]] = {}
+        # bucket -> carpeta -> subcarpetas inmediatas
+        self._children: Dict[str, Dict[str, Set[str]]] = {}
+        self._built_at: Dict[str, float] = {}
+        self._saved_at: Dict[str, float] = {}
+        self._building: Set[str] = set()
+
+        self._pending: Set[Tuple[str, str, str]] = set()
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cndd-rollup')
+        self._store = None
+
+    # === Consultas ===
+
+    def usage(self, bucket_name: str, prefix: str = '') -> Optional[Dict]:
+        """
+        Uso de una carpeta y de sus subcarpetas inmediatas.
+
+        Si el bucket aún no tiene resumen se empieza a calcular y se devuelve None.
+
+        Returns:
+            {'count', 'bytes', 'classes': {clase: {'count', 'bytes'}},
+             'children': {prefijo: {'count', 'bytes'}}, 'built_at', 'building'}
+        """
+        with self._lock:
+            if bucket_name not in self._folders and not self._load(bucket_name):
+                self._schedule(bucket_name, 'build', '')
+                return None
+
+            if time.time() - self._built_at.get(bucket_name, 0) > ROLLUP_MAX_AGE:
+                self._schedule(bucket_name, 'build', '')
+
+            folders = self._folders[bucket_name]
+            entry = folders.get(prefix)
+            total = entry['total'] if entry else _empty()
+            children = {
+                child: {'count': folders[child]['total']['count'], 'bytes': folders[child]['total']['bytes']}
+                for child in self._children[bucket_name].get(prefix, ())
+            }
+            return {
+                'count': total['count'],
+                'bytes': total['bytes'],
+                'classes': {
+                    storage_class: {'count': count, 'bytes': size}
+                    for storage_class, (count, size) in sorted(total['classes'].items())
+                },
+                'children': children,
+                'built_at': self._built_at.get(bucket_name, 0),
+                'building': bucket_name in self._building,
+            }
+
+    # === Actualizaciones ===
+
+    def folder_changed(self, bucket_name: str, folder: str):
+        """Volver a contar el nivel de una carpeta tras subir o borrar archivos en ella."""
+        if self._tracked(bucket_name):
+            self._schedule(bucket_name, 'folder', folder)
+
+    def subtree_changed(self, bucket_name: str, prefix: str):
+        """Recalcular una carpeta completa (p. ej. tras copiar otra dentro)."""
+        if self._tracked(bucket_name):
+            self._schedule(bucket_name, 'subtree', prefix)
+
+    def subtree_removed(self, bucket_name: str, prefix: str):
+        """Quitar una carpeta eliminada con todo su contenido (sin listar)."""
+        with self._lock:
+            folders = self._folders.get(bucket_name)
+            if folders is None:
+                return
+            for folder in [f for f in folders if f.startswith(prefix)]:
+                if folder in folders:
+                    self._set_direct(bucket_name, folder, _empty())
+        # Si el borrado falló a medias, el listado (ya casi vacío) lo corrige
+        self.subtree_changed(bucket_name, prefix)
+
+    def _tracked(self, bucket_name: str) -> bool:
+        """Solo se siguen los buckets ya calculados o en cálculo (los trabajos van en orden)."""
+        return bucket_name in self._folders or bucket_name in self._building
+
+    def _schedule(self, bucket_name: str, kind: str, prefix: str):
+        """Encolar un trabajo si no hay ya uno igual pendiente."""
+        job = (bucket_name, kind, prefix)
+        with self._lock:
+            if job in self._pending:
+                return
+            self._pending.add(job)
+            if kind == 'build':
+                self._building.add(bucket_name)
+        self._executor.submit(self._run, job)
+
+    def _run(self, job: Tuple[str, str, str]):
+        """Ejecutar un trabajo en el hilo del resumen."""
+        bucket_name, kind, prefix = job
+        if kind != 'build':
+            # Un cambio que llegue mientras se cuenta necesita otro recuento
+            with self._lock:
+                self._pending.discard(job)
+        try:
+            if kind == 'folder':
+                self._recount_folder(bucket_name, prefix)
+            else:
+                self._rebuild(bucket_name, '' if kind == 'build' else prefix)
+                if kind == 'build':
+                    with self._lock:
+                        self._built_at[bucket_name] = time.time()
+            self._save(bucket_name, force=kind == 'build')
+        except Exception as e:
+            print(f"Error actualizando el uso de {bucket_name}/{prefix}: {e}")
+        finally:
+            if kind == 'build':
+                with self._lock:
+                    self._pending.discard(job)
+                    self._building.discard(bucket_name)
+
+    def _list(self, bucket_name: str, prefix: str, delimiter: str = '') -> Iterator[Dict]:
+        """Recorrer los objetos visibles bajo un prefijo."""
+        params = {'Bucket': bucket_name, 'Prefix': prefix}
+        if delimiter:
+            params['Delimiter'] = delimiter
+        for page in self.s3_client.get_paginator('list_objects_v2').paginate(**params):
+            for obj in page.get('Contents', []):
+                if not obj['Key'].startswith(DERIVATIVES_PREFIX):
+                    yield obj
+
+    @staticmethod
+    def _count(stats: Dict, obj: Dict):
+        """Sumar un objeto de list_objects_v2 a una estadística."""
+        storage_class = obj.get('StorageClass', 'STANDARD')
+        stats['count'] += 1
+        stats['bytes'] += obj['Size']
+        current = stats['classes'].setdefault(storage_class, [0, 0])
+        current[0] += 1
+        current[1] += obj['Size']
+
+    def _recount_folder(self, bucket_name: str, folder: str):
+        """Contar de nuevo los archivos que están directamente en una carpeta."""
+        direct = _empty()
+        for obj in self._list(bucket_name, folder, delimiter='/'):
+            self._count(direct, obj)
+        with self._lock:
+            self._set_direct(bucket_name, folder, direct)
+
+    def _rebuild(self, bucket_name: str, prefix: str):
+        """Recalcular todas las carpetas bajo un prefijo con un listado plano."""
+        # Un prefijo a medio nombre se amplía a su carpeta para no contarla a medias
+        prefix = prefix[:prefix.rfind('/') + 1]
+        fresh: Dict[str, Dict] = {}
+        for obj in self._list(bucket_name, prefix):
+            self._count(fresh.setdefault(parent_folder(obj['Key']), _empty()), obj)
+
+        with self._lock:
+            if bucket_name not in self._folders:
+                self._folders[bucket_name] = {}
+                self._children[bucket_name] = {}
+            folders = self._folders[bucket_name]
+            for folder in [f for f in folders if f.startswith(prefix) and f not in fresh]:
+                if folder in folders:
+                    self._set_direct(bucket_name, folder, _empty())
+            for folder, direct in fresh.items():
+                self._set_direct(bucket_name, folder, direct)
+
+    def _set_direct(self, bucket_name: str, folder: str, direct: Dict):
+        """Reemplazar lo contado en una carpeta y propagar la diferencia hacia arriba."""
+        folders = self._folders[bucket_name]
+        children = self._children[bucket_name]
+        previous = folders[folder]['direct'] if folder in folders else _empty()
+
+        delta = _empty()
+        _add(delta, direct)
+        _add(delta, previous, sign=-1)
+        if not delta['count'] and not delta['bytes'] and not delta['classes']:
+            return
+
+        for ancestor in _ancestors(folder):
+            if ancestor not in folders:
+                folders[ancestor] = {'direct': _empty(), 'total': _empty()}
+                if ancestor:
+                    children.setdefault(parent_folder(ancestor), set()).add(ancestor)
+            _add(folders[ancestor]['total'], delta)
+        folders[folder]['direct'] = direct
+
+        # Las carpetas que quedaron vacías desaparecen del resumen
+        for ancestor in reversed(list(_ancestors(folder))):
+            if ancestor and folders[ancestor]['total']['count'] <= 0:
+                del folders[ancestor]
+                children.pop(ancestor, None)
+                children.get(parent_folder(ancestor), set()).discard(ancestor)
+
+    # === Persistencia ===
+
+    def _get_store(self):
+        """Almacén de los resúmenes (Redis si REDIS_URL está definido)."""
+        if self._store is None:
+            redis_url = os.getenv('REDIS_URL')
+            if redis_url:
+                self._store = RedisUploadStateStore(redis_url, key_prefix=REDIS_ROLLUP_PREFIX)
+            else:
+                self._store = UploadStateStore(os.getenv('STORAGE_ROLLUP_DIR', DEFAULT_ROLLUP_DIR))
+        return self._store
+
+    def _save(self, bucket_name: str, force: bool = False):
+        """Guardar el resumen compacto de un bucket (solo lo directo de cada carpeta)."""
+        with self._lock:
+            if not force and time.time() - self._saved_at.get(bucket_name, 0) < ROLLUP_SAVE_INTERVAL:
+                return
+            self._saved_at[bucket_name] = time.time()
+            record = {
+                'built_at': self._built_at.get(bucket_name, 0),
+                'folders': {
+                    folder: [entry['direct']['count'], entry['direct']['bytes'], entry['direct']['classes']]
+                    for folder, entry in self._folders.get(bucket_name, {}).items()
+                    if entry['direct']['count']
+                },
+            }
+        self._get_store().save(bucket_name, record)
+
+    def _load(self, bucket_name: str) -> bool:
+        """Cargar el resumen guardado de un bucket y recalcular los totales."""
+        try:
+            record = self._get_store().get(bucket_name)
+        except Exception as e:
+            print(f"Error leyendo el uso guardado de {bucket_name}: {e}")
+            record = None
+        if not record:
+            return False
+
+        self._folders[bucket_name] = {}
+        self._children[bucket_name] = {}
+        for folder, (count, size, classes) in record['folders'].items():
+            self._set_direct(bucket_name, folder, {'count': count, 'bytes': size, 'classes': classes})
+        self._built_at[bucket_name] = record.get('built_at', 0)
+        return True
+
+    def flush(self):
+        """Esperar a que terminen los trabajos encolados y guardar todo."""
+        self._executor.submit(lambda: None).result()
+        for bucket_name in list(self._folders):
+            self._save(bucket_name, force=True)
+
+
+_rollup: Optional[StorageRollup] = None
+_rollup_lock = threading.Lock()
+
+
+def get_storage_rollup() -> StorageRollup:
+    """Obtener el resumen de uso del proceso (se crea la primera vez)."""
+    global _rollup
+
+    with _rollup_lock:
+        if _rollup is None:
+            _rollup = StorageRollup()
+        return _rollup
@@ -0,0 +1,93 @@
+"""
+Perfiles de transferencia de S3 según el tamaño del objeto
+"""
+
+import math
+import os
+from typing import Dict, Optional
+from boto3.s3.transfer import TransferConfig
+from dotenv import load_dotenv
+from .aws_clients import get_max_pool_connections
+
+# Cargar variables de entorno
+load_dotenv()
+
+MB = 1024 * 1024
+
+# S3 admite como máximo 10 000 partes por objeto
+MAX_PARTS = 10000
+
+# Parámetros de cada perfil:
+#   small: una sola petición, sin hilos (el costo de arrancar hilos domina)
+#   bulk:  partes medianas en paralelo para archivos de decenas o cientos de MB
+#   huge:  partes grandes y más hilos para archivos de varios GB
+PROFILES: Dict[str, Dict] = {
+    'small': {
+        'multipart_threshold': 16 * MB,
+        'multipart_chunksize': 8 * MB,
+        'max_concurrency': 1,
+        'use_threads': False,
+    },
+    'bulk': {
+        'multipart_threshold': 16 * MB,
+        'multipart_chunksize': 16 * MB,
+        'max_concurrency': 10,
+        'use_threads': True,
+    },
+    'huge': {
+        'multipart_threshold': 64 * MB,
+        'multipart_chunksize': 64 * MB,
+        'max_concurrency': 16,
+        'use_threads': True,
+    },
+}
+
+# Tamaño a partir del cual se pasa al siguiente perfil
+SMALL_MAX_SIZE = int(os.getenv('S3_TRANSFER_SMALL_MAX', str(16 * MB)))
+BULK_MAX_SIZE = int(os.getenv('S3_TRANSFER_BULK_MAX', str(1024 * MB)))
+
+
+def select_profile(size: Optional[int] = None) -> str:
+    """
+    Elegir el perfil de transferencia para un objeto.
+
+    S3_TRANSFER_PROFILE fuerza un perfil para todas las transferencias.
+
+    Args:
+        size: Tamaño del objeto en bytes (None = desconocido)
+
+    Returns:
+        Nombre del perfil ('small', 'bulk' o 'huge')
+    """
+    forced = os.getenv('S3_TRANSFER_PROFILE', '').strip().lower()
+    if forced in PROFILES:
+        return forced
+
+    if size is None:
+        return 'bulk'
+    if size < SMALL_MAX_SIZE:
+        return 'small'
+    if size < BULK_MAX_SIZE:
+        return 'bulk'
+    return 'huge'
+
+
+def get_transfer_config(size: Optional[int] = None, profile: Optional[str] = None) -> TransferConfig:
+    """
+    Construir el TransferConfig para un objeto.
+
+    Args:
+        size: Tamaño del objeto en bytes (ajusta la parte para no pasar de 10 000)
+        profile: Perfil a usar (default: select_profile(size))
+
+    Returns:
+        TransferConfig listo para upload_file/download_file
+    """
+    params = dict(PROFILES[profile or select_profile(size)])
+
+    if size:
+        params['multipart_chunksize'] = max(params['multipart_chunksize'], math.ceil(size / MAX_PARTS))
+
+    # Nunca más hilos que conexiones en el pool del cliente compartido
+    params['max_concurrency'] = min(params['max_concurrency'], get_max_pool_connections())
+    return TransferConfig(**params)
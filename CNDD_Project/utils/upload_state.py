@@ -0,0 +1,153 @@
+"""
+Persistencia del progreso de subidas multipart y copias de carpetas para poder reanudarlas
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Directorio donde se guardan los registros si no hay Redis configurado
+DEFAULT_STATE_DIR = os.path.join(tempfile.gettempdir(), 'cndd-upload-state')
+
+# Prefijo de las claves en Redis
+REDIS_KEY_PREFIX = 'cndd:upload-state:'
+
+
+def upload_fingerprint(bucket_name: str, object_key: str, size: int, part_size: int,
+                       first_part_md5: str) -> str:
+    """
+    Identificador estable de una subida: mismo destino, tamaño, tamaño de
+    parte y contenido de la primera parte.
+
+    El MD5 de la primera parte distingue dos archivos distintos con el mismo
+    nombre y tamaño; cada parte se verifica además por su MD5 antes de
+    reutilizarla.
+    """
+    raw = f"{bucket_name}|{object_key}|{size}|{part_size}|{first_part_md5}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def transfer_fingerprint(operation: str, source_bucket: str, source_prefix: str,
+                         dest_bucket: str, dest_prefix: str) -> str:
+    """Identificador estable de una copia o movimiento de carpeta."""
+    raw = f"{operation}|{source_bucket}|{source_prefix}|{dest_bucket}|{dest_prefix}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class UploadStateStore:
+    """Registros de subidas en curso guardados como archivos JSON locales."""
+
+    def __init__(self, directory: str = DEFAULT_STATE_DIR):
+        """
+        Inicializar el almacén.
+
+        Args:
+            directory: Carpeta donde se guardan los registros
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, fingerprint: str) -> str:
+        """Ruta del archivo JSON de un registro."""
+        return os.path.join(self.directory, f"{fingerprint}.json")
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        """Obtener el registro de una subida, o None si no existe."""
+        try:
+            with open(self._path(fingerprint), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def save(self, fingerprint: str, record: Dict):
+        """Guardar un registro de forma atómica (escribe y luego renombra)."""
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            os.replace(tmp_path, self._path(fingerprint))
+
+    def delete(self, fingerprint: str):
+        """Eliminar el registro de una subida terminada o cancelada."""
+        try:
+            os.remove(self._path(fingerprint))
+        except FileNotFoundError:
+            pass
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        """Recorrer todos los registros guardados."""
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                fingerprint = name[:-len('.json')]
+                record = self.get(fingerprint)
+                if record is not None:
+                    yield fingerprint, record
+
+
+class RedisUploadStateStore:
+    """Registros de subidas en Redis, compartidos entre instancias del backend."""
+
+    def __init__(self, redis_url: str, key_prefix: str = REDIS_KEY_PREFIX):
+        """
+        Inicializar el almacén.
+
+        Args:
+            redis_url: URL de conexión (la misma que usa Reflex en REDIS_URL)
+            key_prefix: Prefijo de las claves de este almacén
+        """
+        import redis
+
+        self.client = redis.Redis.from_url(redis_url)
+        self.key_prefix = key_prefix
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        """Obtener el registro de una subida, o None si no existe."""
+        raw = self.client.get(self.key_prefix + fingerprint)
+        return json.loads(raw) if raw else None
+
+    def save(self, fingerprint: str, record: Dict):
+        """Guardar un registro."""
+        self.client.set(self.key_prefix + fingerprint, json.dumps(record))
+
+    def delete(self, fingerprint: str):
+        """Eliminar el registro de una subida terminada o cancelada."""
+        self.client.delete(self.key_prefix + fingerprint)
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        """Recorrer todos los registros guardados."""
+        for key in self.client.scan_iter(match=self.key_prefix + '*'):
+            key = key.decode('utf-8') if isinstance(key, bytes) else key
+            fingerprint = key[len(self.key_prefix):]
+            record = self.get(fingerprint)
+            if record is not None:
+                yield fingerprint, record
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_upload_state_store():
+    """
+    Obtener el almacén de estado de subidas del proceso.
+
+    Usa Redis si REDIS_URL está definido; si no, archivos en UPLOAD_STATE_DIR.
+    """
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            redis_url = os.getenv('REDIS_URL')
+            if redis_url:
+                _store = RedisUploadStateStore(redis_url)
+            else:
+                _store = UploadStateStore(os.getenv('UPLOAD_STATE_DIR', DEFAULT_STATE_DIR))
+        return _store
@@ -0,0 +1,274 @@
+"""
+Descarga de varios archivos como un ZIP que se arma mientras se envía
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+from dotenv import load_dotenv
+from .aws_clients import get_max_pool_connections
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Valor de ejemplo que trae env.example y largo mínimo de un secreto propio
+ZIP_SECRET_PLACEHOLDER = 'cambiar-por-un-secreto-largo'
+ZIP_SECRET_MIN_LENGTH = 32
+
+
+def _load_secret() -> Optional[bytes]:
+    """
+    Secreto para firmar los enlaces de descarga.
+
+    Con varios procesos del backend debe definirse; si no, cada proceso usa
+    uno propio al azar. Un secreto conocido (el de ejemplo) o corto permitiría
+    firmar enlaces a cualquier bucket: en ese caso la descarga en ZIP queda
+    desactivada.
+    """
+    value = os.getenv('ZIP_TOKEN_SECRET', '')
+    if not value:
+        return secrets.token_bytes(32)
+    if value == ZIP_SECRET_PLACEHOLDER or len(value) < ZIP_SECRET_MIN_LENGTH:
+        print(f"⚠️  ZIP_TOKEN_SECRET es el de ejemplo o tiene menos de {ZIP_SECRET_MIN_LENGTH} "
+              f"caracteres: la descarga en ZIP queda desactivada")
+        return None
+    return value.encode('utf-8')
+
+
+ZIP_TOKEN_SECRET = _load_secret()
+
+# Validez de un enlace de descarga en segundos
+ZIP_TOKEN_TTL = int(os.getenv('ZIP_TOKEN_TTL', '300'))
+
+# Objetos descargados por adelantado en paralelo
+ZIP_PREFETCH = int(os.getenv('S3_ZIP_PREFETCH', '8'))
+
+# Objetos hasta este tamaño se leen completos al adelantarlos; los más
+# grandes se envían por bloques cuando les toca (memoria <= PREFETCH × este valor)
+ZIP_PREFETCH_MAX_BYTES = int(os.getenv('S3_ZIP_PREFETCH_MAX_BYTES', str(8 * 1024 * 1024)))
+
+# Tamaño de los bloques enviados al cliente
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+# Nombre de la entrada con los archivos que no se pudieron incluir
+ERRORS_ENTRY = '_errores.txt'
+
+
+def create_zip_token(bucket_name: str, prefix: str, names: Optional[List[str]],
+                     archive_name: str, ttl: int = ZIP_TOKEN_TTL) -> Optional[str]:
+    """
+    Firmar la autorización para descargar un ZIP.
+
+    Args:
+        bucket_name: Nombre del bucket
+        prefix: Carpeta de origen
+        names: Nombres de los archivos elegidos dentro de la carpeta
+            (None = la carpeta completa, con subcarpetas)
+        archive_name: Nombre del ZIP sin extensión
+        ttl: Segundos de validez
+
+    Returns:
+        Token firmado con HMAC-SHA256 que vence a los `ttl` segundos, o None
+        si la descarga en ZIP está desactivada (secreto inseguro)
+    """
+    if ZIP_TOKEN_SECRET is None:
+        return None
+    payload = json.dumps({
+        'b': bucket_name,
+        'p': prefix,
+        'k': names,
+        'n': archive_name,
+        'e': int(time.time()) + ttl,
+    }, separators=(',', ':')).encode('utf-8')
+    body = base64.urlsafe_b64encode(zlib.compress(payload)).decode('ascii')
+    signature = hmac.new(ZIP_TOKEN_SECRET, body.encode('ascii'), hashlib.sha256).hexdigest()
+    return f"{body}.{signature}"
+
+
+def verify_zip_token(token: str) -> Optional[Dict]:
+    """
+    Comprobar la firma y la vigencia de un token de descarga.
+
+    Returns:
+        Diccionario {'bucket', 'prefix', 'names', 'archive_name'}, o None si
+        el token no es válido o ya venció
+    """
+    if ZIP_TOKEN_SECRET is None:
+        return None
+    body, _, signature = token.partition('.')
+    expected = hmac.new(ZIP_TOKEN_SECRET, body.encode('ascii'), hashlib.sha256).hexdigest()
+    if not signature or not hmac.compare_digest(signature, expected):
+        return None
+    try:
+        payload = json.loads(zlib.decompress(base64.urlsafe_b64decode(body)))
+    except (ValueError, zlib.error):
+        return None
+    if payload['e'] < time.time():
+        return None
+    return {
+        'bucket': payload['b'],
+        'prefix': payload['p'],
+        'names': payload['k'],
+        'archive_name': payload['n'],
+    }
+
+
+class _ChunkSink:
+    """Destino de escritura de zipfile que acumula los bytes para enviarlos."""
+
+    def __init__(self):
+        self._chunks = []
+        self._size = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self, min_size: int = 0) -> Iterator[bytes]:
+        """Entregar lo acumulado si supera `min_size` bytes."""
+        if self._chunks and self._size >= min_size:
+            data = b''.join(self._chunks)
+            self._chunks = []
+            self._size = 0
+            yield data
+
+
+def _body_chunks(response: Dict) -> Iterator[bytes]:
+    """Bloques del contenido de un GetObject (descomprimidos si se guardó con gzip)."""
+    decompressor = zlib.decompressobj(31) if response.get('ContentEncoding') == 'gzip' else None
+    body = response['Body']
+    try:
+        if 'Data' in response:
+            chunks = iter([response['Data']])
+        else:
+            chunks = body.iter_chunks(ZIP_CHUNK_SIZE)
+        for chunk in chunks:
+            yield decompressor.decompress(chunk) if decompressor else chunk
+        if decompressor:
+            yield decompressor.flush()
+    finally:
+        body.close()
+
+
+def stream_zip(s3_client, bucket_name: str, files: Iterable[Dict], workers: int = ZIP_PREFETCH) -> Iterator[bytes]:
+    """
+    Generar un ZIP (zip64, sin compresión) con los archivos indicados.
+
+    Los objetos se piden a S3 en orden con una ventana de `workers` peticiones
+    adelantadas; los pequeños llegan completos a memoria y los grandes se
+    copian por bloques, así que ni la memoria ni el disco dependen del tamaño
+    del ZIP. Un archivo que falla se omite y se anota en _errores.txt.
+
+    Args:
+        s3_client: Cliente de S3 de boto3
+        bucket_name: Nombre del bucket
+        files: Entradas {'key', 'arcname', 'size', 'last_modified' (datetime)}
+        workers: Objetos que se piden por adelantado
+
+    Yields:
+        Bloques del archivo ZIP
+    """
+    workers = max(1, min(workers, get_max_pool_connections()))
+    errors = []
+
+    def fetch(entry: Dict) -> Dict:
+        response = s3_client.get_object(Bucket=bucket_name, Key=entry['key'])
+        if entry['size'] <= ZIP_PREFETCH_MAX_BYTES:
+            response['Data'] = response['Body'].read()
+        return response
+
+    sink = _ChunkSink()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cndd-zip') as pool:
+        pending = deque()
+        remaining = iter(files)
+
+        def fill():
+            while len(pending) < workers:
+                entry = next(remaining, None)
+                if entry is None:
+                    return
+                pending.append((entry, pool.submit(fetch, entry)))
+
+        try:
+            yield from _write_archive(sink, pending, fill, errors)
+        finally:
+            # Si el cliente cortó la descarga, se sueltan las conexiones adelantadas
+            for _, future in pending:
+                future.cancel()
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    future.result()['Body'].close()
+
+    yield from sink.drain()
+
+
+def _write_archive(sink: _ChunkSink, pending: deque, fill, errors: List[str]) -> Iterator[bytes]:
+    """Escribir en el ZIP las entradas a medida que llegan sus descargas."""
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        fill()
+        while pending:
+            entry, future = pending.popleft()
+            fill()
+            try:
+                response = future.result()
+            except Exception as e:
+                errors.append(f"{entry['arcname']}: {e}")
+                continue
+
+            modified = entry['last_modified']
+            info = zipfile.ZipInfo(
+                entry['arcname'],
+                date_time=modified.timetuple()[:6] if modified.year >= 1980 else (1980, 1, 1, 0, 0, 0)
+            )
+            # El tamaño final no se conoce de antemano (gzip): siempre zip64
+            with archive.open(info, 'w', force_zip64=True) as target:
+                try:
+                    for chunk in _body_chunks(response):
+                        target.write(chunk)
+                        yield from sink.drain(ZIP_CHUNK_SIZE)
+                except Exception as e:
+                    errors.append(f"{entry['arcname']}: se interrumpió la lectura ({e})")
+            yield from sink.drain(ZIP_CHUNK_SIZE)
+
+        if errors:
+            archive.writestr(ERRORS_ENTRY, '\n'.join(errors) + '\n')
+
+
+def zip_entries(pages: Iterator[Dict], prefix: str, names: Optional[List[str]],
+                base: str) -> Iterator[Dict]:
+    """
+    Convertir páginas de un listado en entradas del ZIP.
+
+    Args:
+        pages: Páginas de S3Manager.iter_pages con las filas de S3
+        prefix: Carpeta listada
+        names: Nombres elegidos dentro de la carpeta (None = todos)
+        base: Parte de la clave que no se incluye en la ruta dentro del ZIP
+
+    Yields:
+        Diccionarios {'key', 'arcname', 'size', 'last_modified'}
+    """
+    wanted = set(names) if names is not None else None
+    for page in pages:
+        for row in page['files']:
+            if wanted is not None and row['key'][len(prefix):] not in wanted:
+                continue
+            yield {
+                'key': row['key'],
+                'arcname': row['key'][len(base):],
+                'size': row['size'],
+                'last_modified': datetime.strptime(row['last_modified'], '%Y-%m-%d %H:%M:%S'),
+            }
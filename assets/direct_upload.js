@@ -0,0 +1,96 @@
+/*
+ * Subida directa del navegador a S3 con URLs prefirmadas.
+ *
+ * El backend (FilesState) autoriza cada archivo y devuelve un plan:
+ *   - method "post": política de POST prefirmada para archivos pequeños
+ *   - method "multipart": una URL prefirmada de UploadPart por parte
+ * Este script sube los bytes y devuelve a FilesState el resultado de cada
+ * archivo (incluidos los ETag de las partes) para que el backend complete.
+ */
+window.cnddDirectUpload = (function () {
+  // Archivos y partes que se suben a la vez
+  const FILE_CONCURRENCY = 3;
+  const PART_CONCURRENCY = 4;
+
+  function selectedFiles(inputId) {
+    const input = document.getElementById(inputId);
+    return input && input.files ? Array.from(input.files) : [];
+  }
+
+  // Ejecutar tareas asíncronas con un máximo de `limit` en paralelo
+  async function runLimited(items, limit, worker) {
+    const results = new Array(items.length);
+    let next = 0;
+    async function lane() {
+      while (next < items.length) {
+        const index = next++;
+        results[index] = await worker(items[index], index);
+      }
+    }
+    await Promise.all(Array.from({ length: Math.min(limit, items.length) }, lane));
+    return results;
+  }
+
+  async function uploadPost(file, plan) {
+    const form = new FormData();
+    Object.entries(plan.fields).forEach(([name, value]) => form.append(name, value));
+    form.append("file", file);
+
+    const response = await fetch(plan.url, { method: "POST", body: form });
+    if (!response.ok) {
+      throw new Error(`S3 respondió ${response.status}`);
+    }
+    return { key: plan.key, ok: true };
+  }
+
+  async function uploadMultipart(file, plan) {
+    const parts = await runLimited(plan.urls, PART_CONCURRENCY, async (url, index) => {
+      const start = index * plan.part_size;
+      const body = file.slice(start, Math.min(start + plan.part_size, file.size));
+      const response = await fetch(url, { method: "PUT", body: body });
+      if (!response.ok) {
+        throw new Error(`S3 respondió ${response.status} en la parte ${index + 1}`);
+      }
+      // Requiere que la configuración CORS del bucket exponga ETag
+      return { PartNumber: index + 1, ETag: response.headers.get("ETag") };
+    });
+    return { key: plan.key, upload_id: plan.upload_id, parts: parts, ok: true };
+  }
+
+  return {
+    // Nombre, tamaño y tipo de los archivos elegidos en el input
+    describe(inputId) {
+      return selectedFiles(inputId).map((file) => ({
+        name: file.name,
+        size: file.size,
+        type: file.type || "",
+      }));
+    },
+
+    // Subir cada archivo según el plan firmado por el backend
+    async run(inputId, plans) {
+      const files = selectedFiles(inputId);
+      const byName = new Map(files.map((file) => [file.name, file]));
+
+      const results = await runLimited(plans, FILE_CONCURRENCY, async (plan) => {
+        const file = byName.get(plan.name);
+        try {
+          if (!file) {
+            throw new Error("El archivo ya no está seleccionado");
+          }
+          return plan.method === "post"
+            ? await uploadPost(file, plan)
+            : await uploadMultipart(file, plan);
+        } catch (error) {
+          return { key: plan.key, upload_id: plan.upload_id || "", ok: false, error: String(error.message || error) };
+        }
+      });
+
+      const input = document.getElementById(inputId);
+      if (input) {
+        input.value = "";
+      }
+      return results;
+    },
+  };
+})();
@@ -0,0 +1,99 @@
+"""
+Benchmark de latencia por acción: cliente nuevo por handler vs registro compartido
+Simula varias sesiones concurrentes ejecutando la misma acción de S3
+
+Uso:
+    python scripts/benchmark_clientes_aws.py [--sesiones 20] [--acciones 10] [--accion listar]
+
+Para medir contra un S3 local (MinIO, moto server) definir AWS_ENDPOINT_URL_S3.
+La acción 'presign' no hace peticiones de red y sirve para aislar el costo
+de construir el cliente.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import boto3
+from dotenv import load_dotenv
+
+# Permitir importar el paquete de la aplicación desde scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from CNDD_Project.utils.aws_clients import get_client, get_max_pool_connections
+
+load_dotenv()
+
+REGION = os.getenv('AWS_REGION', 'us-east-2')
+BUCKET_PUBLICA = os.getenv('BUCKET_PUBLICA', 'cndd-publica')
+
+
+def cliente_por_accion():
+    """Comportamiento anterior: cada handler carga el .env y crea su cliente."""
+    load_dotenv()
+    return boto3.client('s3', region_name=REGION)
+
+
+def cliente_compartido():
+    """Comportamiento actual: el cliente sale del registro del proceso."""
+    return get_client('s3', region_name=REGION)
+
+
+def ejecutar_accion(obtener_cliente, accion):
+    """Ejecutar una acción completa y devolver su duración en milisegundos."""
+    inicio = time.perf_counter()
+    s3 = obtener_cliente()
+
+    if accion == 'listar':
+        s3.list_objects_v2(Bucket=BUCKET_PUBLICA, MaxKeys=1)
+    else:
+        s3.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': BUCKET_PUBLICA, 'Key': 'benchmark.txt'},
+            ExpiresIn=300
+        )
+
+    return (time.perf_counter() - inicio) * 1000
+
+
+def medir(nombre, obtener_cliente, sesiones, acciones, accion):
+    """Lanzar `sesiones` hilos con `acciones` acciones cada uno."""
+    def sesion(_):
+        return [ejecutar_accion(obtener_cliente, accion) for _ in range(acciones)]
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sesiones) as executor:
+        tiempos = [t for resultado in executor.map(sesion, range(sesiones)) for t in resultado]
+    total = time.perf_counter() - inicio
+
+    tiempos.sort()
+    p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+    print(f"{nombre:<22} media={statistics.mean(tiempos):8.2f} ms  "
+          f"p50={statistics.median(tiempos):8.2f} ms  p95={p95:8.2f} ms  "
+          f"total={total:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sesiones', type=int, default=20, help='Sesiones concurrentes (hilos)')
+    parser.add_argument('--acciones', type=int, default=10, help='Acciones por sesión')
+    parser.add_argument('--accion', choices=['listar', 'presign'], default='listar')
+    args = parser.parse_args()
+
+    print(f"\n{'='*70}")
+    print(f"{'BENCHMARK DE CLIENTES AWS'.center(70)}")
+    print(f"{'='*70}\n")
+    print(f"Acción: {args.accion} | Sesiones: {args.sesiones} | Acciones/sesión: {args.acciones} | "
+          f"Pool: {get_max_pool_connections()}\n")
+
+    medir('Antes (cliente nuevo)', cliente_por_accion, args.sesiones, args.acciones, args.accion)
+    medir('Después (registro)', cliente_compartido, args.sesiones, args.acciones, args.accion)
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
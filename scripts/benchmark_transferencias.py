@@ -0,0 +1,126 @@
+"""
+Benchmark de perfiles de transferencia (small, bulk, huge) por tamaño de objeto
+Sube y descarga archivos de prueba con cada perfil y con la selección automática,
+y muestra el throughput de cada combinación
+
+Uso:
+    python scripts/benchmark_transferencias.py [--tamanos 1,100,5120] [--perfiles small,bulk,huge,auto]
+
+Los tamaños están en MB. Conviene medir contra un S3 local (MinIO, moto server)
+definiendo AWS_ENDPOINT_URL_S3; con --simulado se levanta un servidor moto en
+otro proceso (guarda los objetos en memoria: para 5 GB mejor usar MinIO).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Permitir importar el paquete de la aplicación desde scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from prueba_concurrencia_s3 import iniciar_moto
+
+load_dotenv()
+
+BUCKET_PUBLICA = os.getenv('BUCKET_PUBLICA', 'cndd-publica')
+PREFIJO_PRUEBA = 'benchmark-transferencias/'
+MB = 1024 * 1024
+
+
+def crear_archivo(directorio, tamano_mb):
+    """Crear un archivo de prueba (disperso por encima de 64 MB para no llenar el disco)."""
+    ruta = os.path.join(directorio, f'origen-{tamano_mb}mb.bin')
+    with open(ruta, 'wb') as f:
+        if tamano_mb <= 64:
+            f.write(os.urandom(tamano_mb * MB))
+        else:
+            f.truncate(tamano_mb * MB)
+    return ruta
+
+
+def medir(s3, bucket, ruta, tamano_mb, perfil, directorio):
+    """Subir y descargar un archivo con un perfil; devuelve (MB/s subida, MB/s bajada)."""
+    clave = f'{PREFIJO_PRUEBA}{tamano_mb}mb-{perfil}.bin'
+    forzado = None if perfil == 'auto' else perfil
+
+    inicio = time.perf_counter()
+    exito, error = s3.upload_file(ruta, bucket, clave, profile=forzado)
+    subida = time.perf_counter() - inicio
+    if not exito:
+        raise RuntimeError(error)
+
+    destino = os.path.join(directorio, 'descarga.bin')
+    inicio = time.perf_counter()
+    exito, error = s3.download_file(bucket, clave, destino, size=tamano_mb * MB, profile=forzado)
+    bajada = time.perf_counter() - inicio
+    if not exito:
+        raise RuntimeError(error)
+
+    os.remove(destino)
+    s3.delete_file(bucket, clave)
+    return tamano_mb / subida, tamano_mb / bajada
+
+
+def ejecutar(args):
+    """Recorrer todas las combinaciones de tamaño y perfil."""
+    from CNDD_Project.utils.S3_manager import S3Manager
+    from CNDD_Project.utils.transfer_profiles import select_profile
+
+    tamanos = [int(t) for t in args.tamanos.split(',')]
+    perfiles = args.perfiles.split(',')
+    s3 = S3Manager()
+
+    print(f"\n{'='*70}")
+    print(f"{'BENCHMARK DE PERFILES DE TRANSFERENCIA'.center(70)}")
+    print(f"{'='*70}\n")
+    print(f"Bucket: {args.bucket} | Endpoint: {os.getenv('AWS_ENDPOINT_URL_S3', 'AWS')}\n")
+    print(f"{'Tamaño':>10}  {'Perfil':<14} {'Subida MB/s':>12} {'Bajada MB/s':>12}")
+    print(f"{'-'*52}")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for tamano_mb in tamanos:
+            ruta = crear_archivo(directorio, tamano_mb)
+            for perfil in perfiles:
+                nombre = f"auto ({select_profile(tamano_mb * MB)})" if perfil == 'auto' else perfil
+                try:
+                    subida, bajada = medir(s3, args.bucket, ruta, tamano_mb, perfil, directorio)
+                    print(f"{tamano_mb:>7} MB  {nombre:<14} {subida:>12.1f} {bajada:>12.1f}")
+                except Exception as e:
+                    print(f"{tamano_mb:>7} MB  {nombre:<14} ❌ {e}")
+            os.remove(ruta)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bucket', default=BUCKET_PUBLICA, help='Bucket donde subir los archivos de prueba')
+    parser.add_argument('--tamanos', default='1,100,5120', help='Tamaños en MB separados por comas')
+    parser.add_argument('--perfiles', default='small,bulk,huge,auto', help='Perfiles a comparar')
+    parser.add_argument('--simulado', action='store_true', help='Usar un servidor moto local')
+    args = parser.parse_args()
+
+    if not args.simulado:
+        return ejecutar(args)
+
+    servidor, puerto = iniciar_moto()
+    try:
+        os.environ['AWS_ENDPOINT_URL_S3'] = f'http://127.0.0.1:{puerto}'
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'prueba')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'prueba')
+        os.environ.setdefault('AWS_REGION', 'us-east-1')
+
+        from CNDD_Project.utils.aws_clients import get_client
+        get_client('s3', region_name=os.environ['AWS_REGION']).create_bucket(Bucket=args.bucket)
+        return ejecutar(args)
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+if __name__ == '__main__':
+    exit(main())
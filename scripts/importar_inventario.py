@@ -0,0 +1,105 @@
+"""
+Importar un informe de S3 Inventory al catálogo local
+Lee el manifest.json y sus archivos CSV (o Parquet) por bloques, reemplaza
+los objetos del bucket inventariado en el catálogo y mide cuánto tarda un
+listado servido desde el catálogo
+
+Uso:
+    python scripts/importar_inventario.py s3://destino/inventario/cndd-publica/diario/2024-05-01T01-00Z/manifest.json
+    python scripts/importar_inventario.py ruta/local/manifest.json
+    python scripts/importar_inventario.py --generar 200000 [--bucket cndd-publica]
+
+Con --generar se escribe un inventario CSV de ejemplo en una carpeta
+temporal y se importa ese (no hace falta acceso a S3).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Permitir importar el paquete de la aplicación desde scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+load_dotenv()
+
+BUCKET_PUBLICA = os.getenv('BUCKET_PUBLICA', 'cndd-publica')
+
+
+def generar_inventario(directorio, bucket, objetos):
+    """Escribir un inventario CSV de ejemplo con `objetos` archivos."""
+    from CNDD_Project.utils.inventory import write_csv_inventory
+
+    registros = (
+        {'Key': f"proyectos/p{i % 50:02d}/lote {i % 1000:03d}/archivo-{i:07d}.csv",
+         'Size': 1000 + i % 5000, 'LastModifiedDate': '2024-05-01T00:00:00.000Z',
+         'ETag': f"{i:032x}", 'StorageClass': 'STANDARD'}
+        for i in range(objetos)
+    )
+    return write_csv_inventory(directorio, bucket, registros)
+
+
+def importar(ubicacion):
+    """Importar el inventario y probar un listado desde el catálogo."""
+    from CNDD_Project.utils.S3_manager import S3Manager
+    from CNDD_Project.utils.inventory import InventoryReport
+    from CNDD_Project.utils.metadata_catalog import get_metadata_catalog
+
+    s3 = S3Manager()
+
+    print(f"\n{'='*70}")
+    print(f"{'IMPORTACIÓN DE INVENTARIO'.center(70)}")
+    print(f"{'='*70}\n")
+    print(f"Manifest: {ubicacion}")
+    print(f"Catálogo: {get_metadata_catalog().path}\n")
+
+    try:
+        informe = InventoryReport(ubicacion, s3.s3_client)
+    except Exception as e:
+        print(f"❌ {e}")
+        return 1
+    bucket = informe.source_bucket
+    print(f"Bucket inventariado: {bucket} | Formato: {informe.file_format} | "
+          f"Archivos de datos: {len(informe.manifest.get('files', []))}")
+
+    inicio = time.perf_counter()
+    exito, cantidad, error = s3.import_inventory(ubicacion)
+    segundos = time.perf_counter() - inicio
+    if not exito:
+        print(f"❌ {error}")
+        return 1
+    print(f"✅ {cantidad} objetos importados en {segundos:.1f} s "
+          f"({cantidad / max(segundos, 1e-9):,.0f} objetos/s)\n")
+
+    catalogo = get_metadata_catalog()
+    for descripcion, prefijo, delimitador in [('Raíz por carpetas', '', '/'),
+                                              ('Listado plano', '', '')]:
+        inicio = time.perf_counter()
+        pagina = catalogo.list_page(bucket, prefijo, page_size=200, delimiter=delimitador)
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        print(f"{descripcion:<20} {len(pagina['folders']):>4} carpetas, {len(pagina['files']):>4} archivos "
+              f"en {milisegundos:.1f} ms")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('manifest', nargs='?', help='Ubicación del manifest.json (s3://... o ruta local)')
+    parser.add_argument('--generar', type=int, metavar='N', help='Generar un inventario de ejemplo con N objetos')
+    parser.add_argument('--bucket', default=BUCKET_PUBLICA, help='Bucket del inventario generado')
+    args = parser.parse_args()
+
+    if args.generar:
+        with tempfile.TemporaryDirectory() as directorio:
+            return importar(generar_inventario(directorio, args.bucket, args.generar))
+    if not args.manifest:
+        parser.error('indica la ubicación del manifest o usa --generar')
+    return importar(args.manifest)
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,188 @@
+"""
+Prueba de concurrencia: las demás sesiones siguen respondiendo durante una subida grande
+Mide el retraso del event loop y la latencia de listados de otras sesiones mientras
+se sube un archivo, primero llamando a boto3 directamente desde la corrutina (como
+hacían antes los handlers) y después con AsyncS3Manager
+
+Uso:
+    python scripts/prueba_concurrencia_s3.py [--tamano-mb 64] [--sesiones 20] [--umbral-ms 100]
+
+Para medir contra un S3 local (MinIO, moto server) definir AWS_ENDPOINT_URL_S3.
+Con --simulado se levanta un servidor moto en otro proceso (requiere
+`pip install "moto[server]"`); en el mismo proceso moto retiene el GIL al
+ensamblar los objetos y falsearía la medición.
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Permitir importar el paquete de la aplicación desde scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+load_dotenv()
+
+BUCKET_PUBLICA = os.getenv('BUCKET_PUBLICA', 'cndd-publica')
+CLAVE_PRUEBA = 'prueba-concurrencia/archivo-grande.bin'
+
+
+def percentil(valores, p):
+    """Percentil simple de una lista de valores."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[max(int(len(ordenados) * p) - 1, 0)]
+
+
+async def latido(intervalo, retrasos, fin):
+    """
+    Simular el trabajo del event loop para las demás sesiones.
+
+    Cada tick debería despertar tras `intervalo` segundos; lo que tarde de más
+    es el tiempo que el loop estuvo bloqueado.
+    """
+    while not fin.is_set():
+        esperado = time.perf_counter() + intervalo
+        await asyncio.sleep(intervalo)
+        retrasos.append(max(time.perf_counter() - esperado, 0) * 1000)
+
+
+async def sesion_listando(bucket, latencias, fin):
+    """Otra sesión que lista el bucket una y otra vez sin usar la caché."""
+    from CNDD_Project.utils.async_s3 import AsyncS3Manager
+
+    s3 = AsyncS3Manager()
+    while not fin.is_set():
+        inicio = time.perf_counter()
+        await s3.list_files_page(bucket, page_size=10, use_cache=False)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+
+async def escenario(nombre, subir, datos, bucket, sesiones, intervalo):
+    """Ejecutar una subida mientras corren el latido y las demás sesiones."""
+    retrasos = []
+    latencias = []
+    fin = asyncio.Event()
+
+    tareas = [asyncio.create_task(latido(intervalo, retrasos, fin))]
+    tareas += [asyncio.create_task(sesion_listando(bucket, latencias, fin)) for _ in range(sesiones)]
+
+    # Dejar que las sesiones arranquen antes de la subida
+    await asyncio.sleep(0.2)
+
+    inicio = time.perf_counter()
+    exito, error = await subir(io.BytesIO(datos), bucket, CLAVE_PRUEBA)
+    duracion = time.perf_counter() - inicio
+
+    fin.set()
+    await asyncio.gather(*tareas)
+
+    if not exito:
+        print(f"   ❌ {nombre}: la subida falló: {error}")
+        return None
+
+    maximo = max(retrasos) if retrasos else 0.0
+    print(f"{nombre:<22} subida={duracion:6.2f} s  "
+          f"retraso loop max={maximo:8.1f} ms p95={percentil(retrasos, 0.95):7.1f} ms  "
+          f"listados={len(latencias):5d} p95={percentil(latencias, 0.95):7.1f} ms "
+          f"(media {statistics.mean(latencias) if latencias else 0:6.1f} ms)")
+    return maximo
+
+
+async def ejecutar(args):
+    """Comparar la subida bloqueante con la subida en el pool de S3."""
+    from CNDD_Project.utils.S3_manager import S3Manager
+    from CNDD_Project.utils.async_s3 import AsyncS3Manager
+
+    datos = os.urandom(args.tamano_mb * 1024 * 1024)
+    intervalo = args.intervalo_ms / 1000
+
+    async def subir_bloqueante(fileobj, bucket, clave):
+        # Antes: boto3 se llamaba directamente dentro del handler async
+        return S3Manager().upload_fileobj(fileobj, bucket, clave)
+
+    async def subir_asincrono(fileobj, bucket, clave):
+        return await AsyncS3Manager().upload_fileobj(fileobj, bucket, clave)
+
+    print(f"\n{'='*70}")
+    print(f"{'PRUEBA DE CONCURRENCIA S3'.center(70)}")
+    print(f"{'='*70}\n")
+    print(f"Bucket: {args.bucket} | Archivo: {args.tamano_mb} MB | Sesiones: {args.sesiones}\n")
+
+    antes = await escenario('Antes (bloqueante)', subir_bloqueante, datos, args.bucket,
+                            args.sesiones, intervalo)
+    despues = await escenario('Después (asíncrono)', subir_asincrono, datos, args.bucket,
+                              args.sesiones, intervalo)
+
+    await AsyncS3Manager().delete_file(args.bucket, CLAVE_PRUEBA)
+
+    if antes is None or despues is None:
+        return 1
+
+    if despues <= args.umbral_ms:
+        print(f"\n   ✅ El event loop nunca estuvo bloqueado más de {args.umbral_ms} ms durante la subida")
+        return 0
+    print(f"\n   ❌ El event loop estuvo bloqueado {despues:.1f} ms (umbral {args.umbral_ms} ms)")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bucket', default=BUCKET_PUBLICA, help='Bucket donde subir el archivo de prueba')
+    parser.add_argument('--tamano-mb', type=int, default=64, help='Tamaño del archivo de prueba')
+    parser.add_argument('--sesiones', type=int, default=20, help='Otras sesiones listando a la vez')
+    parser.add_argument('--intervalo-ms', type=float, default=10, help='Intervalo del latido del event loop')
+    parser.add_argument('--umbral-ms', type=float, default=100, help='Retraso máximo aceptable del event loop')
+    parser.add_argument('--simulado', action='store_true', help='Usar moto en lugar de AWS')
+    args = parser.parse_args()
+
+    if not args.simulado:
+        return asyncio.run(ejecutar(args))
+
+    servidor, puerto = iniciar_moto()
+    try:
+        os.environ['AWS_ENDPOINT_URL_S3'] = f'http://127.0.0.1:{puerto}'
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'prueba')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'prueba')
+        os.environ.setdefault('AWS_REGION', 'us-east-1')
+
+        from CNDD_Project.utils.aws_clients import get_client
+        get_client('s3', region_name=os.environ['AWS_REGION']).create_bucket(Bucket=args.bucket)
+        return asyncio.run(ejecutar(args))
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+def iniciar_moto():
+    """Levantar un servidor moto local y esperar a que acepte conexiones."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        puerto = s.getsockname()[1]
+
+    servidor = subprocess.Popen(
+        [sys.executable, '-m', 'moto.server', '-p', str(puerto)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', puerto), timeout=0.1).close()
+            return servidor, puerto
+        except OSError:
+            time.sleep(0.1)
+    servidor.terminate()
+    raise RuntimeError("No se pudo iniciar el servidor moto")
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,221 @@
+"""
+Reporte de compresión transparente de subidas
+Sube archivos de texto con y sin compresión gzip y muestra la relación de
+compresión y el tiempo ahorrado en subida y descarga. Con --inventario recorre
+un prefijo del bucket y resume lo que ya está guardado comprimido
+
+Uso:
+    python scripts/reporte_compresion.py [--directorio muestras/] [--bucket cndd-publica]
+    python scripts/reporte_compresion.py --inventario [--prefijo datos/]
+
+Sin --directorio se generan muestras de CSV, JSON y log. Con --simulado se
+levanta un servidor moto en otro proceso.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Permitir importar el paquete de la aplicación desde scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from prueba_concurrencia_s3 import iniciar_moto
+
+load_dotenv()
+
+BUCKET_PUBLICA = os.getenv('BUCKET_PUBLICA', 'cndd-publica')
+PREFIJO_PRUEBA = 'reporte-compresion/'
+MB = 1024 * 1024
+
+
+def generar_muestras(directorio, tamano_mb):
+    """Crear archivos de texto de ejemplo con contenido realista."""
+    random.seed(42)
+    objetivo = tamano_mb * MB
+    municipios = ['Bogotá', 'Medellín', 'Cali', 'Barranquilla', 'Cartagena', 'Cúcuta', 'Pasto']
+
+    ruta_csv = os.path.join(directorio, 'registros.csv')
+    with open(ruta_csv, 'w', encoding='utf-8') as f:
+        f.write('id,fecha,municipio,valor,estado\n')
+        i = 0
+        while f.tell() < objetivo:
+            f.write(f"{i},2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d},"
+                    f"{random.choice(municipios)},{random.random() * 1000:.2f},activo\n")
+            i += 1
+
+    ruta_json = os.path.join(directorio, 'registros.json')
+    with open(ruta_json, 'w', encoding='utf-8') as f:
+        registros = []
+        while len(registros) * 60 < objetivo:
+            registros.append({'id': len(registros), 'municipio': random.choice(municipios),
+                              'valor': round(random.random() * 1000, 2)})
+        json.dump(registros, f, ensure_ascii=False)
+
+    ruta_log = os.path.join(directorio, 'servicio.log')
+    with open(ruta_log, 'w', encoding='utf-8') as f:
+        niveles = ['INFO', 'INFO', 'INFO', 'WARNING', 'ERROR']
+        while f.tell() < objetivo:
+            f.write(f"2024-05-{random.randint(1, 28):02d} 10:{random.randint(0, 59):02d}:00 "
+                    f"{random.choice(niveles)} cndd.files - solicitud {random.randint(1, 10**6)} atendida\n")
+
+    return [ruta_csv, ruta_json, ruta_log]
+
+
+def medir(s3, bucket, ruta, comprimir, directorio):
+    """Subir y descargar un archivo; devuelve (segundos subida, segundos bajada, bytes guardados)."""
+    nombre = os.path.basename(ruta)
+    clave = f"{PREFIJO_PRUEBA}{'gzip' if comprimir else 'plano'}/{nombre}"
+    tamano = os.path.getsize(ruta)
+
+    inicio = time.perf_counter()
+    with open(ruta, 'rb') as f:
+        exito, error = s3.upload_fileobj(f, bucket, clave, size=tamano, compress=comprimir)
+    subida = time.perf_counter() - inicio
+    if not exito:
+        raise RuntimeError(error)
+
+    guardado = s3.s3_client.head_object(Bucket=bucket, Key=clave)['ContentLength']
+
+    destino = os.path.join(directorio, 'descarga.tmp')
+    inicio = time.perf_counter()
+    exito, error = s3.download_file(bucket, clave, destino)
+    bajada = time.perf_counter() - inicio
+    if not exito:
+        raise RuntimeError(error)
+    if os.path.getsize(destino) != tamano:
+        raise RuntimeError("la descarga no coincide con el original")
+
+    os.remove(destino)
+    s3.delete_file(bucket, clave)
+    return subida, bajada, guardado
+
+
+def comparar(args):
+    """Comparar subida y descarga con y sin compresión para cada archivo."""
+    from CNDD_Project.utils.S3_manager import S3Manager
+
+    s3 = S3Manager()
+
+    print(f"\n{'='*70}")
+    print(f"{'REPORTE DE COMPRESIÓN DE SUBIDAS'.center(70)}")
+    print(f"{'='*70}\n")
+    print(f"Bucket: {args.bucket} | Endpoint: {os.getenv('AWS_ENDPOINT_URL_S3', 'AWS')}\n")
+    print(f"{'Archivo':<18} {'Original':>9} {'Gzip':>9} {'Ratio':>6} "
+          f"{'Subida s':>15} {'Bajada s':>15}")
+    print(f"{'':<18} {'MB':>9} {'MB':>9} {'':>6} {'plano / gzip':>15} {'plano / gzip':>15}")
+    print(f"{'-'*76}")
+
+    totales = {'original': 0, 'guardado': 0, 'ahorro': 0.0, 'plano': 0.0}
+
+    with tempfile.TemporaryDirectory() as directorio:
+        if args.directorio:
+            rutas = sorted(str(p) for p in Path(args.directorio).iterdir() if p.is_file())
+        else:
+            rutas = generar_muestras(directorio, args.tamano_mb)
+
+        for ruta in rutas:
+            nombre = os.path.basename(ruta)
+            tamano = os.path.getsize(ruta)
+            try:
+                sub_plano, baj_plano, _ = medir(s3, args.bucket, ruta, False, directorio)
+                sub_gzip, baj_gzip, guardado = medir(s3, args.bucket, ruta, True, directorio)
+            except Exception as e:
+                print(f"{nombre[:18]:<18} ❌ {e}")
+                continue
+
+            print(f"{nombre[:18]:<18} {tamano / MB:>9.2f} {guardado / MB:>9.2f} "
+                  f"{tamano / max(guardado, 1):>5.1f}x "
+                  f"{sub_plano:>7.2f} / {sub_gzip:<5.2f} {baj_plano:>7.2f} / {baj_gzip:<5.2f}")
+
+            totales['original'] += tamano
+            totales['guardado'] += guardado
+            totales['plano'] += sub_plano + baj_plano
+            totales['ahorro'] += (sub_plano + baj_plano) - (sub_gzip + baj_gzip)
+
+    if not totales['original']:
+        return 1
+
+    print(f"\n{'='*70}")
+    print(f"Almacenamiento: {totales['original'] / MB:.2f} MB -> {totales['guardado'] / MB:.2f} MB "
+          f"(relación {totales['original'] / max(totales['guardado'], 1):.1f}x, "
+          f"{100 * (1 - totales['guardado'] / totales['original']):.0f}% menos)")
+    print(f"Tiempo de transferencia ahorrado: {totales['ahorro']:.2f} s "
+          f"({100 * totales['ahorro'] / max(totales['plano'], 1e-9):.0f}% de {totales['plano']:.2f} s)")
+    return 0
+
+
+def inventario(args):
+    """Resumir los objetos de un prefijo guardados con y sin compresión."""
+    from CNDD_Project.utils.S3_manager import S3Manager
+    from CNDD_Project.utils.compression import ORIGINAL_SIZE_METADATA_KEY, is_compressible
+
+    s3 = S3Manager()
+    candidatos = []
+    for pagina in s3.iter_pages(args.bucket, prefix=args.prefijo):
+        candidatos += [f for f in pagina['files'] if is_compressible(f['key'])]
+
+    def consultar(archivo):
+        head = s3.s3_client.head_object(Bucket=args.bucket, Key=archivo['key'])
+        original = int(head.get('Metadata', {}).get(ORIGINAL_SIZE_METADATA_KEY, head['ContentLength']))
+        return head.get('ContentEncoding') == 'gzip', original, head['ContentLength']
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        resultados = list(pool.map(consultar, candidatos))
+
+    comprimidos = [(o, g) for es_gzip, o, g in resultados if es_gzip]
+    planos = [o for es_gzip, o, _ in resultados if not es_gzip]
+    original = sum(o for o, _ in comprimidos)
+    guardado = sum(g for _, g in comprimidos)
+
+    print(f"\n{'='*70}")
+    print(f"{'INVENTARIO DE COMPRESIÓN'.center(70)}")
+    print(f"{'='*70}\n")
+    print(f"Bucket: {args.bucket} | Prefijo: '{args.prefijo}'\n")
+    print(f"Archivos de texto:        {len(resultados)}")
+    print(f"  Comprimidos:            {len(comprimidos)} "
+          f"({original / MB:.2f} MB -> {guardado / MB:.2f} MB, "
+          f"relación {original / max(guardado, 1):.1f}x)")
+    print(f"  Sin comprimir:          {len(planos)} ({sum(planos) / MB:.2f} MB)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bucket', default=BUCKET_PUBLICA, help='Bucket donde subir o inventariar')
+    parser.add_argument('--directorio', help='Carpeta con archivos de muestra (default: se generan)')
+    parser.add_argument('--tamano-mb', type=int, default=8, help='Tamaño de cada muestra generada')
+    parser.add_argument('--inventario', action='store_true', help='Resumir lo ya guardado en el bucket')
+    parser.add_argument('--prefijo', default='', help='Prefijo a inventariar')
+    parser.add_argument('--simulado', action='store_true', help='Usar un servidor moto local')
+    args = parser.parse_args()
+
+    ejecutar = inventario if args.inventario else comparar
+
+    if not args.simulado:
+        return ejecutar(args)
+
+    servidor, puerto = iniciar_moto()
+    try:
+        os.environ['AWS_ENDPOINT_URL_S3'] = f'http://127.0.0.1:{puerto}'
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'prueba')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'prueba')
+        os.environ.setdefault('AWS_REGION', 'us-east-1')
+
+        from CNDD_Project.utils.aws_clients import get_client
+        get_client('s3', region_name=os.environ['AWS_REGION']).create_bucket(Bucket=args.bucket)
+        return ejecutar(args)
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+if __name__ == '__main__':
+    exit(main())
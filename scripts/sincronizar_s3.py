@@ -0,0 +1,474 @@
+"""
+Sincronización en paralelo entre una carpeta local y un prefijo de S3
+Compara por tamaño, fecha de modificación y ETag, y sube, descarga o elimina
+solo lo necesario (como `aws s3 sync`), respetando los buckets y permisos de cada rol
+
+Uso:
+    python scripts/sincronizar_s3.py subir ./datos cndd-proyectos/migracion/ --rol lectura-escritura
+    python scripts/sincronizar_s3.py bajar cndd-proyectos/migracion/ ./datos --rol solo-descarga
+
+Opciones:
+    --dry-run        Solo muestra lo que se haría (verifica ETag pero no transfiere)
+    --eliminar       Borra en el destino lo que ya no existe en el origen
+    --hilos N        Transferencias en paralelo (default: 8)
+    --excluir PATRÓN Patrón de rutas a ignorar (se puede repetir), p. ej. '*.tmp'
+    --checkpoint F   Archivo de progreso (default: en la carpeta temporal). Si existe
+                     para la misma sincronización, lo ya hecho no se repite
+    --desde-cero     Ignorar el checkpoint existente
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Permitir importar el paquete de la aplicación desde scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+load_dotenv()
+
+MB = 1024 * 1024
+
+# Permisos por rol (los mismos que aplica la página de archivos)
+ROLES_SUBIDA = ['admin', 'lectura-escritura', 'solo-carga']
+ROLES_DESCARGA = ['admin', 'lectura-escritura', 'solo-descarga']
+ROLES_ELIMINACION = ['admin', 'lectura-escritura']
+
+# Diferencia de fechas (segundos) que se considera la misma
+TOLERANCIA_MTIME = 2
+
+# Sufijo de las descargas en curso (no se tienen en cuenta al comparar)
+SUFIJO_TEMPORAL = '.cndd-sync.tmp'
+
+
+def separar_remoto(texto):
+    """Convertir 'bucket/prefijo' en (bucket, prefijo terminado en '/')."""
+    bucket, _, prefijo = texto.partition('/')
+    if prefijo and not prefijo.endswith('/'):
+        prefijo += '/'
+    return bucket, prefijo
+
+
+def excluido(ruta_relativa, patrones):
+    """Indica si una ruta coincide con algún patrón de --excluir."""
+    return any(fnmatch.fnmatch(ruta_relativa, p) for p in patrones)
+
+
+def escanear_local(raiz, patrones):
+    """Recorrer la carpeta local: {ruta relativa: {'size', 'mtime'}}."""
+    archivos = {}
+    for carpeta, _, nombres in os.walk(raiz):
+        for nombre in nombres:
+            ruta = os.path.join(carpeta, nombre)
+            relativa = os.path.relpath(ruta, raiz).replace(os.sep, '/')
+            if nombre.endswith(SUFIJO_TEMPORAL) or excluido(relativa, patrones):
+                continue
+            estado = os.stat(ruta)
+            archivos[relativa] = {'size': estado.st_size, 'mtime': estado.st_mtime}
+    return archivos
+
+
+def escanear_remoto(s3, bucket, prefijo, patrones):
+    """Listar el prefijo en S3: {ruta relativa: {'key', 'size', 'mtime', 'etag'}}."""
+    archivos = {}
+    for pagina in s3.iter_pages(bucket, prefix=prefijo):
+        for fila in pagina['files']:
+            relativa = fila['key'][len(prefijo):]
+            if not relativa or relativa.endswith('/') or excluido(relativa, patrones):
+                continue
+            modificado = datetime.strptime(fila['last_modified'], '%Y-%m-%d %H:%M:%S')
+            archivos[relativa] = {
+                'key': fila['key'],
+                'size': fila['size'],
+                'mtime': modificado.replace(tzinfo=timezone.utc).timestamp(),
+                'etag': fila['etag'],
+            }
+    return archivos
+
+
+def leer_tamanos_originales(s3, bucket, locales, remotos, hilos):
+    """
+    Anotar el tamaño sin comprimir de los objetos guardados con gzip.
+
+    S3 lista el tamaño comprimido, que nunca coincide con la copia local
+    (se descomprime al descargar). Solo se consulta el HEAD de los objetos
+    cuyo tamaño no coincide con el del archivo local.
+    """
+    from CNDD_Project.utils.compression import ORIGINAL_SIZE_METADATA_KEY
+
+    candidatos = [r for r, d in remotos.items() if r in locales and locales[r]['size'] != d['size']]
+
+    def leer(ruta):
+        head = s3.s3_client.head_object(Bucket=bucket, Key=remotos[ruta]['key'])
+        original = head.get('Metadata', {}).get(ORIGINAL_SIZE_METADATA_KEY)
+        if head.get('ContentEncoding') == 'gzip' and original:
+            remotos[ruta]['original_size'] = int(original)
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        for futuro in as_completed([pool.submit(leer, r) for r in candidatos]):
+            try:
+                futuro.result()
+            except Exception as e:
+                print(f"⚠️  No se pudo leer el tamaño original: {e}")
+
+
+def tamano_comparable(info):
+    """Tamaño con el que se compara: el original si el objeto está comprimido."""
+    return info.get('original_size', info['size'])
+
+
+def etag_local(ruta, tamano, etag_remoto):
+    """
+    Calcular el ETag que tendría el archivo local en S3.
+
+    Para objetos multipart ('<md5>-<partes>') se prueba con los tamaños de
+    parte que usa la aplicación; si ninguno da el mismo número de partes
+    no se puede comparar y se devuelve None.
+    """
+    from CNDD_Project.utils.multipart_upload import choose_part_size
+    from CNDD_Project.utils.transfer_profiles import get_transfer_config
+
+    if '-' not in etag_remoto:
+        md5 = hashlib.md5()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(MB), b''):
+                md5.update(bloque)
+        return md5.hexdigest()
+
+    partes = int(etag_remoto.rsplit('-', 1)[1])
+    candidatos = [get_transfer_config(tamano).multipart_chunksize, choose_part_size(tamano),
+                  8 * MB, 16 * MB, 64 * MB]
+    tamano_parte = next((c for c in candidatos if math.ceil(tamano / c) == partes), None)
+    if tamano_parte is None:
+        return None
+
+    digests = []
+    with open(ruta, 'rb') as f:
+        for parte in iter(lambda: f.read(tamano_parte), b''):
+            digests.append(hashlib.md5(parte).digest())
+    return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+
+def planificar(modo, locales, remotos, eliminar):
+    """
+    Decidir qué hacer con cada archivo.
+
+    Returns:
+        Lista de acciones {'tipo', 'ruta', 'verificar'}; 'verificar' indica
+        que el tamaño coincide y hay que comparar el ETag antes de transferir
+    """
+    acciones = []
+    origen, destino = (locales, remotos) if modo == 'subir' else (remotos, locales)
+    tipo = 'subir' if modo == 'subir' else 'bajar'
+
+    for ruta, o in sorted(origen.items()):
+        d = destino.get(ruta)
+        if d is None or tamano_comparable(o) != tamano_comparable(d):
+            acciones.append({'tipo': tipo, 'ruta': ruta, 'verificar': False})
+        elif modo == 'subir' and o['mtime'] > d['mtime'] + TOLERANCIA_MTIME:
+            acciones.append({'tipo': tipo, 'ruta': ruta, 'verificar': True})
+        elif modo == 'bajar' and abs(o['mtime'] - d['mtime']) > TOLERANCIA_MTIME:
+            acciones.append({'tipo': tipo, 'ruta': ruta, 'verificar': True})
+
+    if eliminar:
+        sobrantes = sorted(set(destino) - set(origen))
+        tipo = 'eliminar-remoto' if modo == 'subir' else 'eliminar-local'
+        acciones += [{'tipo': tipo, 'ruta': ruta, 'verificar': False} for ruta in sobrantes]
+
+    return acciones
+
+
+class Checkpoint:
+    """Progreso de una sincronización guardado en un archivo JSON."""
+
+    def __init__(self, ruta, parametros, desde_cero=False):
+        self.ruta = ruta
+        self.parametros = parametros
+        self.hechos = set()
+        self._pendientes = 0
+        self._lock = threading.Lock()
+
+        if not desde_cero and os.path.exists(ruta):
+            try:
+                with open(ruta, encoding='utf-8') as f:
+                    registro = json.load(f)
+                if registro.get('parametros') == parametros:
+                    self.hechos = set(registro.get('hechos', []))
+            except (OSError, ValueError):
+                pass
+
+    def marcar(self, accion):
+        """Anotar una acción terminada (se guarda cada 100)."""
+        with self._lock:
+            self.hechos.add(f"{accion['tipo']}:{accion['ruta']}")
+            self._pendientes += 1
+            if self._pendientes >= 100:
+                self._guardar()
+
+    def hecho(self, accion):
+        """Indica si la acción ya se completó en una ejecución anterior."""
+        return f"{accion['tipo']}:{accion['ruta']}" in self.hechos
+
+    def guardar(self):
+        with self._lock:
+            self._guardar()
+
+    def _guardar(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+        temporal = self.ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({'parametros': self.parametros, 'hechos': sorted(self.hechos)}, f)
+        os.replace(temporal, self.ruta)
+        self._pendientes = 0
+
+    def terminar(self):
+        """Borrar el checkpoint al terminar sin errores."""
+        try:
+            os.remove(self.ruta)
+        except FileNotFoundError:
+            pass
+
+
+class Sincronizador:
+    """Ejecuta el plan en paralelo y lleva las estadísticas."""
+
+    def __init__(self, s3, modo, raiz, bucket, prefijo, locales, remotos, dry_run):
+        self.s3 = s3
+        self.modo = modo
+        self.raiz = raiz
+        self.bucket = bucket
+        self.prefijo = prefijo
+        self.locales = locales
+        self.remotos = remotos
+        self.dry_run = dry_run
+        self.stats = {'subidos': 0, 'bajados': 0, 'eliminados': 0, 'iguales': 0,
+                      'pendientes': 0, 'errores': 0, 'bytes': 0}
+        self.errores = []
+        self._lock = threading.Lock()
+
+    def _sumar(self, clave, cantidad=1):
+        with self._lock:
+            self.stats[clave] += cantidad
+
+    def ejecutar(self, accion):
+        """Ejecutar una acción; devuelve True si terminó (o no hacía falta)."""
+        ruta = accion['ruta']
+        local = os.path.join(self.raiz, *ruta.split('/'))
+        remoto = self.remotos.get(ruta)
+
+        # El ETag de un objeto comprimido es el del gzip: no se puede comparar
+        if accion['verificar'] and remoto and 'original_size' not in remoto:
+            etag = etag_local(local, remoto['size'], remoto['etag'])
+            if etag == remoto['etag']:
+                if self.modo == 'bajar' and not self.dry_run:
+                    # Mismo contenido: se alinea la fecha para no volver a compararlo
+                    os.utime(local, (remoto['mtime'], remoto['mtime']))
+                self._sumar('iguales')
+                return True
+
+        if self.dry_run:
+            self._sumar('pendientes')
+            return False
+
+        if accion['tipo'] == 'subir':
+            exito, error = self.s3.upload_file(local, self.bucket, self.prefijo + ruta)
+            if exito:
+                self._sumar('subidos')
+                self._sumar('bytes', self.locales[ruta]['size'])
+        elif accion['tipo'] == 'bajar':
+            os.makedirs(os.path.dirname(local) or '.', exist_ok=True)
+            temporal = local + SUFIJO_TEMPORAL
+            exito, error = self.s3.download_file(self.bucket, remoto['key'], temporal, size=remoto['size'])
+            if exito:
+                os.replace(temporal, local)
+                os.utime(local, (remoto['mtime'], remoto['mtime']))
+                self._sumar('bajados')
+                self._sumar('bytes', os.path.getsize(local))
+        else:
+            os.remove(local)
+            exito, error = True, None
+            self._sumar('eliminados')
+
+        if not exito:
+            self._sumar('errores')
+            with self._lock:
+                self.errores.append(f"{ruta}: {error}")
+        return exito
+
+    def eliminar_remotos(self, acciones, checkpoint):
+        """Borrar en lote los objetos que sobran en S3."""
+        if not acciones:
+            return
+        if self.dry_run:
+            self._sumar('pendientes', len(acciones))
+            return
+        claves = [self.prefijo + a['ruta'] for a in acciones]
+        _, eliminados, errores = self.s3.delete_files(self.bucket, claves)
+        fallidas = {e['key'] for e in errores}
+        for accion in acciones:
+            if self.prefijo + accion['ruta'] not in fallidas:
+                checkpoint.marcar(accion)
+        self._sumar('eliminados', len(eliminados))
+        self._sumar('errores', len(errores))
+        self.errores += [f"{e['key']}: {e['error']}" for e in errores]
+
+
+def validar_rol(s3, rol, modo, bucket, eliminar):
+    """Comprobar que el rol puede hacer la sincronización pedida."""
+    if bucket not in s3.get_available_buckets(rol):
+        return f"El rol '{rol}' no tiene acceso al bucket '{bucket}'"
+    if modo == 'subir' and rol not in ROLES_SUBIDA:
+        return f"El rol '{rol}' no puede subir archivos"
+    if modo == 'bajar' and rol not in ROLES_DESCARGA:
+        return f"El rol '{rol}' no puede descargar archivos"
+    if modo == 'subir' and eliminar and rol not in ROLES_ELIMINACION:
+        return f"El rol '{rol}' no puede eliminar archivos (--eliminar)"
+    return None
+
+
+def sincronizar(args):
+    """Comparar, planificar y ejecutar la sincronización."""
+    from CNDD_Project.utils.S3_manager import S3Manager
+    from CNDD_Project.utils.upload_state import transfer_fingerprint
+
+    if args.modo == 'subir':
+        raiz, (bucket, prefijo) = args.origen, separar_remoto(args.destino)
+    else:
+        raiz, (bucket, prefijo) = args.destino, separar_remoto(args.origen)
+    raiz = os.path.abspath(raiz)
+
+    s3 = S3Manager()
+    error = validar_rol(s3, args.rol, args.modo, bucket, args.eliminar)
+    if error:
+        print(f"❌ {error}")
+        return 1
+    if args.modo == 'subir' and not os.path.isdir(raiz):
+        print(f"❌ La carpeta '{raiz}' no existe")
+        return 1
+
+    print(f"\n{'='*70}")
+    print(f"{'SINCRONIZACIÓN S3'.center(70)}")
+    print(f"{'='*70}\n")
+    flecha = '->' if args.modo == 'subir' else '<-'
+    print(f"{raiz} {flecha} s3://{bucket}/{prefijo}  (rol: {args.rol}{', simulación' if args.dry_run else ''})\n")
+
+    inicio = time.perf_counter()
+    locales = escanear_local(raiz, args.excluir) if os.path.isdir(raiz) else {}
+    remotos = escanear_remoto(s3, bucket, prefijo, args.excluir)
+    leer_tamanos_originales(s3, bucket, locales, remotos, args.hilos)
+    acciones = planificar(args.modo, locales, remotos, args.eliminar)
+    print(f"Local: {len(locales)} archivos | S3: {len(remotos)} objetos | "
+          f"Acciones: {len(acciones)} (comparación en {time.perf_counter() - inicio:.1f} s)")
+
+    parametros = {'modo': args.modo, 'raiz': raiz, 'bucket': bucket, 'prefijo': prefijo,
+                  'eliminar': args.eliminar}
+    ruta_checkpoint = args.checkpoint or os.path.join(
+        tempfile.gettempdir(), 'cndd-sync',
+        transfer_fingerprint(args.modo, 'local', raiz, bucket, prefijo) + '.json'
+    )
+    checkpoint = Checkpoint(ruta_checkpoint, parametros, args.desde_cero)
+    if not args.dry_run and checkpoint.hechos:
+        acciones = [a for a in acciones if not checkpoint.hecho(a)]
+        print(f"Reanudando: {len(checkpoint.hechos)} acciones ya hechas según {ruta_checkpoint}")
+
+    sincronizador = Sincronizador(s3, args.modo, raiz, bucket, prefijo, locales, remotos, args.dry_run)
+    transferencias = [a for a in acciones if a['tipo'] != 'eliminar-remoto']
+    inicio = time.perf_counter()
+    ultimo_aviso = inicio
+
+    pool = ThreadPoolExecutor(max_workers=args.hilos)
+    futuros = {}
+    try:
+        futuros = {pool.submit(sincronizador.ejecutar, a): a for a in transferencias}
+        for hechos, futuro in enumerate(as_completed(futuros), 1):
+            accion = futuros[futuro]
+            try:
+                if futuro.result() and not args.dry_run:
+                    checkpoint.marcar(accion)
+            except Exception as e:
+                sincronizador._sumar('errores')
+                sincronizador.errores.append(f"{accion['ruta']}: {e}")
+            if args.verbose:
+                print(f"   {accion['tipo']:<15} {accion['ruta']}")
+            if time.perf_counter() - ultimo_aviso > 2:
+                ultimo_aviso = time.perf_counter()
+                print(f"   ... {hechos}/{len(transferencias)} "
+                      f"({sincronizador.stats['bytes'] / MB:.1f} MB)")
+
+        sobrantes = [a for a in acciones if a['tipo'] == 'eliminar-remoto']
+        for accion in sobrantes if args.verbose else []:
+            print(f"   {accion['tipo']:<15} {accion['ruta']}")
+        sincronizador.eliminar_remotos(sobrantes, checkpoint)
+    except KeyboardInterrupt:
+        # Se esperan solo las transferencias en curso; las encoladas se cancelan
+        pool.shutdown(wait=True, cancel_futures=True)
+        if not args.dry_run:
+            for futuro, accion in futuros.items():
+                if futuro.done() and not futuro.cancelled() and futuro.exception() is None and futuro.result():
+                    checkpoint.marcar(accion)
+        print(f"\n⚠️  Interrumpido; vuelve a ejecutar para reanudar desde {ruta_checkpoint}")
+        return 130
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if not args.dry_run:
+            checkpoint.guardar()
+
+    duracion = time.perf_counter() - inicio
+    stats = sincronizador.stats
+
+    print(f"\n{'='*70}")
+    if args.dry_run:
+        print(f"Simulación: {stats['pendientes']} acciones pendientes, "
+              f"{stats['iguales']} archivos con el mismo contenido")
+        return 0
+
+    print(f"Subidos: {stats['subidos']} | Descargados: {stats['bajados']} | "
+          f"Eliminados: {stats['eliminados']} | Sin cambios (ETag): {stats['iguales']} | "
+          f"Errores: {stats['errores']}")
+    print(f"Transferido: {stats['bytes'] / MB:.2f} MB en {duracion:.2f} s "
+          f"({stats['bytes'] / MB / max(duracion, 1e-9):.2f} MB/s, "
+          f"{(stats['subidos'] + stats['bajados']) / max(duracion, 1e-9):.1f} archivos/s)")
+
+    if sincronizador.errores:
+        print("\nErrores:")
+        for error in sincronizador.errores[:20]:
+            print(f"   ❌ {error}")
+        print(f"\nEl progreso quedó en {ruta_checkpoint}; vuelve a ejecutar para reanudar")
+        return 1
+
+    checkpoint.terminar()
+    print("\n   ✅ Sincronización completa")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modo', choices=['subir', 'bajar'], help='Dirección de la sincronización')
+    parser.add_argument('origen', help="Carpeta local (subir) o 'bucket/prefijo' (bajar)")
+    parser.add_argument('destino', help="'bucket/prefijo' (subir) o carpeta local (bajar)")
+    parser.add_argument('--rol', required=True, help='Rol con el que se sincroniza (define buckets y permisos)')
+    parser.add_argument('--dry-run', action='store_true', help='Mostrar el plan sin transferir nada')
+    parser.add_argument('--eliminar', action='store_true', help='Borrar en el destino lo que no está en el origen')
+    parser.add_argument('--hilos', type=int, default=8, help='Transferencias en paralelo')
+    parser.add_argument('--excluir', action='append', default=[], help='Patrón de rutas a ignorar')
+    parser.add_argument('--checkpoint', help='Archivo de progreso para reanudar')
+    parser.add_argument('--desde-cero', action='store_true', help='Ignorar el checkpoint existente')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Mostrar cada acción')
+    args = parser.parse_args()
+
+    return sincronizar(args)
+
+
+if __name__ == '__main__':
+    exit(main())